@@ -0,0 +1,11 @@
+"""
+Benchmark suite of capgenie.
+
+Generates synthetic CapCut timelines (no CapCut install needed), times the main
+Project operations at several scales, records peak memory, stores the results as JSON
+and compares them against a saved baseline:
+
+    python -m benchmarks run --sizes 10 1000 10000 --output results.json
+    python -m benchmarks compare baseline.json results.json --threshold 0.15
+    python -m benchmarks generate --count 5000 --output simple.json --project ./draft
+"""
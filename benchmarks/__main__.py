@@ -0,0 +1,89 @@
+"""
+Command line of the benchmark suite (see benchmarks/__init__.py).
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.generator import generate_project, generate_sequences, write_simplified
+from benchmarks.runner import DEFAULT_SIZES, SCENARIOS, compare, run_suite
+
+
+def _cmd_run(args) -> int:
+    def report(record):
+        print(f"{record['scenario']:>20} {record['size']:>8} {record['best_s'] * 1000:>10.2f} ms "
+              f"{record['median_s'] * 1000:>10.2f} ms {record['peak_bytes'] / 2**20:>9.2f} MiB", flush=True)
+
+    print(f"{'scenario':>20} {'size':>8} {'best':>13} {'median':>13} {'peak':>13}")
+    results = run_suite(args.sizes, args.scenarios, args.repeat, args.warm_cache, on_result=report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def _cmd_compare(args) -> int:
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.memory_threshold)
+    print(f"{'scenario':>20} {'size':>8} {'baseline':>12} {'current':>12} {'time':>8} {'memory':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['scenario']:>20} {row['size']:>8} {row['baseline_s'] * 1000:>9.2f} ms {row['current_s'] * 1000:>9.2f} ms "
+              f"{row['time_ratio']:>7.2f}x {row['memory_ratio']:>7.2f}x{flag}")
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{regressions} regression(s) over {len(rows)} comparable results", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def _cmd_generate(args) -> int:
+    if args.project:
+        generate_project(args.project, args.count, json_path=args.output, seed=args.seed,
+                         video_tracks=args.video_tracks, audio_tracks=args.audio_tracks)
+    else:
+        write_simplified(args.output, generate_sequences(args.count, args.video_tracks, args.audio_tracks, seed=args.seed))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="capgenie benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the scenarios on synthetic timelines")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="timeline sizes in segments")
+    run.add_argument("--scenarios", nargs="+", choices=SCENARIOS, help="subset of scenarios (default: all)")
+    run.add_argument("--repeat", type=int, default=3, help="timed runs per scenario (best and median are kept)")
+    run.add_argument("--warm-cache", action="store_true", help="keep the shared draft cache between runs")
+    run.add_argument("--output", help="write the results to this JSON file")
+    run.set_defaults(handler=_cmd_run)
+
+    cmp = commands.add_parser("compare", help="flag regressions of a result file against a baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="tolerated slowdown of the best time (0.10 = +10%%)")
+    cmp.add_argument("--memory-threshold", type=float, default=None, help="tolerated peak memory growth (default: --threshold)")
+    cmp.set_defaults(handler=_cmd_compare)
+
+    gen = commands.add_parser("generate", help="write a synthetic simplified JSON (and optionally its CapCut project)")
+    gen.add_argument("--count", type=int, required=True)
+    gen.add_argument("--output", required=True, help="simplified JSON to write")
+    gen.add_argument("--project", help="also create a CapCut project synced from it")
+    gen.add_argument("--video-tracks", type=int, default=3)
+    gen.add_argument("--audio-tracks", type=int, default=2)
+    gen.add_argument("--seed", type=int, default=0)
+    gen.set_defaults(handler=_cmd_generate)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
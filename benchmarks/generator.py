@@ -0,0 +1,70 @@
+"""
+Synthetic timelines for benchmarks and tests.
+
+Sequences are laid out back to back on several video and audio tracks, with a mix of
+media files (each file reused by several segments), random cropping, volumes and fades.
+The output is deterministic for a given seed.
+"""
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+from capgenie.project_editor import Project
+
+
+def generate_sequences(count: int, video_tracks: int = 3, audio_tracks: int = 2, media_files: Optional[int] = None,
+                       fade_ratio: float = 0.25, seed: int = 0) -> List[Dict]:
+    """
+    Build `count` simplified sequences (the format of sync_from_json).
+    :param video_tracks: number of video tracks (track indexes 0..video_tracks-1)
+    :param audio_tracks: number of audio tracks, placed after the video tracks
+    :param media_files: distinct media paths per type (default: count // 4, at least 1)
+    :param fade_ratio: share of the sequences with fade in/out
+    """
+    rng = random.Random(seed)
+    media_files = media_files or max(1, count // 4)
+    tracks = [("video", i) for i in range(video_tracks)] + [("audio", video_tracks + i) for i in range(audio_tracks)]
+    ends = [0.0] * len(tracks)
+    sequences = []
+    for i in range(count):
+        slot = i % len(tracks)
+        ttype, track_index = tracks[slot]
+        duration = round(rng.uniform(0.5, 5.0), 3)
+        source_in = round(rng.uniform(0.0, 30.0), 3)
+        media = rng.randrange(media_files)
+        seq = {
+            "path": f"/media/video_{media}.mp4" if ttype == "video" else f"/media/audio_{media}.wav",
+            "start_time": round(ends[slot], 3),
+            "end_time": round(ends[slot] + duration, 3),
+            "source_in": source_in,
+            "source_out": round(source_in + duration, 3),
+            "volume": round(rng.uniform(0.2, 1.0), 2),
+            "type": ttype,
+            "track_index": track_index,
+        }
+        if rng.random() < fade_ratio:
+            seq["fade_in_duration"] = round(min(duration / 4, 1.0), 3)
+            seq["fade_out_duration"] = round(min(duration / 4, 1.0), 3)
+        sequences.append(seq)
+        ends[slot] = seq["end_time"]
+    return sequences
+
+
+def write_simplified(path: str, sequences: List[Dict]):
+    """Write sequences as a simplified JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"sequences": sequences}, f)
+
+
+def generate_project(project_path: str, count: int, json_path: Optional[str] = None, **kwargs) -> Project:
+    """
+    Create a CapCut project holding a synthetic timeline of `count` segments.
+    Extra keyword arguments are passed to generate_sequences.
+    """
+    json_path = json_path or os.path.join(os.path.dirname(os.path.abspath(project_path)),
+                                          os.path.basename(project_path) + ".json")
+    write_simplified(json_path, generate_sequences(count, **kwargs))
+    project = Project(project_path, json_path, create=True, overwrite=True)
+    project.sync_from_json(backup="none")
+    return project
@@ -0,0 +1,140 @@
+"""
+Timing and comparison of the benchmark scenarios.
+
+Each scenario is timed `repeat` times (best and median wall time are kept), then run
+once more under tracemalloc to record its peak traced memory. Unless warm_cache is set,
+the shared draft cache is cleared before every run so each call parses the draft as a
+fresh process would.
+"""
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Optional
+
+import capgenie
+from capgenie import codec
+from capgenie.cache import draft_cache
+from capgenie.project_editor import Project
+
+from .generator import generate_project, generate_sequences
+
+DEFAULT_SIZES = (10, 1000, 10000)
+
+
+def _scenarios(workdir: str, size: int) -> Dict[str, Callable[[], None]]:
+    """Set up the projects of one scale and return scenario name -> callable to time."""
+    json_path = os.path.join(workdir, f"simple_{size}.json")
+    project = generate_project(os.path.join(workdir, f"draft_{size}"), size, json_path=json_path)
+    new_path = os.path.join(workdir, f"new_{size}")
+    export_path = os.path.join(workdir, f"export_{size}.json")
+    # Tiny media pool: additions do not depend on how many media the timeline has
+    media = generate_sequences(2, video_tracks=1, audio_tracks=1, seed=size)
+    # One media file per sequence (on average): worst case for the reuse of helper materials,
+    # whose per-sequence cost must stay flat as the timeline grows
+    many_media = generate_project(os.path.join(workdir, f"many_media_{size}"), size, video_tracks=1,
+                                  audio_tracks=0, media_files=size, seed=size)
+
+    return {
+        "create": lambda: Project(new_path, json_path, create=True, overwrite=True),
+        "sync_from_json": lambda: project.sync_from_json(backup="none"),
+        "sync_many_media": lambda: many_media.sync_from_json(backup="none"),
+        "sync_incremental": lambda: project.sync_from_json(backup="none", incremental=True),
+        "export_to_json": lambda: project.export_to_json(export_path),
+        "export_streaming": lambda: project.export_to_json(export_path, streaming=True),
+        "add_video_sequence": lambda: project.add_video_sequence(media[0]["path"], 0.0, 1.0),
+        "add_audio_sequence": lambda: project.add_audio_sequence(media[1]["path"], 0.0, 1.0, track_index=3),
+    }
+
+
+SCENARIOS = (
+    "create", "sync_from_json", "sync_many_media", "sync_incremental", "export_to_json", "export_streaming",
+    "add_video_sequence", "add_audio_sequence",
+)
+
+
+def measure(fn: Callable[[], None], repeat: int = 3, warm_cache: bool = False) -> Dict:
+    """Time fn `repeat` times, then measure its peak traced memory over one more run."""
+    times = []
+    for _ in range(repeat):
+        if not warm_cache:
+            draft_cache.clear()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    if not warm_cache:
+        draft_cache.clear()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"best_s": min(times), "median_s": statistics.median(times), "peak_bytes": peak}
+
+
+def run_suite(sizes: Iterable[int] = DEFAULT_SIZES, scenarios: Optional[Iterable[str]] = None, repeat: int = 3,
+              warm_cache: bool = False, on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Run the scenarios at every size in a temporary folder.
+    :return: {"meta": {...}, "results": [{"scenario", "size", "best_s", "median_s", "peak_bytes"}, ...]}
+    """
+    wanted = list(scenarios) if scenarios else list(SCENARIOS)
+    unknown = set(wanted) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="capgenie-bench-") as workdir:
+        for size in sizes:
+            available = _scenarios(workdir, size)
+            for name in wanted:
+                record = {"scenario": name, "size": size}
+                record.update(measure(available[name], repeat, warm_cache))
+                results.append(record)
+                if on_result:
+                    on_result(record)
+    return {
+        "meta": {
+            "capgenie": capgenie.__version__,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "json_backend": codec.backend_name(),
+            "repeat": repeat,
+            "warm_cache": warm_cache,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10, memory_threshold: Optional[float] = None,
+            min_seconds: float = 0.001) -> List[Dict]:
+    """
+    Compare two result documents scenario by scenario (matching scenario and size).
+    A row is a regression when the best time grew by more than `threshold` (0.10 = +10%)
+    and by more than min_seconds (timer noise on sub-millisecond scenarios), or when the
+    peak memory grew by more than `memory_threshold` (defaults to threshold).
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    base = {(r["scenario"], r["size"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["scenario"], r["size"]))
+        if b is None:
+            continue
+        time_ratio = r["best_s"] / b["best_s"] if b["best_s"] else 1.0
+        mem_ratio = r["peak_bytes"] / b["peak_bytes"] if b["peak_bytes"] else 1.0
+        rows.append({
+            "scenario": r["scenario"],
+            "size": r["size"],
+            "baseline_s": b["best_s"],
+            "current_s": r["best_s"],
+            "time_ratio": time_ratio,
+            "memory_ratio": mem_ratio,
+            "regression": (time_ratio > 1 + threshold and r["best_s"] - b["best_s"] > min_seconds)
+                          or mem_ratio > 1 + memory_threshold,
+        })
+    return rows
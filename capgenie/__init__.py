@@ -11,9 +11,11 @@ __email__ = "yanis.djeroro@gmail.com" # Or your preferred email
 # Import main classes/functions for easy access
 from .project_editor import Project
 from .file_manager import FileManager as CapCutFileManager # Expose FileManager as CapCutFileManager for backward compatibility
+from .session import EditSession
 
 # Define what gets imported with "from capgenie import *"
 __all__ = [
     "Project",
     "CapCutFileManager", # Add this if it's part of the public API
+    "EditSession",
 ]
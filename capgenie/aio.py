@@ -0,0 +1,139 @@
+"""
+asyncio front end of Project.
+
+AsyncProject exposes the project operations as coroutines for asyncio-based servers.
+Each call runs the synchronous Project method in an executor, so parsing, building and
+serializing large drafts never block the event loop:
+
+- operations that work on the draft (load, sync, export, add_*, compact) run in the
+  `executor` given to the project, a shared thread pool by default;
+- pure file I/O (project creation, flush, close) runs in the `io_executor`, another
+  shared thread pool by default.
+
+Calls on one AsyncProject are ordered by its asyncio.Lock, in the order they were awaited;
+calls on different projects run concurrently. The executors must be thread pools: the
+operations need the in-memory state of their Project (draft cache, write-behind writer),
+which a process pool would not share.
+
+The contextvars of the caller are propagated to the executor, so an instrumentation span
+opened around an await (capgenie.instrumentation.operation) collects the stats of the call.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .model import Timeline
+from .project_editor import Project
+
+_shared_lock = threading.Lock()
+_shared_executors = {}
+
+
+def shared_executor(kind: str = "cpu") -> ThreadPoolExecutor:
+    """Process-wide default executors: "cpu" for draft operations, "io" for file I/O."""
+    with _shared_lock:
+        executor = _shared_executors.get(kind)
+        if executor is None:
+            workers = (os.cpu_count() or 1) if kind == "cpu" else min(32, (os.cpu_count() or 1) + 4)
+            executor = _shared_executors[kind] = ThreadPoolExecutor(max_workers=workers,
+                                                                    thread_name_prefix=f"capgenie-{kind}")
+        return executor
+
+
+class AsyncProject:
+    """
+    Awaitable wrapper of a Project:
+
+        project = await AsyncProject.open("drafts/0001", "drafts/0001.json", create=True)
+        await project.sync_from_json()
+        await project.add_video_sequence("/media/a.mp4", 0.0, 2.0)
+        await project.export_to_json("drafts/0001.out.json")
+
+    :param project: the wrapped Project; use AsyncProject.open() to create it off the loop
+    :param executor: executor of the draft operations (default: shared_executor("cpu"))
+    :param io_executor: executor of flush/close and project creation (default: shared_executor("io"))
+    """
+
+    def __init__(self, project: Project, executor: Optional[Executor] = None, io_executor: Optional[Executor] = None):
+        self.project = project
+        self.executor = executor
+        self.io_executor = io_executor
+        self._lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    async def open(cls, project_path: str, json_path: str, executor: Optional[Executor] = None,
+                   io_executor: Optional[Executor] = None, **kwargs) -> "AsyncProject":
+        """Build the Project (creating its folder if asked, see Project) in the I/O executor."""
+        loop = asyncio.get_running_loop()
+        project = await loop.run_in_executor(io_executor or shared_executor("io"),
+                                             functools.partial(Project, project_path, json_path, **kwargs))
+        return cls(project, executor, io_executor)
+
+    @property
+    def path(self):
+        return self.project.path
+
+    @property
+    def last_stats(self):
+        """Stats of the last operation of the wrapped Project (see capgenie.instrumentation)."""
+        return self.project.last_stats
+
+    async def _run(self, executor: Optional[Executor], fn: Callable, *args, **kwargs) -> Any:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        async with self._lock:
+            return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    async def run(self, fn: Callable[[Project], Any]) -> Any:
+        """Run fn(project) in the draft executor, ordered with the other calls of this project."""
+        return await self._run(self.executor or shared_executor("cpu"), fn, self.project)
+
+    async def load(self) -> Optional[Timeline]:
+        """
+        Parse the draft into the shared draft cache (or take the write-behind copy) and return
+        it as a read-only Timeline, None when the project has no draft. Later operations start
+        from the cached draft.
+        """
+        return await self.run(lambda project: project._read_draft())
+
+    async def sync_from_json(self, json_path: str = None, backup: str = "copy", incremental: bool = False,
+                             dedup_materials: bool = False):
+        """See Project.sync_from_json."""
+        return await self.run(lambda project: project.sync_from_json(
+            json_path, backup=backup, incremental=incremental, dedup_materials=dedup_materials))
+
+    async def sync_from_data(self, project_data: dict, backup: str = "copy", incremental: bool = False,
+                             dedup_materials: bool = False):
+        """See Project.sync_from_data."""
+        return await self.run(lambda project: project.sync_from_data(
+            project_data, backup=backup, incremental=incremental, dedup_materials=dedup_materials))
+
+    async def export_to_json(self, export_path: str, streaming: bool = False, incremental: bool = False) -> bool:
+        """See Project.export_to_json."""
+        return await self.run(lambda project: project.export_to_json(export_path, streaming=streaming,
+                                                                     incremental=incremental))
+
+    async def add_video_sequence(self, *args, **kwargs) -> str:
+        """See Project.add_video_sequence; returns the id of the new segment."""
+        return await self.run(lambda project: project.add_video_sequence(*args, **kwargs))
+
+    async def add_audio_sequence(self, *args, **kwargs) -> str:
+        """See Project.add_audio_sequence; returns the id of the new segment."""
+        return await self.run(lambda project: project.add_audio_sequence(*args, **kwargs))
+
+    async def compact(self, backup: str = "copy") -> dict:
+        """See Project.compact."""
+        return await self.run(lambda project: project.compact(backup=backup))
+
+    async def flush(self, timeout: float = None):
+        """Write pending write-behind edits to disk (see Project.flush)."""
+        return await self._run(self.io_executor or shared_executor("io"), self.project.flush, timeout)
+
+    async def close(self):
+        """Flush and stop the write-behind thread, if any (see Project.close)."""
+        return await self._run(self.io_executor or shared_executor("io"), self.project.close)
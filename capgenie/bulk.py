@@ -0,0 +1,149 @@
+"""
+Bulk project generation: create and sync many CapCut drafts across a process pool.
+
+A manifest lists (project_path, json_path) jobs. Each job runs
+Project(project_path, json_path, create=True).sync_from_json() in a worker process.
+Finished jobs are appended to a JSON Lines journal, so a crashed or interrupted batch
+resumes where it stopped instead of redoing the drafts already generated.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .file_manager import FileManager
+
+
+def load_manifest(path: str) -> List[Tuple[str, str]]:
+    """
+    Read a manifest: a JSON array whose items are either {"project_path": ..., "json_path": ...}
+    objects or [project_path, json_path] pairs.
+    """
+    entries = FileManager.load_json(path)
+    if isinstance(entries, dict):
+        entries = entries.get("jobs", [])
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            jobs.append((entry["project_path"], entry["json_path"]))
+        else:
+            project_path, json_path = entry
+            jobs.append((project_path, json_path))
+    return jobs
+
+
+def load_journal(path: str) -> Dict[Tuple[str, str], Dict]:
+    """Last recorded result of each job in a journal (missing file = empty journal)."""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash: that job is simply redone
+                continue
+            done[(record["project_path"], record["json_path"])] = record
+    return done
+
+
+def run_job(project_path: str, json_path: str, backup: str = "copy", overwrite: bool = False, dedup_materials: bool = False) -> Dict:
+    """
+    Create (if needed) and sync one draft. Runs in the worker process, so the timings do
+    not include the time the job waited in the pool's queue.
+    :return: per-phase timings in seconds, and their total as elapsed_s; an exception raised
+        by the job carries the time spent before it as its `elapsed_s` attribute
+    """
+    from .project_editor import Project
+
+    start = time.perf_counter()
+    try:
+        project = Project(project_path, json_path, create=True, overwrite=overwrite)
+        created = time.perf_counter()
+        project.sync_from_json(backup=backup, dedup_materials=dedup_materials)
+    except Exception as e:
+        # Instance attributes are pickled with the exception back to the parent process
+        e.elapsed_s = time.perf_counter() - start
+        raise
+    synced = time.perf_counter()
+    return {"create_s": created - start, "sync_s": synced - created, "elapsed_s": synced - start}
+
+
+def run_bulk(jobs: Iterable[Tuple[str, str]], journal_path: Optional[str] = None, max_workers: Optional[int] = None,
+             backup: str = "copy", overwrite: bool = False, on_result: Optional[Callable[[Dict], None]] = None,
+             dedup_materials: bool = False) -> List[Dict]:
+    """
+    Run every job of the manifest over a ProcessPoolExecutor.
+    :param jobs: (project_path, json_path) pairs
+    :param journal_path: JSON Lines journal; jobs already recorded as "ok" there are skipped
+    :param max_workers: pool size (default: CPU count); 1 runs the jobs in this process
+    :param backup: .bak strategy passed to sync_from_json ("copy", "link" or "none")
+    :param overwrite: re-create existing project folders from the template
+    :param on_result: called with each result record as soon as its job finishes
+    :param dedup_materials: share one material per media file (see Project.sync_from_json)
+    :return: one record per job, with status "ok", "error" or "skipped" and its timings
+    """
+    jobs = list(jobs)
+    done = load_journal(journal_path)
+    results = []
+    todo = []
+    for project_path, json_path in jobs:
+        previous = done.get((project_path, json_path))
+        if previous is not None and previous.get("status") == "ok":
+            record = dict(previous, status="skipped")
+            results.append(record)
+            if on_result:
+                on_result(record)
+        else:
+            todo.append((project_path, json_path))
+
+    journal = open(journal_path, 'a', encoding='utf-8') if journal_path else None
+    try:
+        def record_result(project_path, json_path, timings=None, error=None):
+            # elapsed_s is measured by run_job; None when a worker died before reporting it
+            record = {"project_path": project_path, "json_path": json_path,
+                      "status": "ok" if error is None else "error",
+                      "elapsed_s": getattr(error, "elapsed_s", None)}
+            if timings:
+                record.update(timings)
+            if error is not None:
+                record["error"] = f"{type(error).__name__}: {error}"
+            if journal:
+                journal.write(json.dumps(record) + "\n")
+                journal.flush()
+            results.append(record)
+            if on_result:
+                on_result(record)
+
+        if max_workers == 1:
+            for project_path, json_path in todo:
+                try:
+                    timings = run_job(project_path, json_path, backup, overwrite, dedup_materials)
+                except Exception as e:
+                    record_result(project_path, json_path, error=e)
+                else:
+                    record_result(project_path, json_path, timings)
+            return results
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for project_path, json_path in todo:
+                future = pool.submit(run_job, project_path, json_path, backup, overwrite, dedup_materials)
+                futures[future] = (project_path, json_path)
+            for future in as_completed(futures):
+                project_path, json_path = futures[future]
+                try:
+                    timings = future.result()
+                except Exception as e:
+                    record_result(project_path, json_path, error=e)
+                else:
+                    record_result(project_path, json_path, timings)
+        return results
+    finally:
+        if journal:
+            journal.close()
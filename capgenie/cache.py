@@ -0,0 +1,169 @@
+"""
+Process-wide cache of parsed CapCut drafts.
+
+Parsed drafts are kept per path, as Timeline models (see capgenie.model), and
+validated against the file's (mtime, size, inode) on every access, so edits made by
+CapCut (or any other process) are detected and the file is re-parsed. Entries are
+evicted in LRU order once the total size of the cached files exceeds the configured
+byte budget.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .file_manager import FileManager
+from .instrumentation import count, phase
+from .model import Timeline
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _file_key(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def load_timeline(path: str) -> Timeline:
+    """Parse a draft file into its Timeline model."""
+    data = FileManager.load_json(path)
+    with phase("model"):
+        return Timeline.from_draft(data)
+
+
+class DraftCache:
+    """
+    LRU cache of parsed documents keyed by absolute path; `loader` parses a file
+    (plain JSON by default) and `copier` makes a private copy of a document.
+
+    Documents returned by load() are shared and must be treated as read-only. Callers
+    that mutate a draft use take(), which returns a document nobody else holds: the
+    cached one itself (leaving the cache) if it was never handed out by load(), a copy
+    otherwise. The edited result is put back with put() once it has been written.
+    The byte budget is measured on the size of the files on disk.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, loader: Callable[[str], Any] = FileManager.load_json,
+                 copier: Callable[[Any], Any] = copy.deepcopy):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.copier = copier
+        self._lock = threading.Lock()
+        # path -> [file key, document, whether load() handed the document out]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes: int):
+        """Change the byte budget; 0 disables caching."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    def load(self, path: str) -> Any:
+        """Return the parsed document at path (shared, read-only), parsing it on a miss."""
+        return self._get(path, take=False)
+
+    def take(self, path: str) -> Any:
+        """Return a private document of path for mutation (see the class docstring)."""
+        return self._get(path, take=True)
+
+    def put(self, path: str, data: Any):
+        """Record `data` as the current content of the file just written at path."""
+        path = os.path.abspath(path)
+        key = _file_key(path)
+        with self._lock:
+            self._drop(path)
+            if key is None or key[1] > self.max_bytes:
+                return
+            self._entries[path] = [key, data, False]
+            self._bytes += key[1]
+            self._evict()
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._drop(os.path.abspath(path))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _get(self, path: str, take: bool) -> Any:
+        path = os.path.abspath(path)
+        key = _file_key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and key is not None and entry[0] == key:
+                self.hits += 1
+                count("cache_hits")
+                if take and not entry[2]:
+                    self._drop(path)
+                    return entry[1]
+                self._entries.move_to_end(path)
+                if not take:
+                    entry[2] = True
+                    return entry[1]
+                shared = entry[1]
+            else:
+                shared = None
+                if entry is not None:
+                    self.invalidations += 1
+                    self._drop(path)
+                self.misses += 1
+        if shared is not None:
+            # Copied outside the lock: shared documents are never mutated
+            count("cache_copies")
+            return self.copier(shared)
+        count("cache_misses")
+        data = self.loader(path)
+        if not take and key is not None and key == _file_key(path):
+            with self._lock:
+                if key[1] <= self.max_bytes and path not in self._entries:
+                    self._entries[path] = [key, data, True]
+                    self._bytes += key[1]
+                    self._evict()
+        return data
+
+    def _drop(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[0][1]
+
+    def _evict(self):
+        while self._entries and self._bytes > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry[0][1]
+            self.evictions += 1
+
+
+draft_cache = DraftCache(loader=load_timeline, copier=Timeline.copy)
+
+
+def configure(max_bytes: int):
+    """Set the byte budget of the shared draft cache (0 disables it)."""
+    draft_cache.configure(max_bytes)
+
+
+def stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters of the shared draft cache."""
+    return draft_cache.stats()
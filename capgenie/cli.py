@@ -0,0 +1,132 @@
+"""
+Command line interface of capgenie.
+
+    capgenie bulk MANIFEST [--journal FILE] [--workers N] [--backup copy|link|none]
+    capgenie apply PROJECT [OPS.jsonl | -] [--atomic] [--create] [--backup copy|link|none]
+    capgenie serve [--host HOST] [--port PORT | --socket PATH] [--flush-interval SECONDS]
+    capgenie watch PROJECT... [--export-name NAME] [--debounce SECONDS] [--poll [--interval SECONDS]] [--initial]
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+
+def _cmd_bulk(args) -> int:
+    from .bulk import load_manifest, run_bulk
+
+    def report(record):
+        print(json.dumps(record), flush=True)
+
+    results = run_bulk(load_manifest(args.manifest), journal_path=args.journal, max_workers=args.workers,
+                       backup=args.backup, overwrite=args.overwrite, on_result=report,
+                       dedup_materials=args.dedup_materials)
+    failed = sum(1 for r in results if r["status"] == "error")
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+    print(f"{len(results) - failed - skipped} ok, {skipped} skipped, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _cmd_apply(args) -> int:
+    from .ops import apply_operations
+    from .project_editor import Project
+
+    project = Project(args.project, os.path.join(args.project, "simplified.json"), create=args.create,
+                      locking="lock" if args.lock else None, lock_timeout=args.lock_timeout)
+    stream = sys.stdin if args.ops == "-" else open(args.ops, 'r', encoding='utf-8')
+    applied = failed = 0
+    try:
+        for record in apply_operations(project, stream, backup=args.backup, atomic=args.atomic):
+            print(json.dumps(record), flush=True)
+            if record["ok"]:
+                applied += 1
+            else:
+                failed += 1
+    except Exception:
+        if not (args.atomic and failed):
+            raise
+        print(f"aborted at the first failure: nothing committed ({applied} operations discarded)", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"{applied} applied, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _cmd_serve(args) -> int:
+    from .server import serve
+
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"capgenie daemon listening on {where}", file=sys.stderr, flush=True)
+    serve(args.host, args.port, socket_path=args.socket, flush_interval=args.flush_interval, verbose=args.verbose)
+    return 0
+
+
+def _cmd_watch(args) -> int:
+    from .watch import DraftWatcher
+
+    def report(event):
+        print(json.dumps(event), flush=True)
+
+    watcher = DraftWatcher(args.projects, on_event=report, export_name=args.export_name, debounce=args.debounce,
+                           backend="poll" if args.poll else "auto", poll_interval=args.interval,
+                           initial_export=args.initial)
+    print(f"capgenie watching {len(watcher.projects)} project(s) ({watcher.backend})", file=sys.stderr, flush=True)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="capgenie", description="Programmatic editing of CapCut projects.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bulk = commands.add_parser("bulk", help="create and sync many drafts from a manifest over a process pool")
+    bulk.add_argument("manifest", help="JSON array of {project_path, json_path} objects or [project_path, json_path] pairs")
+    bulk.add_argument("--journal", help="JSON Lines journal used to resume an interrupted batch")
+    bulk.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 1 = in-process)")
+    bulk.add_argument("--backup", choices=["copy", "link", "none"], default="copy", help="how draft_content.json.bak is written")
+    bulk.add_argument("--overwrite", action="store_true", help="re-create existing project folders from the template")
+    bulk.add_argument("--dedup-materials", action="store_true", help="share one material per media file between segments")
+    bulk.set_defaults(handler=_cmd_bulk)
+
+    apply = commands.add_parser("apply", help="apply a JSON Lines stream of timeline operations in one edit session")
+    apply.add_argument("project", help="CapCut project folder")
+    apply.add_argument("ops", nargs="?", default="-", help="JSON Lines file of operations (default: stdin)")
+    apply.add_argument("--atomic", action="store_true", help="stop at the first failed operation and commit nothing")
+    apply.add_argument("--create", action="store_true", help="create the project from the template if it does not exist")
+    apply.add_argument("--backup", choices=["copy", "link", "none"], default="copy", help="how draft_content.json.bak is written")
+    apply.add_argument("--lock", action="store_true", help="hold the project lock while the stream is applied")
+    apply.add_argument("--lock-timeout", type=float, default=None, help="seconds to wait for the project lock")
+    apply.set_defaults(handler=_cmd_apply)
+
+    serve = commands.add_parser("serve", help="run a local daemon keeping projects in memory (JSON RPC over HTTP)")
+    serve.add_argument("--host", default="127.0.0.1", help="TCP address to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+    serve.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    serve.add_argument("--flush-interval", type=float, default=0.5, help="write-behind debounce interval in seconds")
+    serve.add_argument("--verbose", action="store_true", help="log every request to stderr")
+    serve.set_defaults(handler=_cmd_serve)
+
+    watch = commands.add_parser("watch", help="re-export the simplified JSON of projects when CapCut saves them (JSON Lines events)")
+    watch.add_argument("projects", nargs="+", help="CapCut project folders")
+    watch.add_argument("--export-name", default="simplified.json", help="simplified JSON written in each project folder")
+    watch.add_argument("--debounce", type=float, default=0.5, help="quiet time in seconds after a burst of writes")
+    watch.add_argument("--poll", action="store_true", help="poll file metadata instead of using inotify")
+    watch.add_argument("--interval", type=float, default=1.0, help="polling interval in seconds")
+    watch.add_argument("--initial", action="store_true", help="export every project once at start")
+    watch.set_defaults(handler=_cmd_watch)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+JSON codec used for every read and write made by capgenie.
+
+The fastest installed backend is picked automatically (orjson, then ujson, then the
+standard library). configure() switches the backend or enables compact (no indent)
+output for draft_content.json for the whole package.
+"""
+import json
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - depends on the environment
+    ujson = None
+
+BACKENDS = ("orjson", "ujson", "json")
+
+_settings: Dict[str, Any] = {
+    "backend": None,        # None = auto-detect
+    "compact_drafts": False,
+}
+
+
+def available_backends():
+    """Return the names of the JSON backends importable in this interpreter, fastest first."""
+    installed = {"orjson": orjson is not None, "ujson": ujson is not None, "json": True}
+    return [name for name in BACKENDS if installed[name]]
+
+
+def configure(backend: Optional[str] = None, compact_drafts: Optional[bool] = None):
+    """
+    Change the package-wide codec settings. Arguments left to None keep their value.
+    :param backend: "orjson", "ujson", "json" or "auto"
+    :param compact_drafts: write draft_content.json (and its .bak) without indentation
+    """
+    if backend is not None:
+        if backend == "auto":
+            _settings["backend"] = None
+        elif backend not in available_backends():
+            raise ValueError(f"JSON backend {backend!r} is not available (installed: {available_backends()}).")
+        else:
+            _settings["backend"] = backend
+    if compact_drafts is not None:
+        _settings["compact_drafts"] = bool(compact_drafts)
+
+
+def backend_name() -> str:
+    """Name of the backend currently in use."""
+    return _settings["backend"] or available_backends()[0]
+
+
+def compact_drafts() -> bool:
+    return _settings["compact_drafts"]
+
+
+def loads(raw: Union[bytes, str]) -> Any:
+    name = backend_name()
+    if name == "orjson":
+        return orjson.loads(raw)
+    if name == "ujson":
+        return ujson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(data: Any, compact: bool = False) -> bytes:
+    """
+    Serialize `data` to UTF-8 bytes, indented by 2 spaces unless `compact` is set.
+    """
+    name = backend_name()
+    if name == "orjson":
+        return orjson.dumps(data) if compact else orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    if name == "ujson":
+        return ujson.dumps(data, indent=0 if compact else 2, escape_forward_slashes=False).encode("utf-8")
+    if compact:
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def clone(data: Any) -> Any:
+    """
+    Deep copy of a JSON document through the codec (much faster than copy.deepcopy
+    for large drafts with orjson).
+    """
+    return loads(dumps(data, compact=True))
@@ -1,8 +1,12 @@
 import os
-import json
+import shutil
+import threading
 from pathlib import Path
 from typing import Any, Dict
 
+from . import codec
+from .instrumentation import count, phase
+
 class FileManager:
     @staticmethod
     def ensure_dir(path: str):
@@ -11,21 +15,94 @@ class FileManager:
     @staticmethod
     def ensure_file(path: str, default_content: Any = None):
         if not os.path.exists(path):
+            if isinstance(default_content, dict):
+                FileManager.save_json(path, default_content)
+                return
             with open(path, 'w', encoding='utf-8') as f:
                 if default_content is not None:
-                    if isinstance(default_content, dict):
-                        json.dump(default_content, f, indent=2)
-                    else:
-                        f.write(str(default_content))
+                    f.write(str(default_content))
                 else:
                     f.write('')
 
     @staticmethod
     def load_json(path: str) -> Dict:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with phase("read"):
+            with open(path, 'rb') as f:
+                raw = f.read()
+        count("bytes_read", len(raw))
+        with phase("parse"):
+            return codec.loads(raw)
+
+    @staticmethod
+    def save_json(path: str, data: Dict, compact: bool = False):
+        """
+        Write `data` as JSON through the configured codec (see capgenie.codec).
+        :param compact: write without indentation
+        """
+        with phase("serialize"):
+            raw = codec.dumps(data, compact=compact)
+        FileManager.write_bytes(path, raw)
+
+    @staticmethod
+    def write_bytes(path: str, raw: bytes):
+        """
+        Atomically replace `path` with `raw`: the bytes go to a temporary file in the same
+        folder, synced to disk, which is then renamed over the target, so a crash never leaves
+        a partial file. On POSIX the folder is synced too, making the rename itself durable.
+        """
+        tmp = FileManager._temp_name(path)
+        try:
+            with phase("write"):
+                with open(tmp, 'wb') as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, path)
+                FileManager._sync_dir(os.path.dirname(os.path.abspath(path)))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        count("bytes_written", len(raw))
 
     @staticmethod
-    def save_json(path: str, data: Dict):
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+    def _sync_dir(folder: str):
+        # Directories cannot be opened for fsync on Windows, where the rename is durable as is
+        if os.name != 'posix':
+            return
+        fd = os.open(folder, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _temp_name(path: str) -> str:
+        return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+    @staticmethod
+    def mirror_file(src: str, dst: str, mode: str = "copy"):
+        """
+        Make dst hold the same bytes as src. mode is "copy", "link" (hardlink, falling
+        back to a copy when the filesystem refuses it) or "none" (leave dst untouched).
+        """
+        if mode == "none":
+            return
+        if mode not in ("copy", "link"):
+            raise ValueError(f"Unknown mirror mode {mode!r} (expected 'copy', 'link' or 'none').")
+        tmp = FileManager._temp_name(dst)
+        try:
+            with phase("mirror"):
+                if mode == "link":
+                    try:
+                        os.link(src, tmp)
+                    except OSError:
+                        shutil.copyfile(src, tmp)
+                else:
+                    shutil.copyfile(src, tmp)
+                os.replace(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        count("files_mirrored")
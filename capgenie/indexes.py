@@ -0,0 +1,270 @@
+"""
+Lookup indexes over a CapCut draft: materials by media path or by id, segments by id
+(PositionIndex) and by time (IntervalIndex).
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class PathMaterialIndex:
+    """
+    Maps (category, material_name) to a material id for the per-media helper materials
+    (canvases, speeds, placeholder_infos) that sync_from_json reuses across sequences.
+    The index is built once from the draft and kept up to date as entries are appended,
+    so each lookup is O(1) instead of a scan of the whole category.
+    `hits` and `misses` count the get_or_create() calls that reused or appended an entry.
+    """
+
+    def __init__(self, materials: Dict, categories: Iterable[str]):
+        self.materials = materials
+        self.hits = 0
+        self.misses = 0
+        self._index: Dict[str, Dict[str, str]] = {}
+        for category in categories:
+            by_name = {}
+            for entry in materials.get(category, []):
+                name = entry.get('material_name', None)
+                if entry.get('id') and name not in by_name:
+                    by_name[name] = entry['id']
+            self._index[category] = by_name
+
+    def get(self, category: str, name: str):
+        return self._index.get(category, {}).get(name)
+
+    def get_or_create(self, category: str, name: str, factory: Callable[[], Dict]) -> str:
+        """
+        Return the id of the entry of `category` named `name`, appending factory() to the
+        draft (and to the index) when there is none yet.
+        """
+        by_name = self._index.setdefault(category, {})
+        mat_id = by_name.get(name)
+        if mat_id:
+            self.hits += 1
+            return mat_id
+        self.misses += 1
+        entry = factory()
+        self.materials.setdefault(category, []).append(entry)
+        by_name[name] = entry['id']
+        return entry['id']
+
+
+class MaterialIdIndex:
+    """
+    Maps material ids to their entry across every `materials.*` category of a draft,
+    plus an index of materials.audio_fades keyed by id (audio materials share their
+    id with their fade). Built in one pass over the materials section.
+    """
+
+    def __init__(self, materials: Dict):
+        self._by_id: Dict[str, tuple] = {}
+        self.fades: Dict[str, Dict] = {}
+        for category, entries in materials.items():
+            if not isinstance(entries, list):
+                continue
+            for entry in entries:
+                if not isinstance(entry, dict) or 'id' not in entry:
+                    continue
+                if category == 'audio_fades':
+                    self.fades.setdefault(entry['id'], entry)
+                else:
+                    self._by_id.setdefault(entry['id'], (category, entry))
+
+    def get(self, mat_id: str, category: str = None):
+        """
+        Return the material with id `mat_id`, or None. When `category` is given, only a
+        material of that category matches.
+        """
+        found = self._by_id.get(mat_id)
+        if found is None or (category is not None and found[0] != category):
+            return None
+        return found[1]
+
+    def fade_for(self, mat_id: str):
+        return self.fades.get(mat_id)
+
+
+class PositionIndex:
+    """
+    Maps the segment ids of one track to their position in the track's columns, kept up
+    to date as segments are appended and deleted. Each id gets an ordinal, its position
+    when indexed or appended; deleting a segment records its ordinal, so the position of
+    an id is its ordinal minus the deleted ordinals before it: O(log n) per lookup and per
+    deletion, instead of rescanning the ids. `unique` is False when the ids have duplicates,
+    which the index cannot represent.
+    """
+
+    def __init__(self, ids: Iterable[str]):
+        self.ordinals: Dict[str, int] = {}
+        count = 0
+        for count, seg_id in enumerate(ids, 1):
+            self.ordinals.setdefault(seg_id, count - 1)
+        self.unique = len(self.ordinals) == count
+        self.deleted: List[int] = []
+        self.next = count
+
+    def position(self, seg_id: str) -> Optional[int]:
+        ordinal = self.ordinals.get(seg_id)
+        if ordinal is None:
+            return None
+        return ordinal - bisect_left(self.deleted, ordinal)
+
+    def add(self, seg_id: str) -> bool:
+        """Record a segment appended to the track. Returns False when its id is already indexed."""
+        if seg_id in self.ordinals:
+            self.unique = False
+            return False
+        self.ordinals[seg_id] = self.next
+        self.next += 1
+        return True
+
+    def remove(self, seg_id: str):
+        """Record the deletion of a segment from the track."""
+        insort(self.deleted, self.ordinals.pop(seg_id))
+
+
+class IntervalIndex:
+    """
+    Interval index over the target ranges of one track's segments.
+
+    Segments are kept sorted by start time together with the running maximum of their
+    end times, so a query binary-searches the last segment starting before the point or
+    range of interest, then walks back only while earlier segments can still reach it.
+    On a track without overlaps that is O(log n + results). Times are in microseconds;
+    results are positions in the track's columns.
+    """
+
+    def __init__(self, starts: Iterable[int], durations: Iterable[int]):
+        rows = sorted(zip(starts, durations, range(len(starts))))
+        self.positions = array('q', [p for _, _, p in rows])
+        self.starts = array('q', [s for s, _, _ in rows])
+        self.ends = array('q', [s + d for s, d, _ in rows])
+        self.max_end = array('q')
+        running = None
+        for end in self.ends:
+            running = end if running is None or end > running else running
+            self.max_end.append(running)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def copy(self) -> "IntervalIndex":
+        index = IntervalIndex.__new__(IntervalIndex)
+        index.positions, index.starts, index.ends, index.max_end = \
+            self.positions[:], self.starts[:], self.ends[:], self.max_end[:]
+        return index
+
+    def add(self, position: int, start: int, duration: int) -> bool:
+        """
+        Record a segment appended to the track. Returns False when it does not start after
+        every indexed segment, in which case the index must be rebuilt.
+        """
+        if self.starts and start < self.starts[-1]:
+            return False
+        end = start + duration
+        self.positions.append(position)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.max_end.append(max(end, self.max_end[-1]) if self.max_end else end)
+        return True
+
+    def insert(self, position: int, start: int, duration: int):
+        """Record a segment whose target range was set, wherever it starts: O(log n) search plus the shift of the arrays."""
+        end = start + duration
+        k = bisect_left(self.starts, start)
+        starts, ends, positions = self.starts, self.ends, self.positions
+        # Same order as a rebuilt index: (start, end, position)
+        while k < len(starts) and starts[k] == start and (ends[k], positions[k]) < (end, position):
+            k += 1
+        positions.insert(k, position)
+        starts.insert(k, start)
+        ends.insert(k, end)
+        self.max_end.insert(k, end)
+        self._refresh_max_end(k)
+
+    def discard(self, position: int, start: int) -> bool:
+        """
+        Forget the segment at `position`, indexed with the target start `start`. Returns False
+        when it is not found, in which case the index must be rebuilt. Positions of the other
+        segments are left as is (see renumber).
+        """
+        k = bisect_left(self.starts, start)
+        while k < len(self.starts) and self.starts[k] == start:
+            if self.positions[k] == position:
+                del self.positions[k]
+                del self.starts[k]
+                del self.ends[k]
+                del self.max_end[k]
+                self._refresh_max_end(k)
+                return True
+            k += 1
+        return False
+
+    def renumber(self, removed: List[int]):
+        """Shift the positions after the segments at `removed` (ascending, already discarded) were deleted from the track."""
+        if removed:
+            self.positions = array('q', [p - bisect_left(removed, p) for p in self.positions])
+
+    def _refresh_max_end(self, k: int):
+        # Recompute the running maximum from row k on, stopping as soon as it matches the stored one
+        ends, max_end = self.ends, self.max_end
+        running = max_end[k - 1] if k else None
+        for j in range(k, len(ends)):
+            value = ends[j] if running is None or ends[j] > running else running
+            if max_end[j] == value and j > k:
+                break
+            max_end[j] = running = value
+
+    def at(self, t: int) -> List[int]:
+        """Positions of the segments playing at t (start <= t < end), by start time."""
+        return self._reaching(bisect_right(self.starts, t) - 1, t)
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Positions of the segments intersecting [start, end), by start time."""
+        if end <= start:
+            return self.at(start) if end == start else []
+        return self._reaching(bisect_left(self.starts, end) - 1, start)
+
+    def _reaching(self, k: int, t: int) -> List[int]:
+        found = []
+        ends, max_end = self.ends, self.max_end
+        while k >= 0 and max_end[k] > t:
+            if ends[k] > t:
+                found.append(k)
+            k -= 1
+        return [self.positions[k] for k in reversed(found)]
+
+    def overlaps(self) -> List[Tuple[int, int, int, int]]:
+        """Every pair of overlapping segments as (position_a, position_b, start, end) of the shared range."""
+        pairs = []
+        active: List[int] = []
+        for k in range(len(self.positions)):
+            start = self.starts[k]
+            active = [a for a in active if self.ends[a] > start]
+            for a in active:
+                pairs.append((self.positions[a], self.positions[k], start, min(self.ends[a], self.ends[k])))
+            active.append(k)
+        return pairs
+
+    def gaps(self, start: int = 0, end: Optional[int] = None, min_gap: int = 1) -> List[Tuple[int, int]]:
+        """
+        Uncovered ranges (start, end) between `start` and `end` (default: the end of the last
+        segment) that last at least min_gap microseconds.
+        """
+        limit = self.end() if end is None else end
+        found = []
+        cursor = start
+        for k in range(bisect_left(self.max_end, start + 1), len(self.positions)):
+            seg_start = self.starts[k]
+            if seg_start >= limit:
+                break
+            if seg_start - cursor >= min_gap:
+                found.append((cursor, seg_start))
+            cursor = max(cursor, self.ends[k])
+        if limit - cursor >= min_gap:
+            found.append((cursor, limit))
+        return found
+
+    def end(self) -> int:
+        """End of the last segment (0 for an empty track)."""
+        return self.max_end[-1] if self.max_end else 0
@@ -0,0 +1,154 @@
+"""
+Lightweight instrumentation of capgenie operations.
+
+Every public Project operation runs inside an operation span that collects per-phase
+timers (read, parse, build, serialize, write...) and counters (bytes read and written,
+segments and materials processed, cache and index hits). The span is tracked in a
+contextvar, so the file and cache layers add to whichever operation is running in the
+current thread or task, without any parameter threading. After the call the stats are
+available as `project.last_stats`.
+
+Finished operations are passed to the hooks registered with add_hook() and logged at
+DEBUG level on the "capgenie.stats" logger. Applications can open their own spans
+with operation(); capgenie operations started inside it are merged into it.
+
+Outside of an operation, phase() and count() are no-ops.
+"""
+import functools
+import logging
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("capgenie.stats")
+
+_current: ContextVar[Optional["OperationStats"]] = ContextVar("capgenie_operation", default=None)
+_hooks: List[Callable[["OperationStats"], None]] = []
+
+
+class OperationStats:
+    """Timers and counters collected during one operation."""
+
+    def __init__(self, name: str, parent: Optional["OperationStats"] = None):
+        self.name = name
+        self.parent = parent
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.elapsed_s = 0.0
+        self.error: Optional[str] = None
+
+    def add_time(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def incr(self, counter: str, n: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def as_dict(self) -> Dict:
+        return {"operation": self.name, "elapsed_s": self.elapsed_s, "phases": dict(self.phases),
+                "counters": dict(self.counters), "error": self.error}
+
+    def __repr__(self):
+        phases = ", ".join(f"{k}={v * 1000:.2f}ms" for k, v in self.phases.items())
+        counters = ", ".join(f"{k}={v}" for k, v in self.counters.items())
+        return f"<OperationStats {self.name} {self.elapsed_s * 1000:.2f}ms [{phases}] [{counters}]>"
+
+
+class operation:
+    """
+    Span of one operation: `with operation("sync") as stats: ...`. A span opened inside
+    another one is merged into its parent when it ends.
+    """
+
+    def __init__(self, name: str):
+        self.stats = OperationStats(name, _current.get())
+        self._token = None
+        self._start = 0.0
+
+    def __enter__(self) -> OperationStats:
+        self._token = _current.set(self.stats)
+        self._start = time.perf_counter()
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb):
+        stats = self.stats
+        stats.elapsed_s = time.perf_counter() - self._start
+        _current.reset(self._token)
+        if exc_type is not None:
+            stats.error = f"{exc_type.__name__}: {exc}"
+        parent = stats.parent
+        if parent is not None:
+            for phase, seconds in stats.phases.items():
+                parent.add_time(phase, seconds)
+            for counter, n in stats.counters.items():
+                parent.incr(counter, n)
+        _emit(stats)
+        return False
+
+
+class phase:
+    """Time a block into the current operation's `name` phase: `with phase("parse"): ...`."""
+
+    __slots__ = ("name", "_stats", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._stats = _current.get()
+        if self._stats is not None:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._stats is not None:
+            self._stats.add_time(self.name, time.perf_counter() - self._start)
+        return False
+
+
+def count(counter: str, n: int = 1):
+    """Add n to a counter of the current operation, if any."""
+    stats = _current.get()
+    if stats is not None:
+        stats.incr(counter, n)
+
+
+def current() -> Optional[OperationStats]:
+    """Stats of the operation running in this context, or None."""
+    return _current.get()
+
+
+def add_hook(callback: Callable[[OperationStats], None]):
+    """Call `callback(stats)` whenever an operation (or a nested span) ends."""
+    _hooks.append(callback)
+
+
+def remove_hook(callback: Callable[[OperationStats], None]):
+    _hooks.remove(callback)
+
+
+def _emit(stats: OperationStats):
+    for hook in list(_hooks):
+        try:
+            hook(stats)
+        except Exception:
+            logger.exception("Instrumentation hook %r failed", hook)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%r", stats)
+
+
+def instrumented(name: str):
+    """
+    Decorator for Project methods: run the call as operation `name` and store its stats
+    in `self.last_stats`.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            span = operation(name)
+            try:
+                with span:
+                    return fn(self, *args, **kwargs)
+            finally:
+                self.last_stats = span.stats
+        return wrapper
+    return decorate
@@ -0,0 +1,122 @@
+"""
+Cross-process coordination of draft editors.
+
+Two modes are offered to Project (see its `locking` argument):
+
+- "lock": every edit session holds an exclusive advisory lock on the project's lock file
+  from the moment it loads the draft until it has written it back, so read-modify-write
+  cycles of different processes (or threads) never interleave.
+- "optimistic": sessions load without locking and record the version of
+  draft_content.json (inode, size, mtime). The commit takes the lock only around a
+  version check and the write, and raises ConcurrentModificationError when the file
+  changed in between; Project operations can re-apply themselves on a fresh draft.
+  Since it only looks at the file, it also notices writes by programs that ignore the
+  lock, such as CapCut itself.
+
+The lock is fcntl.flock() on POSIX and msvcrt.locking() on Windows, on a dedicated
+`.capgenie.lock` file: CapCut's own files are never locked. Every capgenie write goes
+through an atomic rename, which always changes the inode, so the version check also
+catches rewrites of the same size within the mtime resolution.
+"""
+import os
+import time
+from typing import Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_FILE = ".capgenie.lock"
+LOCKING_MODES = (None, "lock", "optimistic")
+
+Version = Tuple[int, int, int]
+
+
+class LockTimeout(TimeoutError):
+    """The project lock could not be acquired within the timeout."""
+
+
+class ConcurrentModificationError(RuntimeError):
+    """The draft changed on disk after the edit session loaded it."""
+
+
+class ProjectLock:
+    """
+    Exclusive advisory lock on `<project>/.capgenie.lock`, held by one holder at a time
+    across processes and threads. Use as a context manager.
+    """
+
+    def __init__(self, project_path: str, timeout: Optional[float] = None, poll_interval: float = 0.01):
+        self.path = os.path.join(str(project_path), LOCK_FILE)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self):
+        if self._fd is not None:
+            raise RuntimeError(f"{self.path} is already held by this lock.")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if self.timeout is None and fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                deadline = time.monotonic() + (self.timeout if self.timeout is not None else float("inf"))
+                while not _try_lock(fd):
+                    if time.monotonic() >= deadline:
+                        raise LockTimeout(f"Could not lock {self.path} within {self.timeout} s.")
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def _try_lock(fd: int) -> bool:
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    try:  # pragma: no cover - Windows
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:  # pragma: no cover
+        return False
+    return True  # pragma: no cover
+
+
+def file_version(path: str) -> Optional[Version]:
+    """Version of a file: (inode, size, mtime in ns), or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
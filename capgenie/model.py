@@ -0,0 +1,1002 @@
+"""
+Compact in-memory model of a CapCut timeline.
+
+A parsed draft_content.json is a tree of small dicts: every segment costs a dozen dict,
+int and float objects. The Timeline keeps each track as columns instead: the timing of
+its segments lives in array('q') columns of microseconds (start, duration, source start,
+source duration, fades), the other fields in parallel lists, and the video and audio
+materials are __slots__ objects. Fields capgenie does not model are kept as raw
+passthrough and written back unchanged, as are all the other parts of the draft.
+
+Conversion happens only at the I/O boundary: Timeline.from_draft() after parsing and
+Timeline.to_draft() before serializing. from_draft() never mutates the parsed draft, so
+it can be used on shared documents of the draft cache.
+"""
+import hashlib
+import uuid
+from array import array
+from collections import Counter
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from .indexes import IntervalIndex, PositionIndex
+
+# materials.* category holding the main material of each exported track type
+TRACK_MATERIAL_CATEGORIES = {'video': 'videos', 'audio': 'audios'}
+
+
+class _Absent:
+    """Marker of a material field missing from the draft (distinct from an explicit null)."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "ABSENT"
+
+
+ABSENT = _Absent()
+
+# Presence flags of the optional segment fields
+_MATERIAL, _SOURCE, _VOLUME, _FADE_IN, _FADE_OUT, _REFS, _RAW = 1, 2, 4, 8, 16, 32, 64
+_ALL_FIELDS = _MATERIAL | _SOURCE | _VOLUME | _FADE_IN | _FADE_OUT | _REFS
+_RANGE_KEYS = {'start', 'duration'}
+_FADE_KEYS = {'duration'}
+# Segment fields written by capgenie (with and without extra_material_refs)
+_STANDARD_KEYS = {'id', 'material_id', 'target_timerange', 'source_timerange', 'volume', 'fade_in', 'fade_out',
+                  'extra_material_refs'}
+_STANDARD_KEYS_NO_REFS = _STANDARD_KEYS - {'extra_material_refs'}
+
+
+def new_id() -> str:
+    return str(uuid.uuid4()).upper()
+
+
+def _is_int(value) -> bool:
+    return type(value) is int
+
+
+def _is_range(value) -> bool:
+    return (isinstance(value, dict) and value.keys() == _RANGE_KEYS
+            and _is_int(value['start']) and _is_int(value['duration']))
+
+
+class Material:
+    """
+    A video or audio material. Modeled fields that are missing from the draft hold
+    ABSENT and are not written back; other fields are kept in `extra`.
+    """
+
+    __slots__ = ('id', 'path', 'duration', 'name', 'volume', 'width', 'height', 'type', 'audio_fade', 'extra')
+    # JSON keys of the modeled fields (material_name is the `name` attribute)
+    _KEYS = frozenset(('id', 'path', 'duration', 'material_name', 'volume', 'width', 'height', 'type', 'audio_fade'))
+
+    def __init__(self, id, path=ABSENT, duration=ABSENT, name=ABSENT, volume=ABSENT, type=ABSENT,
+                 width=ABSENT, height=ABSENT, audio_fade=ABSENT, extra: Optional[Dict] = None):
+        self.id = id
+        self.path = path
+        self.duration = duration
+        self.name = name
+        self.volume = volume
+        self.width = width
+        self.height = height
+        self.type = type
+        self.audio_fade = audio_fade
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, entry: Dict) -> "Material":
+        get = entry.get
+        mat = cls.__new__(cls)
+        mat.id = get('id', ABSENT)
+        mat.path = get('path', ABSENT)
+        mat.duration = get('duration', ABSENT)
+        mat.name = get('material_name', ABSENT)
+        mat.volume = get('volume', ABSENT)
+        mat.width = get('width', ABSENT)
+        mat.height = get('height', ABSENT)
+        mat.type = get('type', ABSENT)
+        mat.audio_fade = get('audio_fade', ABSENT)
+        if entry.keys() <= cls._KEYS:
+            mat.extra = None
+        else:
+            mat.extra = {k: v for k, v in entry.items() if k not in cls._KEYS}
+        return mat
+
+    def to_dict(self) -> Dict:
+        out = {}
+        if self.id is not ABSENT:
+            out['id'] = self.id
+        if self.path is not ABSENT:
+            out['path'] = self.path
+        if self.duration is not ABSENT:
+            out['duration'] = self.duration
+        if self.name is not ABSENT:
+            out['material_name'] = self.name
+        if self.volume is not ABSENT:
+            out['volume'] = self.volume
+        if self.width is not ABSENT:
+            out['width'] = self.width
+        if self.height is not ABSENT:
+            out['height'] = self.height
+        if self.type is not ABSENT:
+            out['type'] = self.type
+        if self.audio_fade is not ABSENT:
+            out['audio_fade'] = self.audio_fade
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def copy(self) -> "Material":
+        mat = Material.__new__(Material)
+        for attr in self.__slots__:
+            setattr(mat, attr, getattr(self, attr))
+        return mat
+
+    def get(self, attr: str, default=None):
+        """Value of a modeled field, or default when it is missing (or null)."""
+        value = getattr(self, attr)
+        return default if value is ABSENT or value is None else value
+
+
+class Track:
+    """
+    A track whose segments are stored column-wise. Segment i is described by
+    ids[i], material_ids[i], starts[i], durations[i], source_starts[i], source_durations[i],
+    volumes[i], fade_ins[i], fade_outs[i] and refs[i] (extra_material_refs); flags[i] records
+    which optional fields the segment has and extras[i] holds its unmodeled fields.
+    Segments with a non-standard shape are kept whole in extras[i] (flag _RAW).
+
+    Timings must be changed through the methods below (append, set_target, keep...), which
+    keep the track's IntervalIndex and PositionIndex in step.
+    """
+
+    # Per-segment columns, in the order of __slots__
+    _COLUMNS = ('ids', 'material_ids', 'starts', 'durations', 'source_starts', 'source_durations',
+                'volumes', 'fade_ins', 'fade_outs', 'refs', 'flags', 'extras')
+    __slots__ = ('header',) + _COLUMNS + ('_intervals', '_positions')
+
+    def __init__(self, header: Optional[Dict] = None):
+        # Track fields other than its segments, in their original order
+        self.header = header if header is not None else {}
+        self.ids: List[str] = []
+        self.material_ids: List[Optional[str]] = []
+        self.starts = array('q')
+        self.durations = array('q')
+        self.source_starts = array('q')
+        self.source_durations = array('q')
+        self.volumes = array('d')
+        self.fade_ins = array('q')
+        self.fade_outs = array('q')
+        self.refs: List[Optional[list]] = []
+        self.flags = array('B')
+        self.extras: List[Optional[Dict]] = []
+        self._intervals: Optional[IntervalIndex] = None
+        self._positions: Optional[PositionIndex] = None
+
+    @property
+    def type(self) -> str:
+        return self.header.get('type', 'video')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_dict(cls, track: Dict) -> "Track":
+        header = {k: (None if k == 'segments' else v) for k, v in track.items()}
+        segments = track.get('segments') or ()
+        try:
+            return cls._from_standard(header, segments)
+        except (TypeError, OverflowError):
+            # Non-integer timings somewhere: per-segment path, which keeps such segments raw
+            columns = cls(header)
+            for seg in segments:
+                columns.append_dict(seg)
+            return columns
+
+    @classmethod
+    def _from_standard(cls, header: Dict, segments) -> "Track":
+        """
+        Fast path of from_dict: segments with exactly the fields capgenie writes are
+        unpacked inline into plain lists, turned into arrays at the end; the others go
+        through append_dict. Raises TypeError when a timing is not an integer.
+        """
+        columns = cls(header)
+        ids, material_ids, refs, extras = columns.ids, columns.material_ids, columns.refs, columns.extras
+        starts, durations, source_starts, source_durations = [], [], [], []
+        volumes, fade_ins, fade_outs, flags = [], [], [], []
+        for seg in segments:
+            keys = seg.keys() if type(seg) is dict else None
+            if keys == _STANDARD_KEYS or keys == _STANDARD_KEYS_NO_REFS:
+                target, source = seg['target_timerange'], seg['source_timerange']
+                fade_in, fade_out, volume = seg['fade_in'], seg['fade_out'], seg['volume']
+                seg_refs = seg.get('extra_material_refs')
+                if (type(target) is dict and target.keys() == _RANGE_KEYS
+                        and type(source) is dict and source.keys() == _RANGE_KEYS
+                        and type(fade_in) is dict and fade_in.keys() == _FADE_KEYS
+                        and type(fade_out) is dict and fade_out.keys() == _FADE_KEYS
+                        and type(volume) is float and (seg_refs is None or type(seg_refs) is list)):
+                    ids.append(seg['id'])
+                    material_ids.append(seg['material_id'])
+                    starts.append(target['start'])
+                    durations.append(target['duration'])
+                    source_starts.append(source['start'])
+                    source_durations.append(source['duration'])
+                    volumes.append(volume)
+                    fade_ins.append(fade_in['duration'])
+                    fade_outs.append(fade_out['duration'])
+                    refs.append(seg_refs)
+                    flags.append(_ALL_FIELDS if seg_refs is not None else _ALL_FIELDS & ~_REFS)
+                    extras.append(None)
+                    continue
+            # Other shapes: flush the pending values, then the generic path
+            columns._extend(starts, durations, source_starts, source_durations, volumes, fade_ins, fade_outs, flags)
+            starts, durations, source_starts, source_durations = [], [], [], []
+            volumes, fade_ins, fade_outs, flags = [], [], [], []
+            columns.append_dict(seg)
+        columns._extend(starts, durations, source_starts, source_durations, volumes, fade_ins, fade_outs, flags)
+        return columns
+
+    def copy(self) -> "Track":
+        """Copy of the columns; the per-segment values (refs lists, extras dicts) are shared."""
+        track = Track.__new__(Track)
+        track.header = dict(self.header)
+        for name in self._COLUMNS:
+            setattr(track, name, getattr(self, name)[:])
+        track._intervals = self._intervals.copy() if self._intervals is not None else None
+        track._positions = None
+        return track
+
+    def _extend(self, starts, durations, source_starts, source_durations, volumes, fade_ins, fade_outs, flags):
+        self.starts.extend(array('q', starts))
+        self.durations.extend(array('q', durations))
+        self.source_starts.extend(array('q', source_starts))
+        self.source_durations.extend(array('q', source_durations))
+        self.volumes.extend(array('d', volumes))
+        self.fade_ins.extend(array('q', fade_ins))
+        self.fade_outs.extend(array('q', fade_outs))
+        self.flags.extend(array('B', flags))
+        self._intervals = None
+        self._positions = None
+
+    def to_dict(self) -> Dict:
+        out = dict(self.header)
+        segments = []
+        append = segments.append
+        rows = zip(self.ids, self.material_ids, self.starts, self.durations, self.source_starts, self.source_durations,
+                   self.volumes, self.fade_ins, self.fade_outs, self.refs, self.flags, self.extras)
+        for i, (seg_id, mat_id, start, duration, source_start, source_duration,
+                volume, fade_in, fade_out, refs, flags, extras) in enumerate(rows):
+            if extras is None and flags | _REFS == _ALL_FIELDS:
+                seg = {"id": seg_id, "material_id": mat_id,
+                       "target_timerange": {"start": start, "duration": duration},
+                       "source_timerange": {"start": source_start, "duration": source_duration},
+                       "volume": volume, "fade_in": {"duration": fade_in}, "fade_out": {"duration": fade_out}}
+                if flags & _REFS:
+                    seg["extra_material_refs"] = refs
+                append(seg)
+            else:
+                append(self.segment_dict(i))
+        out['segments'] = segments
+        return out
+
+    def append(self, segment_id: str, material_id: str, start: int, duration: int, source_start: int,
+               source_duration: int, volume: float, fade_in: int, fade_out: int, refs: Optional[list] = None) -> int:
+        """Append a segment with every modeled field; returns its position."""
+        flags = _MATERIAL | _SOURCE | _VOLUME | _FADE_IN | _FADE_OUT | (_REFS if refs is not None else 0)
+        self._append(segment_id, material_id, start, duration, source_start, source_duration,
+                     volume, fade_in, fade_out, refs, flags, None)
+        return len(self) - 1
+
+    def append_dict(self, seg: Dict):
+        """Append a segment from its CapCut dict."""
+        target = seg.get('target_timerange') if isinstance(seg, dict) else None
+        if not _is_range(target) or 'id' not in seg:
+            start, duration = (target['start'], target['duration']) if _is_range(target) else (0, 0)
+            self._append(seg.get('id') if isinstance(seg, dict) else None, None, start, duration,
+                         0, 0, 1.0, 0, 0, None, _RAW, seg)
+            return
+        flags = 0
+        material_id = None
+        source_start = source_duration = fade_in = fade_out = 0
+        volume = 1.0
+        refs = None
+        extras = None
+        for key, value in seg.items():
+            if key == 'id' or key == 'target_timerange':
+                continue
+            if key == 'material_id':
+                material_id = value
+                flags |= _MATERIAL
+            elif key == 'source_timerange' and _is_range(value):
+                source_start, source_duration = value['start'], value['duration']
+                flags |= _SOURCE
+            elif key == 'volume' and type(value) is float:
+                volume = value
+                flags |= _VOLUME
+            elif key == 'fade_in' and isinstance(value, dict) and value.keys() == _FADE_KEYS and _is_int(value['duration']):
+                fade_in = value['duration']
+                flags |= _FADE_IN
+            elif key == 'fade_out' and isinstance(value, dict) and value.keys() == _FADE_KEYS and _is_int(value['duration']):
+                fade_out = value['duration']
+                flags |= _FADE_OUT
+            elif key == 'extra_material_refs' and isinstance(value, list):
+                refs = value
+                flags |= _REFS
+            else:
+                if extras is None:
+                    extras = {}
+                extras[key] = value
+        self._append(seg['id'], material_id, target['start'], target['duration'], source_start, source_duration,
+                     volume, fade_in, fade_out, refs, flags, extras)
+
+    def _append(self, segment_id, material_id, start, duration, source_start, source_duration,
+                volume, fade_in, fade_out, refs, flags, extras):
+        self.ids.append(segment_id)
+        self.material_ids.append(material_id)
+        self.starts.append(start)
+        self.durations.append(duration)
+        self.source_starts.append(source_start)
+        self.source_durations.append(source_duration)
+        self.volumes.append(volume)
+        self.fade_ins.append(fade_in)
+        self.fade_outs.append(fade_out)
+        self.refs.append(refs)
+        self.flags.append(flags)
+        self.extras.append(extras)
+        if self._intervals is not None and not self._intervals.add(len(self.ids) - 1, start, duration):
+            self._intervals = None
+        if self._positions is not None and not self._positions.add(segment_id):
+            self._positions = None
+
+    def segment_dict(self, i: int) -> Dict:
+        """CapCut dict of segment i."""
+        flags = self.flags[i]
+        if flags & _RAW:
+            return self.extras[i]
+        seg = {"id": self.ids[i]}
+        if flags & _MATERIAL:
+            seg["material_id"] = self.material_ids[i]
+        seg["target_timerange"] = {"start": self.starts[i], "duration": self.durations[i]}
+        if flags & _SOURCE:
+            seg["source_timerange"] = {"start": self.source_starts[i], "duration": self.source_durations[i]}
+        if flags & _VOLUME:
+            seg["volume"] = self.volumes[i]
+        if flags & _FADE_IN:
+            seg["fade_in"] = {"duration": self.fade_ins[i]}
+        if flags & _FADE_OUT:
+            seg["fade_out"] = {"duration": self.fade_outs[i]}
+        if flags & _REFS:
+            seg["extra_material_refs"] = self.refs[i]
+        extras = self.extras[i]
+        if extras:
+            seg.update(extras)
+        return seg
+
+    # Setters of modeled fields; a raw value of the same key in extras[i] is dropped
+
+    def set_target(self, i: int, start: int, duration: int):
+        intervals = self._intervals
+        if intervals is not None:
+            if intervals.discard(i, self.starts[i]):
+                intervals.insert(i, start, duration)
+            else:
+                self._intervals = None
+        self.starts[i] = start
+        self.durations[i] = duration
+
+    def set_source(self, i: int, start: int, duration: int):
+        self.source_starts[i] = start
+        self.source_durations[i] = duration
+        self._claim(i, 'source_timerange', _SOURCE)
+
+    def set_volume(self, i: int, volume: float):
+        self.volumes[i] = volume
+        self._claim(i, 'volume', _VOLUME)
+
+    def set_fade_in(self, i: int, duration: int):
+        self.fade_ins[i] = duration
+        self._claim(i, 'fade_in', _FADE_IN)
+
+    def set_fade_out(self, i: int, duration: int):
+        self.fade_outs[i] = duration
+        self._claim(i, 'fade_out', _FADE_OUT)
+
+    def set_refs(self, i: int, refs: list):
+        self.refs[i] = refs
+        self._claim(i, 'extra_material_refs', _REFS)
+
+    def _claim(self, i: int, key: str, flag: int):
+        self.flags[i] |= flag
+        extras = self.extras[i]
+        if extras and key in extras:
+            # Copy on write: extras dicts may be shared with copies of the track
+            self.extras[i] = {k: v for k, v in extras.items() if k != key} or None
+
+    def is_media(self, i: int) -> bool:
+        """Whether segment i has the modeled shape (timing, source range, material)."""
+        return not self.flags[i] & _RAW and bool(self.flags[i] & _MATERIAL)
+
+    def volume(self, i: int, default=None):
+        """Volume of segment i, or default when the segment has none."""
+        if self.flags[i] & _VOLUME:
+            return self.volumes[i]
+        extras = self.extras[i]
+        if extras and 'volume' in extras:
+            return extras['volume']
+        return default
+
+    def has_source(self, i: int) -> bool:
+        """Whether segment i has a source_timerange."""
+        return bool(self.flags[i] & _SOURCE)
+
+    def end(self) -> int:
+        """End of the last segment in microseconds (0 when empty)."""
+        if self._intervals is not None:
+            return self._intervals.end()
+        return max(map(int.__add__, self.starts, self.durations), default=0)
+
+    def intervals(self) -> IntervalIndex:
+        """Interval index of the segments' target ranges, built on first use and kept up to date by edits."""
+        if self._intervals is None:
+            self._intervals = IntervalIndex(self.starts, self.durations)
+        return self._intervals
+
+    def position(self, segment_id: str) -> Optional[int]:
+        """Position of a segment in the columns (None if absent), through the id index."""
+        index = self._positions
+        if index is None:
+            index = PositionIndex(self.ids)
+            if not index.unique:
+                # Duplicate ids (hand-edited drafts): first match, without an index
+                return self.ids.index(segment_id) if segment_id in index.ordinals else None
+            self._positions = index
+        return index.position(segment_id)
+
+    def keep(self, positions: Iterable[int]):
+        """Keep only the segments at `positions` (in that order)."""
+        positions = list(positions)
+        self._intervals = None
+        self._positions = None
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            if isinstance(column, array):
+                setattr(self, name, array(column.typecode, [column[i] for i in positions]))
+            else:
+                setattr(self, name, [column[i] for i in positions])
+
+    def remove(self, positions: Iterable[int]):
+        """
+        Drop the segments at `positions`. A few segments are deleted in place, last position
+        first, keeping the id and interval indexes; larger batches rebuild the columns once
+        (see keep).
+        """
+        positions = sorted(set(positions), reverse=True)
+        if len(positions) * 8 > len(self):
+            dropped = set(positions)
+            self.keep(i for i in range(len(self)) if i not in dropped)
+            return
+        index, intervals = self._positions, self._intervals
+        columns = [getattr(self, name) for name in self._COLUMNS]
+        for i in positions:
+            if index is not None:
+                index.remove(self.ids[i])
+            if intervals is not None and not intervals.discard(i, self.starts[i]):
+                intervals = self._intervals = None
+            for column in columns:
+                del column[i]
+        if intervals is not None:
+            intervals.renumber(positions[::-1])
+        if index is not None and len(index.deleted) > len(index.ordinals):
+            self._positions = None
+
+    def sort_by_start(self):
+        """Reorder the segments chronologically (stable)."""
+        order = sorted(range(len(self)), key=self.starts.__getitem__)
+        if order != list(range(len(self))):
+            self.keep(order)
+
+
+class Timeline:
+    """
+    Columnar view of a draft: `tracks` (Track objects), `materials` (the videos and audios
+    categories as Material lists) and `doc`, the rest of the draft kept as parsed. The
+    other material categories (audio_fades, canvases, speeds...) stay raw lists in
+    raw_materials.
+    """
+
+    __slots__ = ('doc', 'tracks', 'materials', '_segment_index', '_material_uses', '_material_positions')
+
+    def __init__(self, doc: Dict, tracks: List[Track], materials: Dict[str, List[Material]]):
+        self.doc = doc
+        self.tracks = tracks
+        self.materials = materials
+        # Lazily built lookups, kept up to date by add_segment/remove_segment/move_segment
+        # and dropped by invalidate_index() after other structural edits
+        self._segment_index: Optional[Dict[str, Track]] = None
+        self._material_uses: Optional[Counter] = None
+        self._material_positions: Dict[str, PositionIndex] = {}
+
+    @classmethod
+    def from_draft(cls, data: Dict) -> "Timeline":
+        doc = dict(data)
+        doc['tracks'] = None
+        raw_materials = dict(data.get('materials') or {})
+        doc['materials'] = raw_materials
+        materials = {}
+        for category in TRACK_MATERIAL_CATEGORIES.values():
+            if category in raw_materials:
+                entries = raw_materials[category] or []
+                materials[category] = [Material.from_dict(m) for m in entries if isinstance(m, dict)]
+                raw_materials[category] = None
+        tracks = [Track.from_dict(t) for t in data.get('tracks') or ()]
+        return cls(doc, tracks, materials)
+
+    def copy(self) -> "Timeline":
+        """
+        Private copy for editing: tracks, materials and the material lists are copied, the
+        raw entries themselves are shared (capgenie replaces them rather than mutating them).
+        """
+        doc = dict(self.doc)
+        doc['materials'] = {k: (v[:] if isinstance(v, list) else v) for k, v in self.raw_materials.items()}
+        materials = {category: [m.copy() for m in entries] for category, entries in self.materials.items()}
+        return Timeline(doc, [t.copy() for t in self.tracks], materials)
+
+    def to_draft(self) -> Dict:
+        """Build the CapCut dict of the timeline (raw parts are shared, not copied)."""
+        out = {}
+        for key, value in self.doc.items():
+            if key == 'tracks':
+                out[key] = [t.to_dict() for t in self.tracks]
+            elif key == 'materials':
+                materials = dict(value)
+                for category, entries in self.materials.items():
+                    materials[category] = [m.to_dict() for m in entries]
+                out[key] = materials
+            else:
+                out[key] = value
+        return out
+
+    @property
+    def raw_materials(self) -> Dict:
+        """materials section of the draft; the modeled categories are placeholders there."""
+        return self.doc['materials']
+
+    def category(self, name: str) -> List:
+        """Material list of a category (Material objects for videos/audios, raw dicts otherwise), created if missing."""
+        if name in TRACK_MATERIAL_CATEGORIES.values():
+            if name not in self.materials:
+                self.materials[name] = []
+                self.raw_materials[name] = None
+            return self.materials[name]
+        entries = self.raw_materials.get(name)
+        if entries is None:
+            entries = self.raw_materials[name] = []
+        return entries
+
+    def material_index(self) -> Dict[str, Tuple[str, Material]]:
+        """Material id -> (category, Material) over the videos and audios categories."""
+        index = {}
+        for category, entries in self.materials.items():
+            for mat in entries:
+                index.setdefault(mat.id, (category, mat))
+        return index
+
+    def fade_index(self) -> Dict[str, Dict]:
+        """materials.audio_fades keyed by id."""
+        index = {}
+        for fade in self.raw_materials.get('audio_fades') or ():
+            if isinstance(fade, dict) and 'id' in fade:
+                index.setdefault(fade['id'], fade)
+        return index
+
+    # --- Segments ---
+
+    def find_segment(self, segment_id: str) -> Tuple[Track, int]:
+        if self._segment_index is None:
+            self._segment_index = {}
+            for track in self.tracks:
+                for seg_id in track.ids:
+                    self._segment_index.setdefault(seg_id, track)
+        track = self._segment_index.get(segment_id)
+        position = track.position(segment_id) if track is not None else None
+        if position is None:
+            raise KeyError(segment_id)
+        return track, position
+
+    def invalidate_index(self):
+        """Drop the segment and material lookups after edits made outside the methods below."""
+        self._segment_index = None
+        self._material_uses = None
+        self._material_positions = {}
+
+    def track_for(self, media_type: str, track_index: int) -> Track:
+        """
+        Return the track at position track_index if it has the requested type, otherwise
+        create it there (padding the track list with empty tracks if needed).
+        """
+        tracks = self.tracks
+        if track_index < len(tracks) and tracks[track_index].type == media_type:
+            return tracks[track_index]
+        track = new_track(media_type, track_index)
+        while len(tracks) <= track_index:
+            tracks.append(Track({"type": media_type, "segments": None}))
+        replaced = tracks[track_index]
+        tracks[track_index] = track
+        if len(replaced):
+            self.invalidate_index()
+        return track
+
+    def add_segment(self, track: Track, segment_id: str, material_id: str, start: int, duration: int,
+                    source_start: int, source_duration: int, volume: float, fade_in: int, fade_out: int,
+                    refs: Optional[list] = None):
+        track.append(segment_id, material_id, start, duration, source_start, source_duration,
+                     volume, fade_in, fade_out, refs)
+        if self._segment_index is not None:
+            self._segment_index.setdefault(segment_id, track)
+        if self._material_uses is not None:
+            self._material_uses[material_id] += 1
+
+    def remove_segment(self, track: Track, i: int):
+        """Remove segment i of a track, and its video/audio material when no other segment uses it."""
+        segment_id, material_id = track.ids[i], track.material_ids[i]
+        track.remove([i])
+        if self._segment_index is not None and self._segment_index.get(segment_id) is track:
+            del self._segment_index[segment_id]
+        if material_id is None:
+            return
+        uses = self._material_uses
+        if uses is None:
+            if not self.is_material_used(material_id):
+                self._remove_material(material_id)
+            return
+        uses[material_id] -= 1
+        if uses[material_id] <= 0:
+            del uses[material_id]
+            self._remove_material(material_id)
+
+    def move_segment(self, track: Track, i: int, target: Track):
+        """Move segment i of `track` to the end of `target`, with all its fields."""
+        segment_id = track.ids[i]
+        target._append(*(getattr(track, name)[i] for name in Track._COLUMNS))
+        track.remove([i])
+        if self._segment_index is not None:
+            self._segment_index[segment_id] = target
+
+    def set_segment_fades(self, track: Track, i: int, fade_in: Optional[int] = None, fade_out: Optional[int] = None):
+        """
+        Set the fades of media segment i (microseconds; None keeps the current value).
+        CapCut and export read fades from the material (the inline audio_fade of a video,
+        the materials.audio_fades entry sharing an audio material's id), so that entry and
+        the segment's extra_material_refs are created, updated or removed along with the
+        segment fields. A material shared with other segments is first copied for segment i.
+        """
+        ttype = track.type
+        category = TRACK_MATERIAL_CATEGORIES[ttype]
+        k = self._material_position(category, track.material_ids[i])
+        fades = self.category('audio_fades')
+        mat = self.materials[category][k] if k is not None else None
+        if mat is None:
+            fade = None
+        elif ttype == 'video':
+            fade = mat.audio_fade
+        else:
+            fade = next((f for f in fades if isinstance(f, dict) and f.get('id') == mat.id), None)
+        if not isinstance(fade, dict):
+            fade = None
+        current = (fade.get('fade_in_duration', 0), fade.get('fade_out_duration', 0)) if fade else (0, 0)
+        fade_in = current[0] if fade_in is None else fade_in
+        fade_out = current[1] if fade_out is None else fade_out
+        track.set_fade_in(i, fade_in)
+        track.set_fade_out(i, fade_out)
+        if mat is None or (fade_in, fade_out) == current:
+            return
+        old_fade_id = fade.get('id') if fade else None
+        detached = self.material_uses(mat.id) > 1
+        if detached:
+            # The other segments keep the shared material and its fade
+            mat = mat.copy()
+            mat.id = new_id()
+            self.add_material(category, mat)
+            self._material_uses[track.material_ids[i]] -= 1
+            self._material_uses[mat.id] += 1
+            track.material_ids[i] = mat.id
+        elif old_fade_id is not None:
+            fades[:] = [f for f in fades if not (isinstance(f, dict) and f.get('id') == old_fade_id)]
+        new_fade = None
+        if fade_in or fade_out:
+            if ttype == 'audio':
+                fade_id = mat.id
+            else:
+                fade_id = old_fade_id if old_fade_id and not detached else new_id()
+            # Entries are replaced, not mutated: they may be shared with copies of the timeline
+            new_fade = dict(fade or {"fade_type": 0, "type": "audio_fade"}, fade_in_duration=fade_in,
+                            fade_out_duration=fade_out, id=fade_id)
+            fades.append(new_fade)
+        if ttype == 'video':
+            mat.audio_fade = new_fade
+        refs = [ref for ref in (track.refs[i] or ()) if ref != old_fade_id]
+        if new_fade is not None:
+            refs.append(new_fade['id'])
+        track.set_refs(i, refs)
+
+    def material_uses(self, material_id: str) -> int:
+        """Number of segments whose material_id is `material_id`."""
+        if self._material_uses is None:
+            self._material_uses = Counter(mid for track in self.tracks for mid in track.material_ids)
+        return self._material_uses[material_id]
+
+    def is_material_used(self, material_id: str) -> bool:
+        return self.material_uses(material_id) > 0
+
+    def add_material(self, category: str, material: Material):
+        """Append a video/audio material, keeping the material lookups up to date."""
+        self.category(category).append(material)
+        index = self._material_positions.get(category)
+        if index is not None and not index.add(material.id):
+            del self._material_positions[category]
+
+    def _material_position(self, category: str, material_id: str) -> Optional[int]:
+        """
+        Position of a video/audio material in its category list (None if absent), through a
+        per-category PositionIndex rebuilt when the list was changed by other means.
+        """
+        entries = self.materials.get(category)
+        if not entries:
+            return None
+        index = self._material_positions.get(category)
+        if index is not None and len(index.ordinals) == len(entries):
+            k = index.position(material_id)
+            if k is None or entries[k].id == material_id:
+                return k
+        index = PositionIndex(m.id for m in entries)
+        if not index.unique:
+            self._material_positions.pop(category, None)
+            return next((k for k, m in enumerate(entries) if m.id == material_id), None)
+        self._material_positions[category] = index
+        return index.position(material_id)
+
+    def _remove_material(self, material_id: str):
+        """Drop a video/audio material by id."""
+        for category in TRACK_MATERIAL_CATEGORIES.values():
+            k = self._material_position(category, material_id)
+            if k is None:
+                continue
+            index = self._material_positions.get(category)
+            if index is not None:
+                index.remove(material_id)
+            del self.materials[category][k]
+
+    def remove_materials(self, category: str, ids: set):
+        if not ids:
+            return
+        if category in self.materials:
+            self.materials[category] = [m for m in self.materials[category] if m.id not in ids]
+            self._material_positions.pop(category, None)
+        elif self.raw_materials.get(category):
+            self.raw_materials[category] = [m for m in self.raw_materials[category] if m.get('id') not in ids]
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """
+        Mark and sweep the materials: an entry of any materials.* category is reachable when
+        its id is the material_id of a segment, is in the extra_material_refs of a segment, or
+        is the inline audio_fade of a reachable video. Unreachable entries are dropped; entries
+        without an id are kept and no id is changed.
+        :return: number of entries removed per category
+        """
+        reachable = set()
+        for track in self.tracks:
+            reachable.update(track.material_ids)
+            for refs in track.refs:
+                if refs:
+                    reachable.update(ref for ref in refs if isinstance(ref, str))
+            for flags, extras in zip(track.flags, track.extras):
+                if flags & _RAW and isinstance(extras, dict):
+                    reachable.add(extras.get('material_id'))
+                    refs = extras.get('extra_material_refs')
+                    if isinstance(refs, list):
+                        reachable.update(ref for ref in refs if isinstance(ref, str))
+        removed = {}
+        for category, entries in self.materials.items():
+            kept = [m for m in entries if m.id is ABSENT or m.id is None or m.id in reachable]
+            if len(kept) != len(entries):
+                removed[category] = len(entries) - len(kept)
+                self.materials[category] = kept
+            for mat in kept:
+                if isinstance(mat.audio_fade, dict):
+                    reachable.add(mat.audio_fade.get('id'))
+        raw_materials = self.raw_materials
+        for category, entries in raw_materials.items():
+            if not isinstance(entries, list):
+                continue
+            kept = [m for m in entries if not isinstance(m, dict) or 'id' not in m or m['id'] in reachable]
+            if len(kept) != len(entries):
+                removed[category] = len(entries) - len(kept)
+                raw_materials[category] = kept
+        return removed
+
+    # --- Whole-timeline helpers ---
+
+    def end(self) -> int:
+        return max((t.end() for t in self.tracks), default=0)
+
+    def finalize(self):
+        """
+        Recompute the draft duration and give every video material an audio_fade field
+        (null when it has no fade), as CapCut expects.
+        """
+        if 'duration' in self.doc:
+            self.doc['duration'] = self.end()
+        for mat in self.materials.get('videos', ()):
+            if mat.audio_fade is ABSENT:
+                mat.audio_fade = None
+
+    def sequences(self, track_indexes: Optional[Collection[int]] = None) -> List[Dict]:
+        """
+        Simplified sequences of the video and audio tracks (the format of export_to_json).
+        :param track_indexes: only build the sequences of these tracks
+        """
+        index = self.material_index()
+        fades = self.fade_index()
+        sequences = []
+        for idx, track in enumerate(self.tracks):
+            ttype = track.type
+            category = TRACK_MATERIAL_CATEGORIES.get(ttype)
+            if category is None or (track_indexes is not None and idx not in track_indexes):
+                continue
+            for i in range(len(track)):
+                if not track.is_media(i):
+                    continue
+                found = index.get(track.material_ids[i])
+                if found is None or found[0] != category:
+                    continue
+                sequences.append(segment_sequence(track, i, found[1], ttype, idx, fades))
+        return sequences
+
+    def track_fingerprints(self) -> List[Optional[str]]:
+        """
+        Fingerprint of the exported content of each track (None for the tracks that are not
+        exported): equal fingerprints mean equal sequences() output for that track.
+        """
+        index = self.material_index()
+        fades = self.fade_index()
+        return [track_fingerprint(track, idx, index, fades) if track.type in TRACK_MATERIAL_CATEGORIES else None
+                for idx, track in enumerate(self.tracks)]
+
+    # --- Time queries (seconds) ---
+
+    def segments_at(self, time: float, track_index: Optional[int] = None) -> List[Dict]:
+        """Segments playing at `time` (start <= time < end), on one track or on all of them."""
+        t = int(time * 1_000_000)
+        return [segment_span(track, i, idx)
+                for idx, track in self._query_tracks(track_index) for i in track.intervals().at(t)]
+
+    def segments_in(self, start_time: float, end_time: float, track_index: Optional[int] = None) -> List[Dict]:
+        """Segments intersecting [start_time, end_time), on one track or on all of them."""
+        start, end = int(start_time * 1_000_000), int(end_time * 1_000_000)
+        return [segment_span(track, i, idx)
+                for idx, track in self._query_tracks(track_index) for i in track.intervals().overlapping(start, end)]
+
+    def find_overlaps(self, track_index: Optional[int] = None) -> List[Dict]:
+        """
+        Pairs of segments of the same track whose target ranges overlap:
+        {"track_index", "segment_ids": [a, b], "start_time", "end_time"} (the shared range).
+        """
+        return [{"track_index": idx, "segment_ids": [track.ids[a], track.ids[b]],
+                 "start_time": start / 1_000_000, "end_time": end / 1_000_000}
+                for idx, track in self._query_tracks(track_index) for a, b, start, end in track.intervals().overlaps()]
+
+    def find_gaps(self, track_index: Optional[int] = None, start_time: float = 0.0, end_time: float = None,
+                  min_duration: float = 0.0) -> List[Dict]:
+        """
+        Ranges of each track covered by no segment, between start_time and end_time (by
+        default the end of that track), lasting at least min_duration:
+        {"track_index", "start_time", "end_time"}.
+        """
+        start = int(start_time * 1_000_000)
+        end = int(end_time * 1_000_000) if end_time is not None else None
+        min_gap = max(int(min_duration * 1_000_000), 1)
+        return [{"track_index": idx, "start_time": gap_start / 1_000_000, "end_time": gap_end / 1_000_000}
+                for idx, track in self._query_tracks(track_index)
+                for gap_start, gap_end in track.intervals().gaps(start, end, min_gap)]
+
+    def timeline_end(self, track_index: Optional[int] = None) -> float:
+        """End of the last segment in seconds, of one track or of the whole timeline."""
+        return max((track.intervals().end() for _, track in self._query_tracks(track_index)), default=0) / 1_000_000
+
+    def _query_tracks(self, track_index: Optional[int]) -> List[Tuple[int, Track]]:
+        if track_index is None:
+            return list(enumerate(self.tracks))
+        if not 0 <= track_index < len(self.tracks):
+            raise IndexError(f"Track {track_index} does not exist (the timeline has {len(self.tracks)} tracks).")
+        return [(track_index, self.tracks[track_index])]
+
+
+def new_track(media_type: str, track_index: int) -> Track:
+    return Track({
+        "attribute": 0,
+        "flag": 0,
+        "id": f"TRACK-{track_index}" if media_type == "video" else f"AUDIO-TRACK-{track_index}",
+        "is_default_name": True,
+        "name": f"Track {track_index}" if media_type == "video" else f"Audio Track {track_index}",
+        "segments": None,
+        "type": media_type
+    })
+
+
+def segment_span(track: Track, i: int, idx: int) -> Dict:
+    """Position of segment i of track idx on the timeline, as returned by the time queries."""
+    start = track.starts[i]
+    return {"segment_id": track.ids[i], "material_id": track.material_ids[i], "type": track.type,
+            "track_index": idx, "start_time": start / 1_000_000,
+            "end_time": (start + track.durations[i]) / 1_000_000}
+
+
+def track_fingerprint(track: Track, idx: int, index: Dict[str, Tuple[str, Material]], fades: Dict[str, Dict]) -> str:
+    """
+    Hash of everything segment_sequence() reads for the segments of a track: the timing,
+    volume and flag columns (hashed as raw bytes) and the exported fields of each segment's
+    material. Material ids are not exported, so materials are hashed by content: a rebuilt
+    draft with new ids keeps its fingerprints.
+    """
+    ttype = track.type
+    category = TRACK_MATERIAL_CATEGORIES[ttype]
+    h = hashlib.blake2b(f"{ttype}:{idx}:{len(track)}".encode(), digest_size=16)
+    for column in (track.starts, track.durations, track.source_starts, track.source_durations, track.volumes,
+                   track.flags):
+        h.update(column.tobytes())
+    # Distinct material contents, numbered in order of first use. Raw attributes are hashed
+    # (ABSENT and None differ): at worst an equivalent material is seen as changed.
+    video = ttype == 'video'
+    contents = {}
+    codes = {}
+    for mid in dict.fromkeys(track.material_ids):
+        found = index.get(mid) if mid is not None else None
+        if found is None or found[0] != category:
+            content = None
+        else:
+            mat = found[1]
+            fade = mat.audio_fade if video else fades.get(mat.id)
+            if isinstance(fade, dict):
+                content = (mat.path, mat.volume, fade.get('fade_in_duration', 0), fade.get('fade_out_duration', 0))
+            else:
+                content = (mat.path, mat.volume)
+        codes[mid] = contents.setdefault(content, len(contents))
+    h.update(array('q', map(codes.__getitem__, track.material_ids)).tobytes())
+    h.update(repr(list(contents)).encode())
+    # Volumes kept in extras (segments without a modeled volume)
+    h.update(repr([(i, e['volume']) for i, e in enumerate(track.extras)
+                   if e and 'volume' in e and not track.flags[i] & _VOLUME]).encode())
+    return h.hexdigest()
+
+
+def fade_of(mat: Material, ttype: str, fades: Dict[str, Dict]) -> Optional[Dict]:
+    """Fade of a material: inline audio_fade for videos, materials.audio_fades entry (same id) for audios."""
+    if ttype == 'video':
+        return mat.get('audio_fade')
+    return fades.get(mat.id)
+
+
+def segment_sequence(track: Track, i: int, mat: Material, ttype: str, idx: int, fades: Dict[str, Dict]) -> Dict:
+    """Simplified sequence of segment i of a track."""
+    start_us = track.starts[i]
+    duration_us = track.durations[i]
+    if track.has_source(i):
+        source_start, source_duration = track.source_starts[i], track.source_durations[i]
+    else:
+        source_start, source_duration = 0, duration_us
+    audio_fade = fade_of(mat, ttype, fades)
+    fade_in = fade_out = 0.0
+    if audio_fade:
+        fade_in = audio_fade.get('fade_in_duration', 0) / 1_000_000
+        fade_out = audio_fade.get('fade_out_duration', 0) / 1_000_000
+    volume = track.volume(i, mat.get('volume', 1.0))
+    return {
+        "path": mat.get('path'),
+        "start_time": start_us / 1_000_000,
+        "end_time": (start_us + duration_us) / 1_000_000,
+        "source_in": float(source_start / 1_000_000),
+        "source_out": float((source_start + source_duration) / 1_000_000),
+        "fade_in_duration": float(fade_in),
+        "fade_out_duration": float(fade_out),
+        "volume": volume,
+        "type": ttype,
+        "track_index": idx
+    }
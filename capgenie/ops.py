@@ -0,0 +1,110 @@
+"""
+Timeline operations as JSON Lines.
+
+Each input line is one JSON object naming an operation and its arguments:
+
+    {"op": "add_video", "video_path": "/media/a.mp4", "start_time": 0, "end_time": 2}
+    {"op": "set_volume", "segment_id": "...", "volume": 0.5}
+
+apply_operations() runs a whole stream through a single EditSession (one draft load,
+one commit) and yields one result record per line as soon as it is applied, so input
+of any length is processed with constant memory besides the draft itself.
+"""
+import json
+from typing import Callable, Dict, Iterable, Iterator
+
+from .session import EditSession
+
+
+def _add_video(session: EditSession, args: Dict):
+    return {"segment_id": session.add_video(**args)}
+
+
+def _add_audio(session: EditSession, args: Dict):
+    return {"segment_id": session.add_audio(**args)}
+
+
+def _remove(session: EditSession, args: Dict):
+    session.remove(**args)
+
+
+def _move(session: EditSession, args: Dict):
+    session.move(**args)
+
+
+def _modify(session: EditSession, args: Dict):
+    session.modify(**args)
+
+
+def _set_volume(session: EditSession, args: Dict):
+    session.modify(args["segment_id"], volume=args["volume"])
+
+
+def _set_fade(session: EditSession, args: Dict):
+    session.modify(args["segment_id"], fade_in_duration=args.get("fade_in_duration"),
+                   fade_out_duration=args.get("fade_out_duration"))
+
+
+# op name -> handler(session, arguments); handlers return the result payload, if any
+OPERATIONS: Dict[str, Callable[[EditSession, Dict], object]] = {
+    "add_video": _add_video,
+    "add_audio": _add_audio,
+    "remove": _remove,
+    "move": _move,
+    "modify": _modify,
+    "set_volume": _set_volume,
+    "set_fade": _set_fade,
+}
+
+
+def apply_operation(session: EditSession, op: Dict):
+    """
+    Apply one decoded operation to an active session.
+    :return: the operation's result payload (e.g. {"segment_id": ...} for additions), or None
+    """
+    if not isinstance(op, dict) or "op" not in op:
+        raise ValueError('An operation must be a JSON object with an "op" field.')
+    args = dict(op)
+    name = args.pop("op")
+    args.pop("ref", None)
+    handler = OPERATIONS.get(name)
+    if handler is None:
+        raise ValueError(f"Unknown operation {name!r}.")
+    return handler(session, args)
+
+
+def apply_operations(project, lines: Iterable[str], backup: str = "copy", atomic: bool = False) -> Iterator[Dict]:
+    """
+    Apply a JSON Lines stream of operations to a project in one edit session.
+    :param lines: JSON documents, one per item; blank lines are ignored
+    :param backup: .bak strategy of the commit ("copy", "link" or "none")
+    :param atomic: stop at the first failed operation and commit nothing; otherwise failed
+        operations are reported (an operation checks its arguments before editing, so a
+        failed one leaves the draft unchanged) and the others are still applied
+    :return: iterator of result records {"line", "op", "ok", ["ref"], ["result" | "error"]};
+        the draft is committed once the iterator is exhausted (closing it early discards
+        the changes). In atomic mode the failure record is yielded, then the error raised.
+    """
+    with project.edit(backup=backup) as session:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            record = {"line": number, "op": None, "ok": True}
+            try:
+                op = json.loads(line)
+                if isinstance(op, dict):
+                    record["op"] = op.get("op")
+                    if "ref" in op:
+                        record["ref"] = op["ref"]
+                result = apply_operation(session, op)
+            except Exception as e:
+                record["ok"] = False
+                record["error"] = f"{type(e).__name__}: {e}"
+                yield record
+                if atomic:
+                    # Escaping the session rolls the whole stream back
+                    raise
+                continue
+            if result is not None:
+                record["result"] = result
+            yield record
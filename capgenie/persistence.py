@@ -0,0 +1,178 @@
+"""
+Write-behind persistence for CapCut drafts.
+
+A WriteBehindWriter holds the latest committed draft of a project in memory and
+persists it from a background thread, coalescing every commit made during the
+debounce interval into a single atomic write. Once written, the in-memory draft is
+only served while draft_content.json is still the file this writer wrote: a save by
+CapCut or another process makes readers go back to the file.
+"""
+import atexit
+import threading
+import time
+import weakref
+from typing import List, Optional
+
+from .cache import draft_cache
+from .file_manager import FileManager
+from .instrumentation import phase
+from .locking import file_version
+from .model import Timeline
+
+
+class WriteBehindWriter:
+    """
+    Background flusher for one project. Committed drafts must not be mutated after
+    submit(): edit sessions work on private copies (see Timeline.copy).
+    """
+
+    def __init__(self, flush_interval: float = 0.5):
+        self.flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._latest: Optional[Timeline] = None
+        # Main draft file of the latest submit, and its version once this writer wrote it
+        self._path: Optional[str] = None
+        self._written_version = None
+        self._pending = None
+        self._last_submit = 0.0
+        self._flush_now = False
+        self._writing = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        _live_writers.add(self)
+
+    def latest(self) -> Optional[Timeline]:
+        """
+        Most recently committed draft while it is the current one: not written yet, or
+        written and draft_content.json unchanged since. None before the first commit and
+        once the file was replaced by someone else (the draft must then be read from disk).
+        """
+        with self._cond:
+            if self._latest is None or self._pending is not None or self._writing or self._error is not None:
+                return self._latest
+            if file_version(self._path) != self._written_version:
+                self._latest = None
+            return self._latest
+
+    @property
+    def pending(self) -> bool:
+        with self._cond:
+            return self._pending is not None or self._writing
+
+    def submit(self, data: Timeline, targets: List[str], backup: str = "copy", compact: bool = False):
+        """
+        Record `data` as the latest draft and schedule it to be written to `targets`
+        (main draft first, then its mirrors). Returns immediately.
+        """
+        with self._cond:
+            self._raise_pending_error()
+            if self._closed:
+                raise RuntimeError("Write-behind writer is closed.")
+            self._latest = data
+            self._path = str(targets[0])
+            self._pending = (data, list(targets), backup, compact)
+            self._last_submit = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="capgenie-write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        Write any pending draft now and wait until it is on disk.
+        Re-raises an error that occurred in the background thread.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_now = True
+            self._cond.notify_all()
+            while self._pending is not None or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for the draft to be written.")
+                self._cond.wait(remaining)
+            self._flush_now = False
+            self._raise_pending_error()
+
+    def close(self):
+        """Flush and stop the background thread."""
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                thread = self._thread
+                self._cond.notify_all()
+            if thread is not None:
+                thread.join()
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        # The thread exits once nothing is pending and is restarted by the next submit(),
+        # so idle projects hold no thread.
+        while True:
+            with self._cond:
+                if self._pending is None:
+                    self._thread = None
+                    return
+                # Debounce: wait until no commit arrived for flush_interval, unless flushed explicitly
+                while not self._flush_now and not self._closed:
+                    remaining = self._last_submit + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                data, targets, backup, compact = self._pending
+                self._pending = None
+                self._writing = True
+            try:
+                # The committed draft stays owned by this writer, so it is not shared through the cache
+                version = write_draft(data, targets, backup, compact, cache_result=False)
+                with self._cond:
+                    self._written_version = version
+            except BaseException as e:  # surfaced on the next flush()/submit()
+                with self._cond:
+                    self._error = e
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+
+_live_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_writers():
+    """Persist pending drafts of every live writer before the interpreter exits."""
+    for writer in list(_live_writers):
+        try:
+            writer.flush()
+        except Exception:
+            pass
+
+
+def write_draft(data: Timeline, targets: List[str], backup: str = "copy", compact: bool = False, cache_result: bool = True):
+    """
+    Serialize a draft once, write it atomically to targets[0] and mirror it to the other targets.
+    :param cache_result: record `data` in the shared draft cache as the new content of targets[0]
+        (the caller gives up ownership of it); otherwise the cached entries are just invalidated
+    :return: version of targets[0] as written (see capgenie.locking.file_version)
+    """
+    first, others = targets[0], targets[1:]
+    with phase("model"):
+        doc = data.to_draft()
+    FileManager.save_json(first, doc, compact=compact)
+    version = file_version(first)
+    if cache_result:
+        draft_cache.put(first, data)
+    else:
+        draft_cache.invalidate(first)
+    for target in others:
+        FileManager.mirror_file(first, target, backup)
+        draft_cache.invalidate(target)
+    return version
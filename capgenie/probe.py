@@ -0,0 +1,366 @@
+"""
+Media probe: duration and dimensions of media files, read from their container headers.
+
+Only the headers are parsed, through mmap, without any external tool: the MP4/MOV box
+tree (moov/mvhd, trak/tkhd, mdia/mdhd and hdlr), the RIFF chunks of WAV files and the
+first frame (plus its Xing/VBRI header) of MP3 files. The media payload itself is never
+read, whatever the size of the file.
+
+Results are kept in an on-disk JSON cache keyed by absolute path, size and mtime, so an
+unchanged file is probed once across runs. probe_many() probes the cache misses of a
+batch on a thread pool. Files that are missing or in an unknown format give None, and
+capgenie then falls back to its previous defaults.
+"""
+import mmap
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from .file_manager import FileManager
+from .instrumentation import count
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "capgenie", "media_probe.json")
+
+# Dimensions written for videos that could not be probed
+DEFAULT_VIDEO_SIZE = (1280, 720)
+
+_settings = {
+    "enabled": True,
+    "max_workers": min(8, (os.cpu_count() or 1) * 2),
+}
+
+
+class MediaInfo(NamedTuple):
+    """Probe result: duration in microseconds, dimensions in pixels (None when unknown)."""
+    kind: str  # "video" or "audio"
+    duration: Optional[int]
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def configure(enabled: Optional[bool] = None, cache_path: Optional[str] = None, max_workers: Optional[int] = None):
+    """
+    Change the package-wide probe settings. Arguments left to None keep their value.
+    :param enabled: probe media when building materials (otherwise the defaults are used)
+    :param cache_path: location of the on-disk probe cache
+    :param max_workers: size of the thread pool of probe_many()
+    """
+    global media_cache
+    if enabled is not None:
+        _settings["enabled"] = bool(enabled)
+    if cache_path is not None:
+        media_cache.save()
+        media_cache = ProbeCache(cache_path)
+    if max_workers is not None:
+        _settings["max_workers"] = max(1, int(max_workers))
+
+
+def enabled() -> bool:
+    return _settings["enabled"]
+
+
+# --- Container parsers ---
+
+def probe(path: str) -> Optional[MediaInfo]:
+    """Probe one file, without the cache. None when it is missing, empty or not recognized."""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            count("media_probed")
+            return _probe_mapped(m)
+    except (OSError, ValueError, IndexError, struct.error):
+        # OSError: missing or unreadable; the others: empty file (mmap) or truncated headers
+        return None
+
+
+def _probe_mapped(m) -> Optional[MediaInfo]:
+    head = m[:12]
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return _probe_wav(m)
+    if head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+        return _probe_mp4(m)
+    if head[:3] == b'ID3' or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return _probe_mp3(m)
+    return None
+
+
+def _boxes(m, start: int, end: int):
+    """(type, payload start, box end) of the ISO BMFF boxes between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from('>I4s', m, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', m, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _child(m, start: int, end: int, wanted: bytes):
+    for kind, payload, box_end in _boxes(m, start, end):
+        if kind == wanted:
+            return payload, box_end
+    return None
+
+
+def _probe_mp4(m) -> Optional[MediaInfo]:
+    moov = _child(m, 0, len(m), b'moov')
+    if moov is None:
+        return None
+    duration = None
+    width = height = None
+    kinds = set()
+    track_duration = 0
+    for kind, payload, end in _boxes(m, *moov):
+        if kind == b'mvhd':
+            if m[payload] == 1:
+                timescale, units = struct.unpack_from('>IQ', m, payload + 20)
+            else:
+                timescale, units = struct.unpack_from('>II', m, payload + 12)
+            if timescale:
+                duration = units * 1_000_000 // timescale
+        elif kind == b'trak':
+            handler, track_width, track_height, units_us = _probe_trak(m, payload, end)
+            if units_us:
+                track_duration = max(track_duration, units_us)
+            if handler == b'vide':
+                kinds.add('video')
+                if width is None and track_width:
+                    width, height = track_width, track_height
+            elif handler == b'soun':
+                kinds.add('audio')
+    if not kinds:
+        return None
+    return MediaInfo('video' if 'video' in kinds else 'audio', duration or track_duration or None, width, height)
+
+
+def _probe_trak(m, start: int, end: int):
+    """(handler type, width, height, duration in µs) of a trak box."""
+    handler = None
+    width = height = 0
+    duration = 0
+    tkhd = _child(m, start, end, b'tkhd')
+    if tkhd is not None:
+        payload = tkhd[0]
+        offset = 88 if m[payload] == 1 else 76
+        width, height = (v >> 16 for v in struct.unpack_from('>II', m, payload + offset))
+        # Rotation matrix: a == 0 means a quarter turn, the displayed frame is transposed
+        a, b = struct.unpack_from('>ii', m, payload + offset - 36)
+        if a == 0 and b != 0:
+            width, height = height, width
+    mdia = _child(m, start, end, b'mdia')
+    if mdia is not None:
+        mdhd = _child(m, *mdia, b'mdhd')
+        if mdhd is not None:
+            payload = mdhd[0]
+            if m[payload] == 1:
+                timescale, units = struct.unpack_from('>IQ', m, payload + 20)
+            else:
+                timescale, units = struct.unpack_from('>II', m, payload + 12)
+            if timescale:
+                duration = units * 1_000_000 // timescale
+        hdlr = _child(m, *mdia, b'hdlr')
+        if hdlr is not None:
+            handler = bytes(m[hdlr[0] + 8:hdlr[0] + 12])
+    return handler, width, height, duration
+
+
+def _probe_wav(m) -> Optional[MediaInfo]:
+    byte_rate = data_size = None
+    pos, end = 12, len(m)
+    while pos + 8 <= end:
+        chunk, size = struct.unpack_from('<4sI', m, pos)
+        if chunk == b'fmt ':
+            byte_rate = struct.unpack_from('<I', m, pos + 16)[0]
+        elif chunk == b'data':
+            # Streamed WAVs may leave the size at 0 or 0xFFFFFFFF: the data runs to the end of the file
+            data_size = min(size, end - pos - 8) if size else end - pos - 8
+            break
+        pos += 8 + size + (size & 1)
+    if not byte_rate or data_size is None:
+        return None
+    return MediaInfo('audio', data_size * 1_000_000 // byte_rate)
+
+
+_MP3_BITRATES = {
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# version bits -> sample rates (3: MPEG 1, 2: MPEG 2, 0: MPEG 2.5)
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# How far past the ID3 tag the first frame is looked for
+_MP3_SYNC_WINDOW = 64 * 1024
+
+
+def _probe_mp3(m) -> Optional[MediaInfo]:
+    pos = 0
+    if m[:3] == b'ID3':
+        size = 0
+        for byte in m[6:10]:
+            size = (size << 7) | (byte & 0x7F)
+        pos = 10 + size + (10 if m[5] & 0x10 else 0)
+    end = len(m)
+    if m[end - 128:end - 125] == b'TAG':
+        end -= 128
+    limit = min(end - 4, pos + _MP3_SYNC_WINDOW)
+    while pos <= limit:
+        pos = m.find(b'\xff', pos, limit + 1)
+        if pos < 0:
+            return None
+        info = _mp3_frame(m, pos, end)
+        if info is not None:
+            return info
+        pos += 1
+    return None
+
+
+def _mp3_frame(m, pos: int, end: int) -> Optional[MediaInfo]:
+    header = struct.unpack_from('>I', m, pos)[0]
+    if header >> 21 != 0x7FF:
+        return None
+    version, layer = (header >> 19) & 3, (header >> 17) & 3
+    bitrate_index, rate_index = (header >> 12) & 15, (header >> 10) & 3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = _MP3_BITRATES[(3 if version == 3 else 2, layer)][bitrate_index] * 1000
+    samples = 384 if layer == 3 else 1152 if layer == 2 or version == 3 else 576
+    mono = (header >> 6) & 3 == 3
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    frames = None
+    xing = pos + 4 + side_info
+    if m[xing:xing + 4] in (b'Xing', b'Info') and struct.unpack_from('>I', m, xing + 4)[0] & 1:
+        frames = struct.unpack_from('>I', m, xing + 8)[0]
+    elif m[pos + 36:pos + 40] == b'VBRI':
+        frames = struct.unpack_from('>I', m, pos + 50)[0]
+    if frames:
+        return MediaInfo('audio', frames * samples * 1_000_000 // sample_rate)
+    # Constant bitrate: the duration follows from the size of the audio data
+    return MediaInfo('audio', (end - pos) * 8 * 1_000_000 // bitrate)
+
+
+# --- Cache ---
+
+class ProbeCache:
+    """
+    On-disk cache of probe results, keyed by absolute path and checked against the size
+    and mtime of the file. Loaded on first use; save() writes it back atomically.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                entries = FileManager.load_json(self.path)
+            except (OSError, ValueError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def lookup(self, key: str, stat: os.stat_result):
+        """(found, info) for an absolute path whose current stat is `stat`."""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or entry.get('size') != stat.st_size or entry.get('mtime_ns') != stat.st_mtime_ns:
+            return False, None
+        info = entry.get('info')
+        return True, MediaInfo(**info) if info is not None else None
+
+    def store(self, key: str, stat: os.stat_result, info: Optional[MediaInfo]):
+        with self._lock:
+            self._load()[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                 'info': info._asdict() if info is not None else None}
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        FileManager.ensure_dir(os.path.dirname(os.path.abspath(self.path)))
+        FileManager.save_json(self.path, entries, compact=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._dirty = True
+
+
+media_cache = ProbeCache(os.environ.get("CAPGENIE_PROBE_CACHE", DEFAULT_CACHE_PATH))
+
+
+def probe_many(paths: Iterable[str], cache: Optional[ProbeCache] = None) -> Dict[str, Optional[MediaInfo]]:
+    """
+    Probe several files: unchanged files are answered from the cache, the others are
+    probed in parallel and the cache is saved once. Missing files are not cached.
+    :return: path (as given) -> MediaInfo or None
+    """
+    cache = cache if cache is not None else media_cache
+    results: Dict[str, Optional[MediaInfo]] = {}
+    pending = {}
+    for path in dict.fromkeys(paths):
+        key = os.path.abspath(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            results[path] = None
+            continue
+        found, info = cache.lookup(key, stat)
+        if found:
+            count("probe_cache_hits")
+            results[path] = info
+        else:
+            pending[path] = (key, stat)
+    if pending:
+        if len(pending) == 1:
+            probed = [probe(key) for key, _ in pending.values()]
+        else:
+            with ThreadPoolExecutor(max_workers=min(_settings["max_workers"], len(pending))) as pool:
+                probed = list(pool.map(probe, [key for key, _ in pending.values()]))
+        for (path, (key, stat)), info in zip(pending.items(), probed):
+            cache.store(key, stat, info)
+            results[path] = info
+        cache.save()
+    return results
+
+
+def probe_media(path: str, cache: Optional[ProbeCache] = None) -> Optional[MediaInfo]:
+    """Probe one file through the cache (None when probing is disabled)."""
+    if not _settings["enabled"]:
+        return None
+    return probe_many([path], cache)[path]
+
+
+def probe_paths(paths: Iterable[str]) -> Dict[str, Optional[MediaInfo]]:
+    """probe_many() through the shared cache, or an empty dict when probing is disabled."""
+    if not _settings["enabled"]:
+        return {}
+    return probe_many(paths)
+
+
+def media_duration(info: Optional[MediaInfo], default: int) -> int:
+    """Material duration (µs): the probed duration of the media, else `default`."""
+    return info.duration if info is not None and info.duration else default
+
+
+def media_dimensions(info: Optional[MediaInfo]):
+    """(width, height) of a video material: the probed ones, else DEFAULT_VIDEO_SIZE."""
+    if info is not None and info.width and info.height:
+        return info.width, info.height
+    return DEFAULT_VIDEO_SIZE
@@ -1,6 +1,21 @@
 import os
+from collections import Counter
 from pathlib import Path
+from .cache import draft_cache
 from .file_manager import FileManager
+from .indexes import PathMaterialIndex
+from .instrumentation import count, instrumented, phase
+from .locking import LOCKING_MODES, ConcurrentModificationError, file_version
+from .persistence import WriteBehindWriter
+from .probe import MediaInfo, media_dimensions, media_duration, probe_paths
+from .sequences import SequenceBatch, prepare_sequences
+from .model import TRACK_MATERIAL_CATEGORIES, Material, Timeline, Track, fade_of, new_id, new_track
+from .session import EditSession
+from .streaming import stream_export
+from .template import get_template
+
+# Per-media helper materials that every synced segment references through extra_material_refs
+HELPER_MATERIAL_CATEGORIES = ('canvases', 'speeds', 'placeholder_infos')
 
 class Project:
     """
@@ -15,436 +30,57 @@ class Project:
         'draft_meta_info.json', 'draft_settings', 'draft_virtual_store.json', 'draftMainWindowLayoutConfig.json',
         'key_value.json', 'performance_opt_info.json', 'template.tmp', 'template-2.tmp'
     ]
+    # How static template files are placed in new projects: "auto", "reflink", "link" or "copy"
+    TEMPLATE_LINK_MODE = "auto"
+    # Sidecar of an incremental export, next to the exported file (see export_to_json)
+    EXPORT_STATE_SUFFIX = ".state"
 
-    def __init__(self, project_path: str, json_path: str, create: bool = False, overwrite: bool = False):
+    def __init__(self, project_path: str, json_path: str, create: bool = False, overwrite: bool = False, write_behind: bool = False, flush_interval: float = 0.5, locking: str = None, lock_timeout: float = None, retries: int = 0):
         """
         Initialize a CapCut project by specifying both the CapCut project folder and the associated simplified JSON file.
         :param project_path: Path to the CapCut project folder
         :param json_path: Path to the associated simplified JSON file
         :param create: Whether to create a new project structure if not present
         :param overwrite: Whether to overwrite existing project structure
+        :param write_behind: Keep committed edits in memory and persist them from a background thread
+            (call flush() to force them to disk)
+        :param flush_interval: Debounce interval of the write-behind thread, in seconds
+        :param locking: coordination with other processes editing the same draft (see capgenie.locking):
+            None, "lock" (hold the project lock during each read-modify-write) or "optimistic"
+            (check at commit that the draft was not changed since it was loaded)
+        :param lock_timeout: seconds to wait for the project lock before raising LockTimeout (None = forever)
+        :param retries: in optimistic mode, how many times an operation is re-applied on a fresh draft
+            after losing a race before ConcurrentModificationError is raised (0 = fail fast)
         """
+        if locking not in LOCKING_MODES:
+            raise ValueError(f"Unknown locking mode {locking!r} (expected one of {LOCKING_MODES}).")
+        if locking and write_behind:
+            raise ValueError("Cross-process locking cannot be combined with write_behind.")
         self.path = Path(project_path)
+        self.locking = locking
+        self.lock_timeout = lock_timeout
+        self.retries = retries
         self.json_path = Path(json_path)
+        # Timers and counters of the last operation (see capgenie.instrumentation)
+        self.last_stats = None
+        self._session = None
+        self._writer = WriteBehindWriter(flush_interval) if write_behind else None
+        # Incremental exports: export path -> (version of the written file, its sequences by track)
+        self._exports = {}
         if create:
             if overwrite or not self.path.exists():
                 self._create_project_structure()
         elif not self.path.exists():
             raise FileNotFoundError(f"Project folder {self.path} does not exist.")
 
+    @instrumented("create")
     def _create_project_structure(self):
-        import shutil
-        import uuid
-        import json
-        from datetime import datetime
-
-        TEMPLATE_PATH = Path(__file__).parent.parent / "template_capcut_project"
-        shutil.copytree(TEMPLATE_PATH, self.path, dirs_exist_ok=True)
-
-        # Adaptation dynamique des fichiers JSON principaux
-        # 1. draft_meta_info.json
-        meta_path = self.path / "draft_meta_info.json"
-        if meta_path.exists():
-            with open(meta_path, "r", encoding="utf-8") as f:
-                meta = json.load(f)
-            # Générer des valeurs uniques
-            draft_id = str(uuid.uuid4()).upper()
-            draft_name = self.path.name
-            now = int(datetime.now().timestamp() * 1e6)
-            draft_fold_path = str(self.path)
-            draft_root_path = str(self.path.parent)
-            # Adapter les champs
-            meta["draft_id"] = draft_id
-            meta["draft_name"] = draft_name
-            meta["draft_fold_path"] = draft_fold_path
-            meta["draft_root_path"] = draft_root_path
-            meta["tm_draft_create"] = now
-            meta["tm_draft_modified"] = now
-            with open(meta_path, "w", encoding="utf-8") as f:
-                json.dump(meta, f, indent=2)
-
-        # 2. draft_content.json, draft_content.json.bak, template.tmp, template-2.tmp
-        for fname in ["draft_content.json", "draft_content.json.bak", "template.tmp", "template-2.tmp"]:
-            fpath = self.path / fname
-            if fpath.exists():
-                with open(fpath, "r", encoding="utf-8") as f:
-                    try:
-                        data = json.load(f)
-                        # Pour les .tmp, certains sont du json
-                    except Exception:
-                        continue
-                # Adapter les champs si existants
-                if "name" in data:
-                    data["name"] = self.path.name
-                if "id" in data:
-                    data["id"] = draft_id
-                if "path" in data:
-                    data["path"] = str(self.path)
-                with open(fpath, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-            elif file == "draft_meta_info.json":
-                FileManager.ensure_file(
-                    str(self.path / file),
-                    default_content={
-                        "cloud_package_completed_time": "",
-                        "draft_cloud_capcut_purchase_info": "",
-                        "draft_cloud_last_action_download": False,
-                        "draft_cloud_package_type": "",
-                        "draft_cloud_purchase_info": "",
-                        "draft_cloud_template_id": "",
-                        "draft_cloud_tutorial_info": "",
-                        "draft_cloud_videocut_purchase_info": "",
-                        "draft_cover": "draft_cover.jpg",
-                        "draft_deeplink_url": "",
-                        "draft_enterprise_info": {
-                            "draft_enterprise_extra": "",
-                            "draft_enterprise_id": "",
-                            "draft_enterprise_name": "",
-                            "enterprise_material": []
-                        },
-                        "draft_fold_path": "C:/Users/Yanis/AppData/Local/CapCut/User Data/Projects/com.lveditor.draft/0527",
-                        "draft_id": "E9B7A696-C9D1-4d8f-B444-972AE202972B",
-                        "draft_is_ae_produce": False,
-                        "draft_is_ai_packaging_used": False,
-                        "draft_is_ai_shorts": False,
-                        "draft_is_ai_translate": False,
-                        "draft_is_article_video_draft": False,
-                        "draft_is_from_deeplink": "false",
-                        "draft_is_invisible": False,
-                        "draft_materials": [
-                            {"type": 0, "value": []},
-                            {"type": 1, "value": []},
-                            {"type": 2, "value": []},
-                            {"type": 3, "value": []},
-                            {"type": 6, "value": []},
-                            {"type": 7, "value": []},
-                            {"type": 8, "value": []}
-                        ],
-                        "draft_materials_copied_info": [],
-                        "draft_name": "0527",
-                        "draft_need_rename_folder": False,
-                        "draft_new_version": "",
-                        "draft_removable_storage_device": "",
-                        "draft_root_path": "C:\\Users\\Yanis\\AppData\\Local\\CapCut\\User Data\\Projects\\com.lveditor.draft",
-                        "draft_segment_extra_info": [],
-                        "draft_timeline_materials_size_": 8080,
-                        "draft_type": "",
-                        "tm_draft_cloud_completed": "",
-                        "tm_draft_cloud_modified": 0,
-                        "tm_draft_cloud_space_id": -1,
-                        "tm_draft_create": 1748373258615818,
-                        "tm_draft_modified": 1748373274514938,
-                        "tm_draft_removed": 0,
-                        "tm_duration": 0
-                    }
-                )
-            elif file == "draft_settings":
-                FileManager.ensure_file(
-                    str(self.path / file),
-                    default_content="""[General]
-cloud_last_modify_platform=windows
-draft_create_time=1748373258
-layoutType=0
-draft_last_edit_time=1748373274
-real_edit_seconds=12
-real_edit_keys=1
-"""
-                )
-            elif file == "performance_opt_info.json":
-                FileManager.ensure_file(
-                    str(self.path / file),
-                    default_content={"manual_cancle_precombine_segs": None}
-                )
-            elif file == "template.tmp":
-                FileManager.ensure_file(
-                    str(self.path / file),
-                    default_content={
-                        "canvas_config": {"background": None, "height": 0, "ratio": "original", "width": 0},
-                        "color_space": -1,
-                        "config": {
-                            "adjust_max_index": 1,
-                            "attachment_info": [],
-                            "combination_max_index": 1,
-                            "export_range": None,
-                            "extract_audio_last_index": 1,
-                            "lyrics_recognition_id": "",
-                            "lyrics_sync": True,
-                            "lyrics_taskinfo": [],
-                            "maintrack_adsorb": True,
-                            "material_save_mode": 0,
-                            "multi_language_current": "none",
-                            "multi_language_list": [],
-                            "multi_language_main": "none",
-                            "multi_language_mode": "none",
-                            "original_sound_last_index": 1,
-                            "record_audio_last_index": 1,
-                            "sticker_max_index": 1,
-                            "subtitle_keywords_config": None,
-                            "subtitle_recognition_id": "",
-                            "subtitle_sync": True,
-                            "subtitle_taskinfo": [],
-                            "system_font_list": [],
-                            "use_float_render": False,
-                            "video_mute": False,
-                            "zoom_info_params": None
-                        },
-                        "cover": None,
-                        "create_time": 0,
-                        "duration": 0,
-                        "extra_info": None,
-                        "fps": 30.0,
-                        "free_render_index_mode_on": False,
-                        "group_container": None,
-                        "id": "E92C6FA4-39AA-4476-A2C6-B6F0E22F5954",
-                        "is_drop_frame_timecode": False,
-                        "keyframe_graph_list": [],
-                        "keyframes": {
-                            "adjusts": [],
-                            "audios": [],
-                            "effects": [],
-                            "filters": [],
-                            "handwrites": [],
-                            "stickers": [],
-                            "texts": [],
-                            "videos": []
-                        },
-                        "last_modified_platform": {
-                            "app_id": 0,
-                            "app_source": "",
-                            "app_version": "",
-                            "device_id": "",
-                            "hard_disk_id": "",
-                            "mac_address": "",
-                            "os": "",
-                            "os_version": ""
-                        },
-                        "lyrics_effects": [],
-                        "materials": {
-                            "ai_translates": [],
-                            "audio_balances": [],
-                            "audio_effects": [],
-                            "audio_fades": [],
-                            "audio_track_indexes": [],
-                            "audios": [],
-                            "beats": [],
-                            "canvases": [],
-                            "chromas": [],
-                            "color_curves": [],
-                            "common_mask": [],
-                            "digital_humans": [],
-                            "drafts": [],
-                            "effects": [],
-                            "flowers": [],
-                            "green_screens": [],
-                            "handwrites": [],
-                            "hsl": [],
-                            "images": [],
-                            "log_color_wheels": [],
-                            "loudnesses": [],
-                            "manual_beautys": [],
-                            "manual_deformations": [],
-                            "material_animations": [],
-                            "material_colors": [],
-                            "multi_language_refs": [],
-                            "placeholder_infos": [],
-                            "placeholders": [],
-                            "plugin_effects": [],
-                            "primary_color_wheels": [],
-                            "realtime_denoises": [],
-                            "shapes": [],
-                            "smart_crops": [],
-                            "smart_relights": [],
-                            "sound_channel_mappings": [],
-                            "speeds": [],
-                            "stickers": [],
-                            "tail_leaders": [],
-                            "text_templates": [],
-                            "texts": [],
-                            "time_marks": [],
-                            "transitions": [],
-                            "video_effects": [],
-                            "video_trackings": [],
-                            "videos": [],
-                            "vocal_beautifys": [],
-                            "vocal_separations": []
-                        },
-                        "mutable_config": None,
-                        "name": "",
-                        "new_version": "75.0.0",
-                        "path": "",
-                        "platform": {
-                            "app_id": 0,
-                            "app_source": "",
-                            "app_version": "",
-                            "device_id": "",
-                            "hard_disk_id": "",
-                            "mac_address": "",
-                            "os": "",
-                            "os_version": ""
-                        },
-                        "relationships": [],
-                        "render_index_track_mode_on": False,
-                        "retouch_cover": None,
-                        "source": "default",
-                        "static_cover_image_path": "",
-                        "time_marks": None,
-                        "tracks": [],
-                        "uneven_animation_template_info": {
-                            "composition": "",
-                            "content": "",
-                            "order": "",
-                            "sub_template_info_list": []
-                        },
-                        "update_time": 0,
-                        "version": 360000
-                    }
-                )
-            elif file == "template-2.tmp":
-                FileManager.ensure_file(
-                    str(self.path / file),
-                    default_content={
-                        "canvas_config": {"background": None, "height": 1080, "ratio": "original", "width": 1920},
-                        "color_space": -1,
-                        "config": {
-                            "adjust_max_index": 1,
-                            "attachment_info": [],
-                            "combination_max_index": 1,
-                            "export_range": None,
-                            "extract_audio_last_index": 1,
-                            "lyrics_recognition_id": "",
-                            "lyrics_sync": True,
-                            "lyrics_taskinfo": [],
-                            "maintrack_adsorb": True,
-                            "material_save_mode": 0,
-                            "multi_language_current": "none",
-                            "multi_language_list": [],
-                            "multi_language_main": "none",
-                            "multi_language_mode": "none",
-                            "original_sound_last_index": 1,
-                            "record_audio_last_index": 1,
-                            "sticker_max_index": 1,
-                            "subtitle_keywords_config": None,
-                            "subtitle_recognition_id": "",
-                            "subtitle_sync": True,
-                            "subtitle_taskinfo": [],
-                            "system_font_list": [],
-                            "use_float_render": False,
-                            "video_mute": False,
-                            "zoom_info_params": None
-                        },
-                        "cover": None,
-                        "create_time": 0,
-                        "duration": 0,
-                        "extra_info": None,
-                        "fps": 30.0,
-                        "free_render_index_mode_on": False,
-                        "group_container": None,
-                        "id": "8902C01E-5B61-4a19-A1C0-28EACF11C513",
-                        "is_drop_frame_timecode": False,
-                        "keyframe_graph_list": [],
-                        "keyframes": {
-                            "adjusts": [],
-                            "audios": [],
-                            "effects": [],
-                            "filters": [],
-                            "handwrites": [],
-                            "stickers": [],
-                            "texts": [],
-                            "videos": []
-                        },
-                        "last_modified_platform": {
-                            "app_id": 359289,
-                            "app_source": "cc",
-                            "app_version": "6.2.8",
-                            "device_id": "fa71b85f68d3d9a0261399379c11fe36",
-                            "hard_disk_id": "",
-                            "mac_address": "0001a0e5b616d6fec770edbeb78d9bd9",
-                            "os": "windows",
-                            "os_version": "10.0.26100"
-                        },
-                        "lyrics_effects": [],
-                        "materials": {
-                            "ai_translates": [],
-                            "audio_balances": [],
-                            "audio_effects": [],
-                            "audio_fades": [],
-                            "audio_track_indexes": [],
-                            "audios": [],
-                            "beats": [],
-                            "canvases": [],
-                            "chromas": [],
-                            "color_curves": [],
-                            "common_mask": [],
-                            "digital_humans": [],
-                            "drafts": [],
-                            "effects": [],
-                            "flowers": [],
-                            "green_screens": [],
-                            "handwrites": [],
-                            "hsl": [],
-                            "images": [],
-                            "log_color_wheels": [],
-                            "loudnesses": [],
-                            "manual_beautys": [],
-                            "manual_deformations": [],
-                            "material_animations": [],
-                            "material_colors": [],
-                            "multi_language_refs": [],
-                            "placeholder_infos": [],
-                            "placeholders": [],
-                            "plugin_effects": [],
-                            "primary_color_wheels": [],
-                            "realtime_denoises": [],
-                            "shapes": [],
-                            "smart_crops": [],
-                            "smart_relights": [],
-                            "sound_channel_mappings": [],
-                            "speeds": [],
-                            "stickers": [],
-                            "tail_leaders": [],
-                            "text_templates": [],
-                            "texts": [],
-                            "time_marks": [],
-                            "transitions": [],
-                            "video_effects": [],
-                            "video_trackings": [],
-                            "videos": [],
-                            "vocal_beautifys": [],
-                            "vocal_separations": []
-                        },
-                        "mutable_config": None,
-                        "name": "",
-                        "new_version": "135.0.0",
-                        "path": "",
-                        "platform": {
-                            "app_id": 359289,
-                            "app_source": "cc",
-                            "app_version": "6.2.8",
-                            "device_id": "fa71b85f68d3d9a0261399379c11fe36",
-                            "hard_disk_id": "",
-                            "mac_address": "0001a0e5b616d6fec770edbeb78d9bd9",
-                            "os": "windows",
-                            "os_version": "10.0.26100"
-                        },
-                        "relationships": [],
-                        "render_index_track_mode_on": True,
-                        "retouch_cover": None,
-                        "source": "default",
-                        "static_cover_image_path": "",
-                        "time_marks": None,
-                        "tracks": [],
-                        "uneven_animation_template_info": {
-                            "composition": "",
-                            "content": "",
-                            "order": "",
-                            "sub_template_info_list": []
-                        },
-                        "update_time": 0,
-                        "version": 360000
-                    }
-                )
-            else:
-                FileManager.ensure_file(str(self.path / file), default_content={})
+        """
+        Instantiate the precompiled project template (see capgenie.template) in self.path:
+        static files are reflinked or copied, and only the per-project fields of the JSON
+        skeletons (draft id, name, paths, timestamps) are substituted and written.
+        """
+        get_template().instantiate(self.path, self.TEMPLATE_LINK_MODE)
 
     def load_json(self, filename: str):
         return FileManager.load_json(str(self.path / filename))
@@ -452,325 +88,536 @@ real_edit_keys=1
     def save_json(self, filename: str, data):
         FileManager.save_json(str(self.path / filename), data)
 
+    @instrumented("flush")
+    def flush(self, timeout: float = None):
+        """
+        Write pending write-behind edits to disk and wait for completion. No-op otherwise.
+        """
+        if self._writer is not None:
+            self._writer.flush(timeout)
+
+    def close(self):
+        """
+        Flush pending edits and stop the write-behind thread, if any.
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+    def _read_draft(self) -> Timeline:
+        """
+        Current draft for read-only use, as a Timeline: the latest committed in-memory draft in
+        write-behind mode, otherwise draft_content.json through the shared draft cache (None if
+        missing). Do not mutate it.
+        """
+        if self._writer is not None:
+            latest = self._writer.latest()
+            if latest is not None:
+                return latest
+        fpath = self.path / "draft_content.json"
+        if not fpath.exists():
+            return None
+        return draft_cache.load(str(fpath))
+
     def list_files(self):
         return [f.name for f in self.path.iterdir() if f.is_file()]
 
     def list_folders(self):
         return [f.name for f in self.path.iterdir() if f.is_dir()]
 
-    def sync_from_json(self, json_path: str = None):
+    @instrumented("sync_from_json")
+    def sync_from_json(self, json_path: str = None, backup: str = "copy", incremental: bool = False, dedup_materials: bool = False):
         """
         Écrase le projet CapCut courant à partir d'un fichier JSON simplifié (voir export_to_json pour le format).
         Prend en compte cropping temporel (source_in/source_out), position sur la timeline (start_time), volume, type, piste.
+        The new draft is built once and serialized once; draft_content.json.bak receives the same bytes.
+        :param json_path: simplified JSON to apply (defaults to the project's json_path)
+        :param backup: how draft_content.json.bak is derived: "copy" (byte copy), "link" (hardlink,
+            falls back to a copy where unsupported) or "none" (leave the .bak untouched, for batch runs)
+        :param incremental: diff the sequences against the existing segments instead of rebuilding
+            the timeline. Unchanged segments keep their ids and the draft is only written when
+            something changed.
+        :param dedup_materials: segments cut from the same media file (with the same fades) share
+            one video/audio material instead of getting one each; source range and volume stay
+            on the segments. In incremental mode, new segments also reuse existing materials.
+        :return: in incremental mode, a dict counting inserted/updated/deleted/unchanged segments
         """
-        import json, uuid, os
         if json_path is None:
             json_path = self.json_path
-        with open(json_path, 'r', encoding='utf-8') as f:
-            project_data = json.load(f)
-        # Réinitialiser les tracks et materials
-        for fname in ["draft_content.json", "draft_content.json.bak"]:
-            fpath = self.path / fname
-            if not fpath.exists():
+        project_data = FileManager.load_json(str(json_path))
+        return self.sync_from_data(project_data, backup=backup, incremental=incremental, dedup_materials=dedup_materials)
+
+    @instrumented("sync_from_data")
+    def sync_from_data(self, project_data: dict, backup: str = "copy", incremental: bool = False, dedup_materials: bool = False):
+        """
+        Same as sync_from_json, from an already parsed simplified document ({"sequences": [...]}).
+        The sequences are converted and validated as a batch first (see capgenie.sequences),
+        and their media probed for real durations and dimensions (see capgenie.probe):
+        invalid input raises ValueError before the draft is loaded.
+        """
+        with phase("validate"):
+            batch = prepare_sequences(project_data.get('sequences', []))
+            batch.check()
+        with phase("probe"):
+            batch.check_media(probe_paths(seq['path'] for seq in batch.sequences))
+            batch.check()
+        def apply(tl):
+            count("segments_processed", len(batch))
+            timeline = tl.timeline
+            if not incremental:
+                with phase("build"):
+                    self._rebuild_timeline(timeline, batch, dedup_materials)
+                tl.mark_dirty()
+                return None
+            with phase("build"):
+                summary = self._apply_sequences_incremental(timeline, batch, dedup_materials)
+            if summary['inserted'] or summary['updated'] or summary['deleted']:
+                tl.mark_dirty()
+            return summary
+        return self._apply_edit(apply, backup)
+
+    def _rebuild_timeline(self, timeline: Timeline, batch: SequenceBatch, dedup_materials: bool = False):
+        """
+        Réinitialise les tracks et materials de la timeline puis les reconstruit à partir des séquences du JSON simplifié.
+        """
+        timeline.tracks = []
+        timeline.materials['videos'] = []
+        timeline.materials['audios'] = []
+        materials = timeline.raw_materials
+        materials.setdefault('videos', None)
+        materials.setdefault('audios', None)
+        # --- Fix: Always reset audio_fades to avoid duplicates and ensure correct references ---
+        materials['audio_fades'] = []
+        # Index des canvases/speeds/placeholders existants, par chemin de média (construit une seule fois)
+        helpers = PathMaterialIndex(materials, HELPER_MATERIAL_CATEGORIES)
+        shared = {} if dedup_materials else None
+        # Création des tracks
+        tracks = {}
+        for n, seq in enumerate(batch.sequences):
+            idx = batch.track_indexes[n]
+            if idx not in tracks:
+                tracks[idx] = new_track(batch.types[n], idx)
+            self._build_sequence(timeline, tracks[idx], seq, helpers, batch.types[n], batch.timing(n), batch.media_info(n), shared)
+
+        # Injection des tracks dans le projet
+        timeline.tracks = [tracks[k] for k in sorted(tracks.keys())]
+        timeline.invalidate_index()
+        timeline.finalize()
+        count("index_hits", helpers.hits)
+        count("materials_processed", helpers.misses + len(timeline.materials['videos']) + len(timeline.materials['audios']))
+
+    def _apply_sequences_incremental(self, timeline: Timeline, batch: SequenceBatch, dedup_materials: bool = False) -> dict:
+        """
+        Applique le JSON simplifié au draft par différence : chaque séquence est appariée à un
+        segment existant de même piste, chemin et plage timeline. Les segments appariés gardent
+        leurs ids (cropping et volume mis à jour sur place), les autres sont supprimés ou créés.
+        Un changement de fondu remplace le segment, son material portant le fondu.
+        """
+        index = timeline.material_index()
+        fades = timeline.fade_index()
+        # Nombre de segments par material : un material partagé n'est supprimé qu'avec son dernier segment
+        uses = Counter(mat_id for track in timeline.tracks for mat_id in track.material_ids)
+        existing = {}
+        for idx, track in enumerate(timeline.tracks):
+            ttype = track.type
+            category = TRACK_MATERIAL_CATEGORIES.get(ttype)
+            if category is None:
                 continue
-            with open(fpath, 'r', encoding='utf-8') as f2:
-                data = json.load(f2)
-            data['tracks'] = []
-            data.setdefault('materials', {})
-            data['materials']['videos'] = []
-            data['materials']['audios'] = []
-            # --- Fix: Always reset audio_fades to avoid duplicates and ensure correct references ---
-            data['materials']['audio_fades'] = []
-            # Création des tracks
-            tracks = {}
-            for seq in project_data.get('sequences', []):
-                idx = seq.get('track_index', 0 if seq.get('type','video')=='video' else 1)
-                if idx not in tracks:
-                    tracks[idx] = {
-                        "attribute": 0,
-                        "flag": 0,
-                        "id": f"TRACK-{idx}" if seq['type']=="video" else f"AUDIO-TRACK-{idx}",
-                        "is_default_name": True,
-                        "name": f"Track {idx}" if seq['type']=="video" else f"Audio Track {idx}",
-                        "segments": [],
-                        "type": seq['type']
-                    }
-                # Ajout dans materials
-                mat_id = str(uuid.uuid4()).upper()
-                source_in = seq.get('source_in', 0.0)
-                source_out = seq.get('source_out', None)
-                seg_duration = seq['end_time']-seq['start_time']
-                if source_out is None:
-                    source_out = source_in + seg_duration
-                source_in_us = int(source_in * 1_000_000)
-                source_out_us = int(source_out * 1_000_000)
-                source_duration = source_out_us - source_in_us
-                fade_in_us = int(seq.get('fade_in_duration', 0.0) * 1_000_000)
-                fade_out_us = int(seq.get('fade_out_duration', 0.0) * 1_000_000)
-                # --- Fix: For each video, create a single audio_fade object if needed, and reference it in both video and global list ---
-                if seq['type'] == 'video':
-                    video_obj = {
-                        "id": mat_id,
-                        "path": seq['path'],
-                        "duration": source_duration,
-                        "material_name": os.path.basename(seq['path']),
-                        "volume": seq.get('volume', 1.0),
-                        "width": 1280,
-                        "height": 720,
-                        "type": "video"
-                    }
-                    if fade_in_us == 0 and fade_out_us == 0:
-                        # No fade: CapCut expects audio_fade to be null
-                        video_obj["audio_fade"] = None
-                    else:
-                        # Fade present: create a unique audio_fade object, add to global list, and reference in video
-                        audio_fade_id = str(uuid.uuid4()).upper()
-                        audio_fade_obj = {
-                            "fade_in_duration": fade_in_us,
-                            "fade_out_duration": fade_out_us,
-                            "fade_type": 0,
-                            "id": audio_fade_id,
-                            "type": "audio_fade"
-                        }
-                        video_obj["audio_fade"] = audio_fade_obj
-                        data['materials']['audio_fades'].append(audio_fade_obj)
-                    data['materials']['videos'].append(video_obj)
-                elif seq['type'] == 'audio':
-                    audio_obj = {
-                        "id": mat_id,
-                        "path": seq['path'],
-                        "duration": source_duration,
-                        "material_name": os.path.basename(seq['path']),
-                        "volume": seq.get('volume', 1.0),
-                        "type": "audio"
-                    }
-                    data['materials']['audios'].append(audio_obj)
-                    # For audio, only add to global audio_fades if fade is present
-                    if fade_in_us > 0 or fade_out_us > 0:
-                        audio_fade_obj = {
-                            "fade_in_duration": fade_in_us,
-                            "fade_out_duration": fade_out_us,
-                            "fade_type": 0,
-                            "id": mat_id,  # For audio, use material id as fade id
-                            "type": "audio_fade"
-                        }
-                        data['materials']['audio_fades'].append(audio_fade_obj)
-                # Ajout du segment dans la piste
-                # --- Génération des ressources associées pour CapCut ---
-                extra_refs = []
-                # 1. Canvas : un par vidéo, réutilisé si déjà créé
-                if 'canvases' not in data['materials']:
-                    data['materials']['canvases'] = []
-                canvas_id = None
-                for c in data['materials']['canvases']:
-                    if c.get('material_name', None) == seq['path']:
-                        canvas_id = c['id']
-                        break
-                if not canvas_id:
-                    canvas_id = str(uuid.uuid4()).upper()
-                    data['materials']['canvases'].append({
-                        "id": canvas_id,
-                        "type": "canvas_color",
-                        "color": "",
-                        "blur": 0.0,
-                        "album_image": "",
-                        "image": "",
-                        "image_id": "",
-                        "image_name": "",
-                        "source_platform": 0,
-                        "team_id": "",
-                        "material_name": seq['path']
-                    })
-                extra_refs.append(canvas_id)
+            for i in range(len(track)):
+                if not track.is_media(i):
+                    continue
+                found = index.get(track.material_ids[i])
+                if found is None or found[0] != category:
+                    continue
+                mat = found[1]
+                key = (idx, ttype, mat.get('path'), track.starts[i], track.durations[i])
+                existing.setdefault(key, []).append((track, i, mat))
+
+        summary = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        to_insert = []
+        stale = []
+        for n, seq in enumerate(batch.sequences):
+            ttype = batch.types[n]
+            idx = batch.track_indexes[n]
+            timing = batch.timing(n)
+            key = (idx, ttype, seq['path'], timing[0], timing[1])
+            matches = existing.get(key)
+            if not matches:
+                to_insert.append((idx, seq, ttype, timing, batch.media_info(n)))
+                summary['inserted'] += 1
+                continue
+            track, i, mat = matches.pop(0)
+            if not matches:
+                del existing[key]
+            changed = self._update_segment_in_place(track, i, mat, seq, ttype, fades, timing, batch.media_info(n),
+                                                    dedup_materials or uses[mat.id] > 1)
+            if changed is None:
+                # Le fondu a changé : le segment est remplacé
+                stale.append((track, i, mat))
+                to_insert.append((idx, seq, ttype, timing, batch.media_info(n)))
+                summary['updated'] += 1
+            elif changed:
+                summary['updated'] += 1
+            else:
+                summary['unchanged'] += 1
+        for entries in existing.values():
+            stale.extend(entries)
+            summary['deleted'] += len(entries)
 
-                # 2. Speed : un par vidéo, réutilisé si déjà créé
-                if 'speeds' not in data['materials']:
-                    data['materials']['speeds'] = []
-                speed_id = None
-                for s in data['materials']['speeds']:
-                    if s.get('material_name', None) == seq['path']:
-                        speed_id = s['id']
-                        break
-                if not speed_id:
-                    speed_id = str(uuid.uuid4()).upper()
-                    data['materials']['speeds'].append({
-                        "id": speed_id,
-                        "type": "speed",
-                        "mode": 0,
-                        "speed": 1.0,
-                        "curve_speed": None,
-                        "material_name": seq['path']
-                    })
-                extra_refs.append(speed_id)
+        # Suppressions groupées : un seul filtrage par piste et par catégorie de materials
+        dropped_materials, dropped_fades, touched_tracks = set(), set(), {}
+        for track, i, mat in stale:
+            uses[mat.id] -= 1
+            if not uses[mat.id]:
+                dropped_materials.add(mat.id)
+                fade = fade_of(mat, track.type, fades)
+                if fade:
+                    dropped_fades.add(fade.get('id'))
+            touched_tracks.setdefault(id(track), (track, []))[1].append(i)
+        for track, positions in touched_tracks.values():
+            track.remove(positions)
+        for category, dropped in (('videos', dropped_materials), ('audios', dropped_materials), ('audio_fades', dropped_fades)):
+            timeline.remove_materials(category, dropped)
+        if stale:
+            timeline.invalidate_index()
+
+        # Insertions, puis remise en ordre chronologique des pistes modifiées
+        if to_insert:
+            materials = timeline.raw_materials
+            helpers = PathMaterialIndex(materials, HELPER_MATERIAL_CATEGORIES)
+            timeline.category('videos')
+            timeline.category('audios')
+            timeline.category('audio_fades')
+            shared = self._shared_materials(timeline) if dedup_materials else None
+            sorted_tracks = {}
+            for idx, seq, ttype, timing, info in to_insert:
+                track = timeline.track_for(ttype, idx)
+                self._build_sequence(timeline, track, seq, helpers, ttype, timing, info, shared)
+                sorted_tracks[id(track)] = track
+            for track in sorted_tracks.values():
+                track.sort_by_start()
+            timeline.invalidate_index()
+            count("index_hits", helpers.hits)
+            count("materials_processed", helpers.misses + len(to_insert))
+        timeline.finalize()
+        return summary
+
+    @staticmethod
+    def _update_segment_in_place(track: Track, i: int, mat: Material, seq: dict, ttype: str, fades: dict, timing: tuple, info: MediaInfo = None, shared: bool = False):
+        """
+        Met à jour cropping et volume d'un segment apparié (timing : voir SequenceBatch.timing).
+        Un material partagé (`shared`) garde une durée couvrant toutes les plages source.
+        Retourne True si modifié, False si identique, None si le fondu diffère (remplacement nécessaire).
+        """
+        _, _, source_in_us, source_duration, fade_in_us, fade_out_us = timing
+        fade = fade_of(mat, ttype, fades)
+        current_fade = (fade.get('fade_in_duration', 0), fade.get('fade_out_duration', 0)) if fade else (0, 0)
+        if current_fade != (fade_in_us, fade_out_us):
+            return None
+        volume = seq.get('volume', 1.0)
+        if (track.has_source(i) and track.source_starts[i] == source_in_us
+                and track.source_durations[i] == source_duration and track.volume(i) == volume):
+            return False
+        track.set_source(i, source_in_us, source_duration)
+        track.set_volume(i, volume)
+        if shared:
+            mat.duration = media_duration(info, max(mat.get('duration', 0), source_in_us + source_duration))
+        else:
+            mat.duration = media_duration(info, source_duration)
+            mat.volume = volume
+        return True
+
+    @staticmethod
+    def _shared_materials(timeline: Timeline) -> dict:
+        """
+        Materials vidéo/audio réutilisables en mode dédupliqué, par (type, chemin, fondu entrant, fondu sortant).
+        """
+        fades = timeline.fade_index()
+        shared = {}
+        for ttype, category in TRACK_MATERIAL_CATEGORIES.items():
+            for mat in timeline.materials.get(category, ()):
+                fade = fade_of(mat, ttype, fades)
+                key = (ttype, mat.get('path'), fade.get('fade_in_duration', 0) if fade else 0,
+                       fade.get('fade_out_duration', 0) if fade else 0)
+                shared.setdefault(key, mat)
+        return shared
+
+    def _build_sequence(self, timeline: Timeline, track: Track, seq: dict, helpers: PathMaterialIndex, ttype: str, timing: tuple, info: MediaInfo = None, shared: dict = None):
+        """
+        Crée dans la timeline les materials d'une séquence simplifiée (média, fade,
+        canvas/speed/placeholder réutilisés par chemin) et ajoute le segment correspondant à `track`.
+        Les durées viennent du lot préparé (timing : voir SequenceBatch.timing), la durée
+        et les dimensions réelles du média de `info` quand il a pu être sondé.
+        En mode dédupliqué, `shared` ((type, chemin, fondus) -> Material) fournit le material
+        média à réutiliser et reçoit ceux qui sont créés.
+        """
+        start_us, duration_us, source_in_us, source_duration, fade_in_us, fade_out_us = timing
+        key = (ttype, seq['path'], fade_in_us, fade_out_us)
+        mat = shared.get(key) if shared is not None else None
+        if mat is not None:
+            count("materials_deduplicated")
+            if info is None or not info.duration:
+                # Durée inconnue : le material partagé couvre toutes les plages source utilisées
+                mat.duration = max(mat.get('duration', 0), source_in_us + source_duration)
+        else:
+            fallback = source_in_us + source_duration if shared is not None else source_duration
+            mat = self._create_media_material(timeline, seq, ttype, fade_in_us, fade_out_us,
+                                              media_duration(info, fallback), info)
+            if shared is not None:
+                shared[key] = mat
+        mat_id = mat.id
+        # Ajout du segment dans la piste
+        # --- Génération des ressources associées pour CapCut ---
+        extra_refs = self._helper_refs(seq, helpers)
 
-                # 3. Placeholder : un par vidéo, réutilisé si déjà créé
-                if 'placeholder_infos' not in data['materials']:
-                    data['materials']['placeholder_infos'] = []
-                placeholder_id = None
-                for p in data['materials']['placeholder_infos']:
-                    if p.get('material_name', None) == seq['path']:
-                        placeholder_id = p['id']
-                        break
-                if not placeholder_id:
-                    placeholder_id = str(uuid.uuid4()).upper()
-                    data['materials']['placeholder_infos'].append({
-                        "id": placeholder_id,
-                        "type": "placeholder_info",
-                        "meta_type": "none",
-                        "res_path": "",
-                        "res_text": "",
-                        "error_path": "",
-                        "error_text": "",
-                        "material_name": seq['path']
-                    })
-                extra_refs.append(placeholder_id)
+        # 4. Audio Fade : only if fade is present and for video, add the fade id to extra_refs
+        if ttype == 'video' and (fade_in_us > 0 or fade_out_us > 0):
+            if mat.audio_fade:
+                extra_refs.append(mat.audio_fade['id'])
+        elif ttype == 'audio' and (fade_in_us > 0 or fade_out_us > 0):
+            extra_refs.append(mat_id)  # For audio, fade id is mat_id
 
-                # 4. Audio Fade : only if fade is present and for video, add the fade id to extra_refs
-                if seq['type'] == 'video' and fade_in_us > 0 or fade_out_us > 0:
-                    if fade_in_us > 0 or fade_out_us > 0 and video_obj.get('audio_fade'):
-                        extra_refs.append(video_obj['audio_fade']['id'])
-                elif seq['type'] == 'audio' and fade_in_us > 0 or fade_out_us > 0:
-                    extra_refs.append(mat_id)  # For audio, fade id is mat_id
+        # --- Création du segment avec toutes les références (canvas, speed, placeholder, fade...) ---
+        timeline.add_segment(track, new_id(), mat_id, start_us, duration_us,
+                             source_in_us, source_duration, seq.get('volume', 1.0),
+                             fade_in_us, fade_out_us, extra_refs)
 
-                # --- Création du segment vidéo avec toutes les références ---
-                segment = {
-                    "id": str(uuid.uuid4()).upper(),
-                    "material_id": mat_id,
-                    "target_timerange": {
-                        "start": int(seq['start_time']*1_000_000),
-                        "duration": int(seg_duration*1_000_000)
-                    },
-                    "source_timerange": {
-                        "start": source_in_us,
-                        "duration": source_duration
-                    },
-                    "volume": seq.get('volume', 1.0),
-                    "fade_in": {"duration": int(seq.get('fade_in_duration', 0.0) * 1_000_000)},
-                    "fade_out": {"duration": int(seq.get('fade_out_duration', 0.0) * 1_000_000)},
-                    # CapCut references (canvas, speed, placeholder, fade...)
-                    "extra_material_refs": extra_refs
+    @staticmethod
+    def _create_media_material(timeline: Timeline, seq: dict, ttype: str, fade_in_us: int, fade_out_us: int, duration: int, info: MediaInfo = None) -> Material:
+        """
+        Crée le material vidéo/audio d'une séquence, avec son fondu (inline pour une vidéo,
+        dans materials.audio_fades sous l'id du material pour un audio).
+        """
+        materials = timeline.raw_materials
+        # Ajout dans materials
+        mat_id = new_id()
+        # --- Fix: For each video, create a single audio_fade object if needed, and reference it in both video and global list ---
+        if ttype == 'video':
+            width, height = media_dimensions(info)
+            video_obj = Material(mat_id, path=seq['path'], duration=duration,
+                                 name=os.path.basename(seq['path']), volume=seq.get('volume', 1.0),
+                                 width=width, height=height, type="video")
+            if fade_in_us == 0 and fade_out_us == 0:
+                # No fade: CapCut expects audio_fade to be null
+                video_obj.audio_fade = None
+            else:
+                # Fade present: create a unique audio_fade object, add to global list, and reference in video
+                audio_fade_obj = {
+                    "fade_in_duration": fade_in_us,
+                    "fade_out_duration": fade_out_us,
+                    "fade_type": 0,
+                    "id": new_id(),
+                    "type": "audio_fade"
                 }
-                tracks[idx]['segments'].append(segment)
+                video_obj.audio_fade = audio_fade_obj
+                materials['audio_fades'].append(audio_fade_obj)
+            timeline.materials['videos'].append(video_obj)
+            return video_obj
+        else:
+            audio_obj = Material(mat_id, path=seq['path'], duration=duration,
+                                 name=os.path.basename(seq['path']), volume=seq.get('volume', 1.0), type="audio")
+            timeline.materials['audios'].append(audio_obj)
+            # For audio, only add to global audio_fades if fade is present
+            if fade_in_us > 0 or fade_out_us > 0:
+                audio_fade_obj = {
+                    "fade_in_duration": fade_in_us,
+                    "fade_out_duration": fade_out_us,
+                    "fade_type": 0,
+                    "id": mat_id,  # For audio, use material id as fade id
+                    "type": "audio_fade"
+                }
+                materials['audio_fades'].append(audio_fade_obj)
+            return audio_obj
+
+    @staticmethod
+    def _helper_refs(seq: dict, helpers: PathMaterialIndex) -> list:
+        """
+        Ids des canvas, speed et placeholder du média de la séquence, créés s'ils n'existent pas encore.
+        """
+        extra_refs = []
+        # 1. Canvas : un par vidéo, réutilisé si déjà créé
+        canvas_id = helpers.get_or_create('canvases', seq['path'], lambda: {
+            "id": new_id(),
+            "type": "canvas_color",
+            "color": "",
+            "blur": 0.0,
+            "album_image": "",
+            "image": "",
+            "image_id": "",
+            "image_name": "",
+            "source_platform": 0,
+            "team_id": "",
+            "material_name": seq['path']
+        })
+        extra_refs.append(canvas_id)
+
+        # 2. Speed : un par vidéo, réutilisé si déjà créé
+        speed_id = helpers.get_or_create('speeds', seq['path'], lambda: {
+            "id": new_id(),
+            "type": "speed",
+            "mode": 0,
+            "speed": 1.0,
+            "curve_speed": None,
+            "material_name": seq['path']
+        })
+        extra_refs.append(speed_id)
 
-            # Injection des tracks dans le projet
-            data['tracks'] = [tracks[k] for k in sorted(tracks.keys())]
-            # Correction de la durée du projet
-            max_end = 0
-            for t in data['tracks']:
-                for s in t['segments']:
-                    end = s['target_timerange']['start'] + s['target_timerange']['duration']
-                    if end > max_end:
-                        max_end = end
-            if 'duration' in data:
-                data['duration'] = max_end
-            # Patch: force la présence du champ audio_fade dans chaque vidéo
-            if 'materials' in data and 'videos' in data['materials']:
-                for v in data['materials']['videos']:
-                    if 'audio_fade' not in v:
-                        v['audio_fade'] = None
-            with open(fpath, 'w', encoding='utf-8') as f2:
-                json.dump(data, f2, indent=2)
+        # 3. Placeholder : un par vidéo, réutilisé si déjà créé
+        placeholder_id = helpers.get_or_create('placeholder_infos', seq['path'], lambda: {
+            "id": new_id(),
+            "type": "placeholder_info",
+            "meta_type": "none",
+            "res_path": "",
+            "res_text": "",
+            "error_path": "",
+            "error_text": "",
+            "material_name": seq['path']
+        })
+        extra_refs.append(placeholder_id)
+        return extra_refs
 
-    def export_to_json(self, export_path: str):
+    @instrumented("export_to_json")
+    def export_to_json(self, export_path: str, streaming: bool = False, incremental: bool = False) -> bool:
         """
         Exporte le projet CapCut courant dans un fichier JSON simplifié (voir doc).
         Inclut cropping temporel (source_in/source_out), position sur la timeline (start_time), volume, type, piste.
+        Single pass over the segments; materials and fades are resolved through id indexes.
+        :param streaming: read draft_content.json incrementally, keeping only segments and
+            video/audio/fade materials in memory, and write sequences as they are resolved.
+            Meant for very large drafts; ignored when a write-behind draft is held in memory.
+        :param incremental: keep a fingerprint of each track in `<export_path>.state` and, on the
+            next incremental export to the same file, only rebuild the tracks whose fingerprint
+            changed, reusing the previous output for the others. Nothing is rewritten when the
+            draft is unchanged. The previous output is reused from memory, or read back from
+            export_path by a fresh Project.
+        :return: False when an incremental export found nothing changed since the previous one, True otherwise
         """
-        import json
-        for fname in ["draft_content.json"]:
-            fpath = self.path / fname
-            if not fpath.exists():
-                continue
-            with open(fpath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            sequences = []
-            for idx, track in enumerate(data.get('tracks', [])):
-                ttype = track.get('type', 'video')
-                for seg in track.get('segments', []):
-                    mat_id = seg.get('material_id')
-                    # Chercher dans materials
-                    mat = None
-                    if ttype == 'video':
-                        for v in data.get('materials', {}).get('videos', []):
-                            if v.get('id') == mat_id:
-                                mat = v
-                                break
-                    elif ttype == 'audio':
-                        for a in data.get('materials', {}).get('audios', []):
-                            if a.get('id') == mat_id:
-                                mat = a
-                                break
-            with open(export_path, 'w', encoding='utf-8') as f:
-                json.dump({"sequences": sequences}, f, indent=2)
+        if incremental:
+            return self._export_incremental(str(export_path))
+        if streaming and (self._writer is None or self._writer.latest() is None):
+            fpath = self.path / "draft_content.json"
+            if fpath.exists():
+                with phase("stream"):
+                    stream_export(str(fpath), str(export_path))
+            return True
+        data = self._read_draft()
+        if data is None:
+            return True
+        with phase("build"):
+            sequences = data.sequences()
+        count("segments_processed", len(sequences))
+        # Sauvegarde du json simplifié
+        FileManager.save_json(str(export_path), {"sequences": sequences})
+        return True
 
+    def _export_incremental(self, export_path: str) -> bool:
+        state_path = export_path + self.EXPORT_STATE_SUFFIX
+        state = self._load_export_state(state_path, export_path)
+        # Version read before the draft: a save landing in between only causes an extra rebuild next time
+        in_memory = self._writer is not None and self._writer.latest() is not None
+        draft_version = None if in_memory else file_version(str(self.path / "draft_content.json"))
+        if state is not None and draft_version is not None and state["draft"] == list(draft_version):
+            count("tracks_reused", sum(fp is not None for fp in state["tracks"]))
+            return False
+        data = self._read_draft()
+        if data is None:
+            return False
+        with phase("fingerprint"):
+            fingerprints = data.track_fingerprints()
+        previous = state["tracks"] if state is not None else []
+        if state is not None and previous == fingerprints:
+            count("tracks_reused", sum(fp is not None for fp in fingerprints))
+            self._save_export_state(state_path, draft_version, state["export"], fingerprints)
+            return False
+        # Unchanged tracks are taken from the previous output: held by this Project, or read back
+        # from the export file, whose version the state already matched
+        cached = None
+        if state is not None:
+            cached = self._exports.get(export_path)
+            if cached is None or cached[0] != state["export"]:
+                cached = self._load_previous_export(export_path, state["export"])
+        changed = {idx for idx, fp in enumerate(fingerprints)
+                   if fp is not None and (cached is None or idx >= len(previous) or previous[idx] != fp)}
+        with phase("build"):
+            by_track = _group_by_track(data.sequences(changed))
+        count("tracks_rebuilt", len(changed))
+        count("segments_processed", sum(len(track) for track in by_track.values()))
+        if cached is not None:
+            count("tracks_reused", sum(fp is not None for fp in fingerprints) - len(changed))
+            by_track = {idx: (by_track if idx in changed else cached[1]).get(idx, [])
+                        for idx, fp in enumerate(fingerprints) if fp is not None}
+        sequences = [seq for track in by_track.values() for seq in track]
+        FileManager.save_json(export_path, {"sequences": sequences})
+        export_version = list(file_version(export_path))
+        self._exports[export_path] = (export_version, by_track)
+        self._save_export_state(state_path, draft_version, export_version, fingerprints)
+        return True
+
+    @staticmethod
+    def _load_export_state(state_path: str, export_path: str):
+        """State of the previous incremental export, None when missing or when the export was replaced since."""
+        try:
+            state = FileManager.load_json(state_path)
+        except (OSError, ValueError):
+            return None
+        version = file_version(export_path)
+        if not isinstance(state, dict) or version is None or state.get("export") != list(version):
+            return None
+        return state
+
+    @staticmethod
+    def _load_previous_export(export_path: str, export_version):
+        """(version, sequences grouped by track) of the previous export, None when it cannot be read back."""
+        try:
+            sequences = FileManager.load_json(export_path)["sequences"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not isinstance(sequences, list) or not all(isinstance(seq, dict) for seq in sequences):
+            return None
+        return export_version, _group_by_track(sequences)
+
+    @staticmethod
+    def _save_export_state(state_path: str, draft_version, export_version, fingerprints):
+        state = {"draft": list(draft_version) if draft_version is not None else None,
+                 "export": export_version, "tracks": fingerprints}
+        FileManager.save_json(state_path, state, compact=True)
+
+    def _apply_edit(self, apply, backup: str = "copy"):
         """
-        Exporte le projet CapCut courant dans un fichier JSON simplifié (voir doc).
+        Run apply(session) in an edit session (joining the open one, if any) and commit it.
+        In optimistic mode, a commit that lost the race against another writer is re-applied
+        on a fresh draft up to `self.retries` times.
         """
-        import json
-        for fname in ["draft_content.json"]:
-            fpath = self.path / fname
-            if not fpath.exists():
-                continue
-            with open(fpath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            sequences = []
-            track_types = []
-            for idx, track in enumerate(data.get('tracks', [])):
-                ttype = track.get('type', 'video')
-                track_types.append(ttype)
-                for seg in track.get('segments', []):
-                    mat_id = seg.get('material_id')
-                    # Chercher dans materials
-                    mat = None
-                    if ttype == 'video':
-                        for v in data.get('materials', {}).get('videos', []):
-                            if v.get('id') == mat_id:
-                                mat = v
-                                break
-                    elif ttype == 'audio':
-                        for a in data.get('materials', {}).get('audios', []):
-                            if a.get('id') == mat_id:
-                                mat = a
-                                break
-                    if mat:
-                        start = seg['target_timerange']['start']/1_000_000
-                        end = (seg['target_timerange']['start']+seg['target_timerange']['duration'])/1_000_000
-                        source_in = seg.get('source_timerange', {}).get('start', 0)/1_000_000
-                        source_out = (seg.get('source_timerange', {}).get('start', 0) + seg.get('source_timerange', {}).get('duration', seg['target_timerange']['duration']))/1_000_000
-                        # Pour la vidéo : fade dans mat['audio_fade'] si présent
-                        fade_in = 0.0
-                        fade_out = 0.0
-                        if ttype == 'video' and mat:
-                            audio_fade = mat.get('audio_fade')
-                            if audio_fade:
-                                fade_in = audio_fade.get('fade_in_duration', 0) / 1_000_000
-                                fade_out = audio_fade.get('fade_out_duration', 0) / 1_000_000
-                        # Pour l'audio : chercher dans materials.audio_fades
-                        elif ttype == 'audio' and mat:
-                            audio_fade = None
-                            for af in data.get('materials', {}).get('audio_fades', []):
-                                if af.get('id') == mat.get('id'):
-                                    audio_fade = af
-                                    break
-                            if audio_fade:
-                                fade_in = audio_fade.get('fade_in_duration', 0) / 1_000_000
-                                fade_out = audio_fade.get('fade_out_duration', 0) / 1_000_000
-                        sequences.append({
-                            "path": mat.get('path'),
-                            "start_time": start,
-                            "end_time": end,
-                            "source_in": float(source_in),
-                            "source_out": float(source_out),
-                            "fade_in_duration": float(fade_in),
-                            "fade_out_duration": float(fade_out),
-                            "volume": seg.get('volume', mat.get('volume', 1.0)),
-                            "type": ttype,
-                            "track_index": idx
-                        })
-            # Sauvegarde du json simplifié
-            with open(export_path, 'w', encoding='utf-8') as f:
-                json.dump({"sequences": sequences}, f, indent=2)
+        attempt = 0
+        while True:
+            try:
+                with self.edit(backup=backup) as tl:
+                    return apply(tl)
+            except ConcurrentModificationError:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                count("conflict_retries")
+
+    def edit(self, backup: str = "copy") -> EditSession:
+        """
+        Open a batched edit session on the draft: the draft is parsed once, any number of
+        add/remove/modify operations are applied in memory, and draft_content.json and its
+        .bak are written once when the `with` block exits. If an exception escapes the block,
+        nothing is written.
 
+            with project.edit() as tl:
+                tl.add_video(...)
+                project.add_audio_sequence(...)  # joins the open session
+
+        :param backup: how draft_content.json.bak is derived on commit ("copy", "link" or "none");
+            ignored when joining an already open session
+        :return: the active EditSession, or a new one if none is open
+        """
+        if self._session is None:
+            return EditSession(self, backup=backup)
+        return self._session
+
+    @instrumented("add_video_sequence")
     def add_video_sequence(self, video_path: str, start_time: float, end_time: float, source_in: float = 0.0, source_out: float = None, volume: float = 1.0, track_index: int = 0, fade_in_duration: float = 0.0, fade_out_duration: float = 0.0):
         """
         Ajoute une séquence vidéo au projet CapCut, avec cropping temporel optionnel.
@@ -781,74 +628,13 @@ real_edit_keys=1
         - source_out: fin du tronçon dans la vidéo source (en secondes, défaut=fin du fichier)
         - volume: volume de la séquence
         - track_index: numéro de la piste vidéo (défaut 0)
+        Inside a `with project.edit()` block the change is only written when the block exits.
+        Retourne l'id du segment créé.
         """
-        import uuid, json
-        from pathlib import Path
-        start_us = int(start_time * 1_000_000)
-        end_us = int(end_time * 1_000_000)
-        duration = end_us - start_us
-        if source_out is None:
-            # On suppose que la longueur du tronçon est end_time-start_time si non précisé
-            source_out = source_in + (end_time - start_time)
-        source_in_us = int(source_in * 1_000_000)
-        source_out_us = int(source_out * 1_000_000)
-        source_duration = source_out_us - source_in_us
-        for fname in ["draft_content.json", "draft_content.json.bak"]:
-            fpath = self.path / fname
-            if not fpath.exists():
-                continue
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            video_id = str(uuid.uuid4()).upper()
-            segment_id = str(uuid.uuid4()).upper()
-            data.setdefault("materials", {})
-            data["materials"].setdefault("videos", [])
-            data["materials"]["videos"].append({
-                "id": video_id,
-                "path": video_path,
-                "duration": source_duration,
-                "material_name": Path(video_path).name,
-                "volume": volume,
-                "width": 1280,
-                "height": 720,
-                "type": "video"
-            })
-            data.setdefault("tracks", [])
-            # Chercher la piste vidéo voulue
-            video_track = None
-            for t in data["tracks"]:
-                if t.get("type") == "video" and data["tracks"].index(t) == track_index:
-                    video_track = t
-                    break
-            if not video_track:
-                video_track = {
-                    "attribute": 0,
-                    "flag": 0,
-                    "id": f"TRACK-{track_index}",
-                    "is_default_name": True,
-                    "name": f"Track {track_index}",
-                    "segments": [],
-                    "type": "video"
-                }
-                # Ajoute à la bonne position
-                while len(data["tracks"]) <= track_index:
-                    data["tracks"].append({"type": "video", "segments": []})
-                data["tracks"][track_index] = video_track
-            segments = video_track["segments"]
-            segment_entry = {
-                "id": segment_id,
-                "material_id": video_id,
-                "target_timerange": {"start": start_us, "duration": duration},
-                "source_timerange": {"start": source_in_us, "duration": source_duration},
-                "volume": volume,
-                "fade_in": {"duration": int(fade_in_duration * 1_000_000)},
-                "fade_out": {"duration": int(fade_out_duration * 1_000_000)}
-            }
-            segments.append(segment_entry)
-            # Sauvegarder le fichier
-            with open(fpath, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+        return self._apply_edit(lambda tl: tl.add_video(video_path, start_time, end_time, source_in, source_out,
+                                                        volume, track_index, fade_in_duration, fade_out_duration))
 
+    @instrumented("add_audio_sequence")
     def add_audio_sequence(self, audio_path: str, start_time: float, end_time: float, source_in: float = 0.0, source_out: float = None, volume: float = 1.0, track_index: int = 1, fade_in_duration: float = 0.0, fade_out_duration: float = 0.0):
         """
         Ajoute une séquence audio au projet CapCut, avec cropping temporel optionnel.
@@ -859,243 +645,81 @@ real_edit_keys=1
         - source_out: fin du tronçon dans l'audio source (en secondes, défaut=fin du fichier)
         - volume: volume de la séquence
         - track_index: numéro de la piste audio (défaut 1)
+        Inside a `with project.edit()` block the change is only written when the block exits.
+        Retourne l'id du segment créé.
         """
-        import uuid, json
-        from pathlib import Path
-        start_us = int(start_time * 1_000_000)
-        end_us = int(end_time * 1_000_000)
-        duration = end_us - start_us
-        if source_out is None:
-            source_out = source_in + (end_time - start_time)
-        source_in_us = int(source_in * 1_000_000)
-        source_out_us = int(source_out * 1_000_000)
-        source_duration = source_out_us - source_in_us
-        for fname in ["draft_content.json", "draft_content.json.bak"]:
-            fpath = self.path / fname
-            if not fpath.exists():
-                continue
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            audio_id = str(uuid.uuid4()).upper()
-            segment_id = str(uuid.uuid4()).upper()
-            data.setdefault("materials", {})
-            data["materials"].setdefault("audios", [])
-            data["materials"]["audios"].append({
-                "id": audio_id,
-                "path": audio_path,
-                "duration": source_duration,
-                "material_name": Path(audio_path).name,
-                "volume": volume,
-                "type": "audio"
-            })
-            data.setdefault("tracks", [])
-            # Chercher la piste audio voulue
-            audio_track = None
-            for t in data["tracks"]:
-                if t.get("type") == "audio" and data["tracks"].index(t) == track_index:
-                    audio_track = t
-                    break
-            if not audio_track:
-                audio_track = {
-                    "attribute": 0,
-                    "flag": 0,
-                    "id": f"AUDIO-TRACK-{track_index}",
-                    "is_default_name": True,
-                    "name": f"Audio Track {track_index}",
-                    "segments": [],
-                    "type": "audio"
-                }
-                while len(data["tracks"]) <= track_index:
-                    data["tracks"].append({"type": "audio", "segments": []})
-                data["tracks"][track_index] = audio_track
-            segments = audio_track["segments"]
-            segment_entry = {
-                "id": segment_id,
-                "material_id": audio_id,
-                "target_timerange": {"start": start_us, "duration": duration},
-                "source_timerange": {"start": source_in_us, "duration": source_duration},
-                "volume": volume,
-                "fade_in": {"duration": int(fade_in_duration * 1_000_000)},
-                "fade_out": {"duration": int(fade_out_duration * 1_000_000)}
-            }
-            segments.append(segment_entry)
-            # Sauvegarder le fichier
-            with open(fpath, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+        return self._apply_edit(lambda tl: tl.add_audio(audio_path, start_time, end_time, source_in, source_out,
+                                                        volume, track_index, fade_in_duration, fade_out_duration))
 
+    @instrumented("compact")
+    def compact(self, backup: str = "copy") -> dict:
         """
-        Ajoute une séquence vidéo au projet CapCut.
-        video_path: chemin absolu de la vidéo
-        start_time: début de la séquence (en SECONDES)
-        end_time: fin de la séquence (en SECONDES)
-        crop: dict optionnel avec les clés (lower_left_x, lower_left_y, lower_right_x, lower_right_y, upper_left_x, upper_left_y, upper_right_x, upper_right_y)
+        Garbage-collect the draft: drop every entry of materials.* that no segment references,
+        through its material_id or its extra_material_refs (see Timeline.collect_garbage).
+        Leftovers of removed segments and the canvases/speeds/placeholders of media no longer
+        used are swept in one pass; nothing else is renumbered or rewritten. The draft is only
+        written when something was removed. Inside a `with project.edit()` block the sweep joins
+        the open session and the byte counts only change once it commits.
+        :param backup: how draft_content.json.bak is derived ("copy", "link" or "none")
+        :return: {"removed": {category: count}, "bytes_before", "bytes_after", "bytes_saved"}
         """
-        import uuid
-        import json
-        from pathlib import Path
-        # Conversion secondes -> microsecondes
-        start_us = int(start_time * 1_000_000)
-        end_us = int(end_time * 1_000_000)
-        duration = end_us - start_us
-        for fname in ["draft_content.json", "draft_content.json.bak"]:
-            fpath = self.path / fname
-            if not fpath.exists():
-                continue
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # Générer les IDs uniques
-            video_id = str(uuid.uuid4()).upper()
-            segment_id = str(uuid.uuid4()).upper()
-            # Ajout dans materials["videos"]
-            data.setdefault("materials", {})
-            data["materials"].setdefault("videos", [])
-            data["materials"]["videos"].append({
-                "aigc_history_id": "",
-                "aigc_item_id": "",
-                "aigc_type": "none",
-                "audio_fade": None,
-                "beauty_body_preset_id": "",
-                "beauty_face_auto_preset": {"name": "", "preset_id": "", "rate_map": ""},
-                "beauty_face_auto_preset_infos": [],
-                "beauty_face_preset_infos": [],
-                "cartoon_path": "",
-                "category_id": "",
-                "category_name": "local",
-                "check_flag": 62978047,
-                "crop": crop if crop else {"lower_left_x":0.0,"lower_left_y":1.0,"lower_right_x":1.0,"lower_right_y":1.0,"upper_left_x":0.0,"upper_left_y":0.0,"upper_right_x":1.0,"upper_right_y":0.0},
-                "crop_ratio": "free",
-                "crop_scale": 1.0,
-                "duration": duration,
-                "extra_type_option": 0,
-                "formula_id": "",
-                "freeze": None,
-                "has_audio": True,
-                "has_sound_separated": False,
-                "height": 720,
-                "id": video_id,
-                "intensifies_audio_path": "",
-                "intensifies_path": "",
-                "is_ai_generate_content": False,
-                "is_copyright": False,
-                "is_text_edit_overdub": False,
-                "is_unified_beauty_mode": False,
-                "live_photo_cover_path": "",
-                "live_photo_timestamp": -1,
-                "local_id": "",
-                "local_material_from": "",
-                "local_material_id": str(uuid.uuid4()),
-                "material_id": "",
-                "material_name": Path(video_path).name,
-                "material_url": "",
-                "matting": {"custom_matting_id": "","enable_matting_stroke": False,"expansion": 0,"feather": 0,"flag": 0,"has_use_quick_brush": False,"has_use_quick_eraser": False,"interactiveTime":[],"path": "","reverse": False,"strokes": []},
-                "media_path": "",
-                "multi_camera_info": None,
-                "object_locked": None,
-                "origin_material_id": "",
-                "path": video_path,
-                "picture_from": "none",
-                "picture_set_category_id": "",
-                "picture_set_category_name": "",
-                "request_id": "",
-                "reverse_intensifies_path": "",
-                "reverse_path": "",
-                "smart_match_info": None,
-                "smart_motion": None,
-                "source": 0,
-                "source_platform": 0,
-                "stable": {"matrix_path": "","stable_level": 0,"time_range": {"duration": 0,"start": 0}},
-                "team_id": "",
-                "type": "video",
-                "video_algorithm": {"ai_background_configs":[],"ai_expression_driven":None,"ai_motion_driven":None,"aigc_generate":None,"algorithms":[],"complement_frame_config":None,"deflicker":None,"gameplay_configs":[],"image_interpretation":None,"motion_blur_config":None,"mouth_shape_driver":None,"noise_reduction":None,"path": "","quality_enhance":None,"smart_complement_frame":None,"super_resolution":None,"time_range":None},
-                "width": 1280
-            })
-            # Gestion du track unique vidéo principal
-            data.setdefault("tracks", [])
-            # Chercher un track vidéo principal (type=="video")
-            video_track = None
-            for t in data["tracks"]:
-                if t.get("type") == "video":
-                    video_track = t
-                    break
-            if not video_track:
-                # Créer un nouveau track vidéo principal
-                import uuid
-                video_track = {
-                    "attribute": 0,
-                    "flag": 0,
-                    "id": str(uuid.uuid4()).upper(),
-                    "is_default_name": True,
-                    "name": "",
-                    "segments": [],
-                    "type": "video"
-                }
-                data["tracks"].append(video_track)
-            # Calcul du start réel (fin du dernier segment ou 0)
-            segments = video_track["segments"]
-            if segments:
-                last = segments[-1]
-                prev_end = last["target_timerange"]["start"] + last["target_timerange"]["duration"]
-                real_start = prev_end
-            else:
-                real_start = 0
-            # Correction de la durée projet si besoin
-            if "duration" in data:
-                data["duration"] = max(data.get("duration", 0), real_start + duration)
-            # Ajout du segment à la suite
-            segment_entry = {
-                "caption_info": None,
-                "cartoon": False,
-                "clip": {
-                    "alpha": 1.0,
-                    "flip": {"horizontal": False, "vertical": False},
-                    "rotation": 0.0,
-                    "scale": {"x": 1.0, "y": 1.0},
-                    "transform": {"x": 0.0, "y": 0.0}
-                },
-                "color_correct_alg_result": "",
-                "common_keyframes": [],
-                "desc": "",
-                "digital_human_template_group_id": "",
-                "enable_adjust": True,
-                "enable_adjust_mask": False,
-                "enable_color_correct_adjust": False,
-                "enable_color_curves": True,
-                "enable_color_match_adjust": False,
-                "enable_color_wheels": True,
-                "enable_hsl": False,
-                "enable_lut": True,
-                "enable_smart_color_adjust": False,
-                "enable_video_mask": True,
-                "extra_material_refs": [],
-                "group_id": "",
-                "hdr_settings": {"intensity": 1.0, "mode": 1, "nits": 1000},
-                "id": segment_id,
-                "intensifies_audio": False,
-                "is_loop": False,
-                "is_placeholder": False,
-                "is_tone_modify": False,
-                "keyframe_refs": [],
-                "last_nonzero_volume": 1.0,
-                "lyric_keyframes": None,
-                "material_id": video_id,
-                "raw_segment_id": "",
-                "render_index": 0,
-                "render_timerange": {"duration": 0, "start": 0},
-                "responsive_layout": {"enable": False, "horizontal_pos_layout": 0, "size_layout": 0, "target_follow": "", "vertical_pos_layout": 0},
-                "reverse": False,
-                "source_timerange": {"duration": duration, "start": start_us},
-                "speed": 1.0,
-                "state": 0,
-                "target_timerange": {"duration": duration, "start": real_start},
-                "template_id": "",
-                "template_scene": "default",
-                "track_attribute": 0,
-                "track_render_index": 0,
-                "uniform_scale": {"on": True, "value": 1.0},
-                "visible": True,
-                "volume": 1.0
-            }
-            segments.append(segment_entry)
-            # Sauvegarder le fichier
-            with open(fpath, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+        draft = self.path / "draft_content.json"
+        if self._writer is not None:
+            self.flush()
+        bytes_before = draft.stat().st_size if draft.exists() else 0
+        def apply(tl):
+            with phase("build"):
+                removed = tl.timeline.collect_garbage()
+            if removed:
+                tl.mark_dirty()
+            return removed
+        removed = self._apply_edit(apply, backup)
+        if self._writer is not None and self._session is None:
+            self.flush()
+        bytes_after = draft.stat().st_size
+        count("materials_removed", sum(removed.values()))
+        return {"removed": removed, "bytes_before": bytes_before, "bytes_after": bytes_after,
+                "bytes_saved": bytes_before - bytes_after}
+
+    # --- Time queries ---
+
+    def _query_timeline(self) -> Timeline:
+        """Timeline answering the time queries: the open edit session's, else the current draft."""
+        if self._session is not None and self._session.active:
+            return self._session.timeline
+        timeline = self._read_draft()
+        if timeline is None:
+            raise FileNotFoundError(f"No draft_content.json found in project folder {self.path}.")
+        return timeline
+
+    def segments_at(self, time: float, track_index: int = None) -> list:
+        """
+        Segments playing at `time` (in seconds), on one track or on all of them:
+        [{"segment_id", "material_id", "type", "track_index", "start_time", "end_time"}, ...].
+        Time queries use a per-track interval index kept with the cached draft, so repeated
+        queries cost O(log n) each.
+        """
+        return self._query_timeline().segments_at(time, track_index)
+
+    def segments_in(self, start_time: float, end_time: float, track_index: int = None) -> list:
+        """Segments intersecting [start_time, end_time) (in seconds). See segments_at."""
+        return self._query_timeline().segments_in(start_time, end_time, track_index)
+
+    def find_overlaps(self, track_index: int = None) -> list:
+        """Overlapping segment pairs of each track. See Timeline.find_overlaps."""
+        return self._query_timeline().find_overlaps(track_index)
+
+    def find_gaps(self, track_index: int = None, start_time: float = 0.0, end_time: float = None, min_duration: float = 0.0) -> list:
+        """Uncovered ranges of each track. See Timeline.find_gaps."""
+        return self._query_timeline().find_gaps(track_index, start_time, end_time, min_duration)
+
+    def timeline_end(self, track_index: int = None) -> float:
+        """End of the last segment (in seconds), of one track or of the whole timeline."""
+        return self._query_timeline().timeline_end(track_index)
+
+
+def _group_by_track(sequences) -> dict:
+    by_track = {}
+    for seq in sequences:
+        by_track.setdefault(seq.get("track_index"), []).append(seq)
+    return by_track
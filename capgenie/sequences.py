@@ -0,0 +1,224 @@
+"""
+Batch preparation of simplified sequences before a sync.
+
+prepare_sequences() reads the timing fields of every sequence once, then converts them
+to microseconds, derives the default source_out and validates the ranges column-wise:
+with NumPy arrays when NumPy is installed, with plain list passes otherwise. Both
+backends give the same integers as `int(seconds * 1_000_000)` on each field. The sync
+builders then take each segment's timing from the batch instead of converting fields
+one by one, and invalid input is rejected before the draft is touched.
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
+
+# Below this many sequences the list passes are faster than building arrays
+NUMPY_MIN_SEQUENCES = 256
+# Issues quoted in the error raised by SequenceBatch.check()
+MAX_REPORTED_ISSUES = 20
+# How far (µs) a source range may run past the probed media duration (container rounding)
+MEDIA_DURATION_TOLERANCE = 100_000
+
+_NUMERIC_FIELDS = ('start_time', 'end_time', 'source_in', 'source_out', 'fade_in_duration', 'fade_out_duration')
+
+
+class SequenceBatch:
+    """
+    Timing columns of a list of simplified sequences, in microseconds:
+    starts, durations, source_starts, source_durations, fade_ins and fade_outs (lists of int),
+    plus types and track_indexes with their defaults applied. `issues` lists the validation
+    problems; the columns are empty when the fields could not be read at all.
+    """
+
+    __slots__ = ('sequences', 'types', 'track_indexes', 'starts', 'durations', 'source_starts',
+                 'source_durations', 'fade_ins', 'fade_outs', 'issues', 'backend', 'media')
+
+    def __init__(self, sequences: Sequence[Dict]):
+        self.sequences = sequences
+        self.types: List[str] = []
+        self.track_indexes: List[int] = []
+        self.starts: List[int] = []
+        self.durations: List[int] = []
+        self.source_starts: List[int] = []
+        self.source_durations: List[int] = []
+        self.fade_ins: List[int] = []
+        self.fade_outs: List[int] = []
+        self.issues: List[str] = []
+        self.backend = "python"
+        # Probe results by path (see check_media)
+        self.media: Dict = {}
+
+    def __len__(self) -> int:
+        return len(self.sequences)
+
+    def timing(self, i: int) -> Tuple[int, int, int, int, int, int]:
+        """(start, duration, source_start, source_duration, fade_in, fade_out) of sequence i."""
+        return (self.starts[i], self.durations[i], self.source_starts[i], self.source_durations[i],
+                self.fade_ins[i], self.fade_outs[i])
+
+    def media_info(self, i: int):
+        """Probe result of the media of sequence i, if known."""
+        return self.media.get(self.sequences[i]['path'])
+
+    def check_media(self, media: Dict):
+        """
+        Record the probe results `media` (path -> MediaInfo or None) and report the source
+        ranges running past the end of their media (unknown durations are not checked).
+        """
+        self.media = media
+        for i, seq in enumerate(self.sequences):
+            info = media.get(seq['path'])
+            if info is None or info.duration is None:
+                continue
+            source_end = self.source_starts[i] + self.source_durations[i]
+            if source_end > info.duration + MEDIA_DURATION_TOLERANCE:
+                self.issues.append(f"sequence {i}: source_out ({source_end / 1_000_000:g}) is past the end of "
+                                   f"{seq['path']} ({info.duration / 1_000_000:g})")
+
+    def check(self):
+        """Raise ValueError listing the issues, if any."""
+        if not self.issues:
+            return
+        shown = self.issues[:MAX_REPORTED_ISSUES]
+        more = len(self.issues) - len(shown)
+        message = f"{len(self.issues)} invalid sequence field(s):\n  " + "\n  ".join(shown)
+        if more:
+            message += f"\n  ... and {more} more"
+        raise ValueError(message)
+
+
+def prepare_sequences(sequences: Sequence[Dict], backend: Optional[str] = None) -> SequenceBatch:
+    """
+    Convert and validate the timing of simplified sequences in one batch.
+    :param backend: "numpy", "python" or None (NumPy when installed and the batch is large enough)
+    :return: the SequenceBatch; call check() on it to raise on invalid input
+    """
+    if backend == "numpy" and numpy is None:
+        raise ValueError("The numpy backend requires NumPy, which is not installed.")
+    batch = SequenceBatch(sequences)
+    raw = _read_fields(batch)
+    if batch.issues:
+        return batch
+    if backend == "numpy" or (backend is None and numpy is not None and len(sequences) >= NUMPY_MIN_SEQUENCES):
+        batch.backend = "numpy"
+        _convert_numpy(batch, raw)
+    else:
+        _convert_python(batch, raw)
+    return batch
+
+
+def validate_sequences(sequences: Sequence[Dict]) -> List[str]:
+    """Validation problems of simplified sequences (an empty list when they can be synced)."""
+    return prepare_sequences(sequences).issues
+
+
+def _read_fields(batch: SequenceBatch) -> Dict[str, List[float]]:
+    """
+    Single pass over the sequences: defaults, types and required fields, including the
+    track_index and volume used later by the build. A missing source_out is NaN here and
+    derived during conversion.
+    """
+    raw = {name: [] for name in _NUMERIC_FIELDS}
+    columns = [raw[name] for name in _NUMERIC_FIELDS]
+    issues = batch.issues
+    for i, seq in enumerate(batch.sequences):
+        if not isinstance(seq, dict):
+            issues.append(f"sequence {i}: not an object")
+            continue
+        ttype = seq.get('type', 'video')
+        if ttype not in ('video', 'audio'):
+            issues.append(f"sequence {i}: type must be 'video' or 'audio', not {ttype!r}")
+        if not seq.get('path'):
+            issues.append(f"sequence {i}: path is missing")
+        batch.types.append(ttype)
+        track_index = seq.get('track_index', 0 if ttype == 'video' else 1)
+        if type(track_index) is not int or track_index < 0:
+            issues.append(f"sequence {i}: track_index must be a non-negative integer, not {track_index!r}")
+        batch.track_indexes.append(track_index)
+        volume = seq.get('volume', 1.0)
+        if type(volume) is bool or not isinstance(volume, (int, float)):
+            issues.append(f"sequence {i}: volume must be a number, not {volume!r}")
+        elif not math.isfinite(volume):
+            issues.append(f"sequence {i}: volume is not finite")
+        source_out = seq.get('source_out')
+        values = (seq.get('start_time'), seq.get('end_time'), seq.get('source_in', 0.0),
+                  math.nan if source_out is None else source_out,
+                  seq.get('fade_in_duration', 0.0), seq.get('fade_out_duration', 0.0))
+        for name, value, column in zip(_NUMERIC_FIELDS, values, columns):
+            if type(value) is bool or not isinstance(value, (int, float)):
+                issues.append(f"sequence {i}: {name} must be a number, not {value!r}")
+            elif value != value and name != 'source_out' or value in (math.inf, -math.inf):
+                issues.append(f"sequence {i}: {name} is not finite")
+            column.append(value)
+    return raw
+
+
+def _convert_python(batch: SequenceBatch, raw: Dict[str, List[float]]):
+    starts, ends = raw['start_time'], raw['end_time']
+    source_ins = raw['source_in']
+    # On suppose que la longueur du tronçon est end_time-start_time si source_out n'est pas précisé
+    source_outs = [source_in + (end - start) if source_out != source_out else source_out
+                   for start, end, source_in, source_out in zip(starts, ends, source_ins, raw['source_out'])]
+    batch.starts = [int(t * 1_000_000) for t in starts]
+    batch.durations = [int((end - start) * 1_000_000) for start, end in zip(starts, ends)]
+    batch.source_starts = [int(t * 1_000_000) for t in source_ins]
+    batch.source_durations = [int(t * 1_000_000) - s for t, s in zip(source_outs, batch.source_starts)]
+    batch.fade_ins = [int(t * 1_000_000) for t in raw['fade_in_duration']]
+    batch.fade_outs = [int(t * 1_000_000) for t in raw['fade_out_duration']]
+    _report(batch, raw, source_outs,
+            [i for i, t in enumerate(starts) if t < 0],
+            [i for i, (start, end) in enumerate(zip(starts, ends)) if end < start],
+            [i for i, t in enumerate(source_ins) if t < 0],
+            # A derived source_out is only inverted when the target range is: reported once
+            [i for i, (s, t, given) in enumerate(zip(source_ins, source_outs, raw['source_out'])) if t < s and given == given],
+            [i for i, (a, b) in enumerate(zip(raw['fade_in_duration'], raw['fade_out_duration'])) if a < 0 or b < 0],
+            [i for i, (a, b, d) in enumerate(zip(batch.fade_ins, batch.fade_outs, batch.durations)) if a + b > d >= 0])
+
+
+def _convert_numpy(batch: SequenceBatch, raw: Dict[str, List[float]]):
+    starts, ends, source_ins, source_outs, fade_ins, fade_outs = (
+        numpy.array(raw[name], dtype=numpy.float64) for name in _NUMERIC_FIELDS)
+    derived = numpy.isnan(source_outs)
+    source_outs = numpy.where(derived, source_ins + (ends - starts), source_outs)
+    # astype truncates toward zero, like int()
+    starts_us = (starts * 1_000_000).astype(numpy.int64)
+    durations_us = ((ends - starts) * 1_000_000).astype(numpy.int64)
+    source_starts_us = (source_ins * 1_000_000).astype(numpy.int64)
+    source_durations_us = (source_outs * 1_000_000).astype(numpy.int64) - source_starts_us
+    fade_ins_us = (fade_ins * 1_000_000).astype(numpy.int64)
+    fade_outs_us = (fade_outs * 1_000_000).astype(numpy.int64)
+    batch.starts = starts_us.tolist()
+    batch.durations = durations_us.tolist()
+    batch.source_starts = source_starts_us.tolist()
+    batch.source_durations = source_durations_us.tolist()
+    batch.fade_ins = fade_ins_us.tolist()
+    batch.fade_outs = fade_outs_us.tolist()
+    bad = numpy.flatnonzero
+    _report(batch, raw, source_outs.tolist(),
+            bad(starts < 0).tolist(),
+            bad(ends < starts).tolist(),
+            bad(source_ins < 0).tolist(),
+            bad((source_outs < source_ins) & ~derived).tolist(),
+            bad((fade_ins < 0) | (fade_outs < 0)).tolist(),
+            bad((fade_ins_us + fade_outs_us > durations_us) & (durations_us >= 0)).tolist())
+
+
+def _report(batch: SequenceBatch, raw: Dict[str, List[float]], source_outs: List[float], negative_starts,
+            inverted, negative_source_ins, inverted_sources, negative_fades, long_fades):
+    """Turn the positions found by the checks into messages, ordered by sequence."""
+    starts, ends, source_ins = raw['start_time'], raw['end_time'], raw['source_in']
+    fade_ins, fade_outs = raw['fade_in_duration'], raw['fade_out_duration']
+    found = []
+    found += [(i, f"start_time ({starts[i]}) is negative") for i in negative_starts]
+    found += [(i, f"end_time ({ends[i]}) is before start_time ({starts[i]})") for i in inverted]
+    found += [(i, f"source_in ({source_ins[i]}) is negative") for i in negative_source_ins]
+    found += [(i, f"source_out ({source_outs[i]}) is before source_in ({source_ins[i]})") for i in inverted_sources]
+    found += [(i, f"fade durations ({fade_ins[i]}, {fade_outs[i]}) must not be negative") for i in negative_fades]
+    found += [(i, f"fades ({fade_ins[i]} + {fade_outs[i]}) are longer than the sequence "
+                  f"({ends[i] - starts[i]:g})") for i in long_fades]
+    found.sort(key=lambda item: item[0])
+    batch.issues.extend(f"sequence {i}: {message}" for i, message in found)
@@ -0,0 +1,280 @@
+"""
+Local capgenie daemon.
+
+`capgenie serve` keeps Project instances open in memory (in write-behind mode) and
+exposes their operations as JSON RPC calls over HTTP, either on a localhost TCP port
+or on a Unix socket. Each agent step becomes a cheap in-memory call instead of a cold
+Python start and a full draft parse.
+
+Requests are POSTed to /rpc as {"method": "...", "params": {...}}; responses are
+{"ok": true, "result": ...} or {"ok": false, "error": {"type": ..., "message": ...}}.
+Calls on the same project are serialized by a per-project lock; different projects
+are served concurrently.
+
+The daemon has no authentication: bind it to localhost or to a Unix socket with
+restricted permissions only.
+"""
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from . import cache
+from .project_editor import Project
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ProjectRegistry:
+    """
+    Open projects of the daemon, each paired with the lock serializing its calls.
+    Projects run in write-behind mode: edits are served from memory until written, then
+    the draft is re-read whenever draft_content.json was saved by someone else (CapCut),
+    so user edits made between two calls are seen and kept. An external save landing while
+    a daemon write is still pending is overwritten by it; flush first to avoid that.
+    """
+
+    def __init__(self, flush_interval: float = 0.5):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._projects: Dict[str, Tuple[Project, threading.Lock]] = {}
+
+    def open(self, project_path: str, json_path: Optional[str] = None, create: bool = False) -> Tuple[Project, threading.Lock]:
+        key = os.path.abspath(project_path)
+        with self._lock:
+            entry = self._projects.get(key)
+            if entry is None:
+                project = Project(key, json_path or os.path.join(key, "simplified.json"), create=create,
+                                  write_behind=True, flush_interval=self.flush_interval)
+                entry = self._projects[key] = (project, threading.Lock())
+            elif json_path:
+                entry[0].json_path = Path(json_path)
+            return entry
+
+    def get(self, project_path: str) -> Tuple[Project, threading.Lock]:
+        entry = self._projects.get(os.path.abspath(project_path))
+        if entry is None:
+            return self.open(project_path)
+        return entry
+
+    def close(self, project_path: str) -> bool:
+        with self._lock:
+            entry = self._projects.pop(os.path.abspath(project_path), None)
+        if entry is None:
+            return False
+        project, lock = entry
+        with lock:
+            project.close()
+        return True
+
+    def paths(self):
+        with self._lock:
+            return list(self._projects)
+
+    def close_all(self):
+        for path in self.paths():
+            self.close(path)
+
+
+class RpcDispatcher:
+    """Maps RPC method names to Project operations."""
+
+    def __init__(self, registry: ProjectRegistry):
+        self.registry = registry
+
+    def dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        handler = getattr(self, "rpc_" + method, None)
+        if handler is None:
+            raise LookupError(f"Unknown method {method!r}.")
+        return handler(**params)
+
+    def _call(self, project_path: str, fn):
+        project, lock = self.registry.get(project_path)
+        with lock:
+            return fn(project)
+
+    def rpc_ping(self):
+        return "pong"
+
+    def rpc_open(self, project_path: str, json_path: str = None, create: bool = False):
+        self.registry.open(project_path, json_path, create)
+        return {"project_path": os.path.abspath(project_path)}
+
+    def rpc_close(self, project_path: str):
+        return self.registry.close(project_path)
+
+    def rpc_list(self):
+        return self.registry.paths()
+
+    def rpc_export(self, project_path: str, export_path: str = None, streaming: bool = False, incremental: bool = False):
+        """Write the simplified JSON to export_path, or return the sequences when it is omitted."""
+        def run(project):
+            if export_path:
+                changed = project.export_to_json(export_path, streaming=streaming, incremental=incremental)
+                return {"export_path": export_path, "changed": changed}
+            timeline = project._read_draft()
+            return {"sequences": timeline.sequences() if timeline is not None else []}
+        return self._call(project_path, run)
+
+    def rpc_sync(self, project_path: str, json_path: str = None, sequences: list = None, incremental: bool = False, backup: str = "copy", dedup_materials: bool = False):
+        """Sync from a simplified JSON file, or from `sequences` sent inline."""
+        def run(project):
+            if sequences is not None:
+                return project.sync_from_data({"sequences": sequences}, backup=backup, incremental=incremental,
+                                              dedup_materials=dedup_materials)
+            return project.sync_from_json(json_path, backup=backup, incremental=incremental, dedup_materials=dedup_materials)
+        return self._call(project_path, run)
+
+    def rpc_add_video(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.add_video_sequence(**kwargs))
+
+    def rpc_add_audio(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.add_audio_sequence(**kwargs))
+
+    def rpc_segments_at(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.segments_at(**kwargs))
+
+    def rpc_segments_in(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.segments_in(**kwargs))
+
+    def rpc_find_overlaps(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.find_overlaps(**kwargs))
+
+    def rpc_find_gaps(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.find_gaps(**kwargs))
+
+    def rpc_timeline_end(self, project_path: str, **kwargs):
+        return self._call(project_path, lambda project: project.timeline_end(**kwargs))
+
+    def rpc_compact(self, project_path: str, backup: str = "copy"):
+        return self._call(project_path, lambda project: project.compact(backup=backup))
+
+    def rpc_flush(self, project_path: str = None):
+        paths = [project_path] if project_path else self.registry.paths()
+        for path in paths:
+            self._call(path, lambda project: project.flush())
+        return len(paths)
+
+    def rpc_stats(self):
+        return {"projects": len(self.registry.paths()), "cache": cache.stats()}
+
+
+class _RpcHandler(BaseHTTPRequestHandler):
+    server_version = "capgenie"
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/rpc":
+            return self._reply(404, {"ok": False, "error": {"type": "NotFound", "message": self.path}})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            method = request["method"]
+            params = request.get("params") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reply(400, {"ok": False, "error": {"type": "BadRequest", "message": str(e)}})
+        try:
+            result = self.server.dispatcher.dispatch(method, params)
+        except Exception as e:
+            return self._reply(200, {"ok": False, "error": {"type": type(e).__name__, "message": str(e)}})
+        self._reply(200, {"ok": True, "result": result})
+
+    def _reply(self, status: int, body: Dict):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None,
+                flush_interval: float = 0.5, verbose: bool = False):
+    """
+    Build the daemon's server (not started). Listens on socket_path when given, otherwise
+    on host:port. The server's `registry` holds the open projects.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _RpcHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingHTTPServer((host, port), _RpcHandler)
+        server.daemon_threads = True
+    server.registry = ProjectRegistry(flush_interval)
+    server.dispatcher = RpcDispatcher(server.registry)
+    server.verbose = verbose
+    return server
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None,
+          flush_interval: float = 0.5, verbose: bool = False):
+    """Run the daemon until interrupted, then flush and close every open project."""
+    server = make_server(host, port, socket_path, flush_interval, verbose)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.registry.close_all()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class Client:
+    """
+    Minimal client for the daemon, reusing one connection:
+
+        client = Client(port=8765)          # or Client(socket_path="/tmp/capgenie.sock")
+        client.call("add_video", project_path=..., video_path=..., start_time=0, end_time=2)
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None, timeout: float = None):
+        if socket_path:
+            self._conn = _UnixHTTPConnection(socket_path, timeout)
+        else:
+            self._conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def call(self, method: str, **params) -> Any:
+        body = json.dumps({"method": method, "params": params})
+        self._conn.request("POST", "/rpc", body, {"Content-Type": "application/json"})
+        response = json.loads(self._conn.getresponse().read())
+        if not response.get("ok"):
+            error = response.get("error", {})
+            raise RuntimeError(f"{error.get('type')}: {error.get('message')}")
+        return response["result"]
+
+    def close(self):
+        self._conn.close()
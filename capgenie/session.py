@@ -0,0 +1,381 @@
+"""
+Batched edit sessions for CapCut drafts.
+
+An EditSession loads draft_content.json once, applies any number of timeline
+operations in memory and writes the result back in a single commit.
+"""
+import math
+import reprlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import codec
+from .cache import draft_cache
+from .locking import ConcurrentModificationError, ProjectLock, file_version
+from .model import Material, Timeline, Track, new_id
+from .persistence import write_draft
+from .probe import media_dimensions, media_duration, probe_media
+from .sequences import MEDIA_DURATION_TOLERANCE
+
+DRAFT_FILE = "draft_content.json"
+BACKUP_FILE = "draft_content.json.bak"
+
+
+def _number(name: str, value) -> float:
+    """An edit argument checked to be a finite number (ValueError otherwise)."""
+    if type(value) is bool or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number, not {reprlib.repr(value)}.")
+    return value
+
+
+def _microseconds(name: str, seconds, default: Optional[int] = None) -> Optional[int]:
+    """Seconds of an edit argument in microseconds, `default` when it is None."""
+    return default if seconds is None else int(_number(name, seconds) * 1_000_000)
+
+
+def _track_index(track_index) -> int:
+    if type(track_index) is not int or track_index < 0:
+        raise ValueError(f"track_index must be a non-negative integer, not {reprlib.repr(track_index)}.")
+    return track_index
+
+
+def _check_fades(fade_in: int, fade_out: int, duration: int):
+    if fade_in < 0 or fade_out < 0:
+        raise ValueError("Fade durations must not be negative.")
+    if fade_in + fade_out > duration:
+        raise ValueError(f"Fades ({fade_in / 1_000_000:g} + {fade_out / 1_000_000:g}) are longer than "
+                         f"the segment ({duration / 1_000_000:g}).")
+
+
+class EditSession:
+    """
+    In-memory editing transaction over a project's draft_content.json.
+    Use it through Project.edit():
+
+        with project.edit() as tl:
+            tl.add_video(...)
+            tl.add_audio(...)
+
+    The draft is loaded on entry and committed to draft_content.json and its .bak on a
+    clean exit. If an exception escapes the block, the in-memory changes are discarded
+    and the files on disk are left untouched. Nested `with project.edit()` blocks join
+    the outer session and only the outermost block commits.
+
+    `backup` controls how draft_content.json.bak is derived from the committed draft
+    (see FileManager.mirror_file): "copy", "link" or "none".
+
+    With the project's `locking` set to "lock", the session holds the project lock from
+    begin() to the end of the commit; with "optimistic", commit() raises
+    ConcurrentModificationError if draft_content.json changed since begin() (see
+    capgenie.locking).
+
+    The draft is held as the columnar model of capgenie.model (`timeline`), on which the
+    timeline operations run. `data` gives it as a CapCut dict instead, converting the model;
+    it is converted back on the next timeline operation or on commit.
+    """
+
+    def __init__(self, project, backup: str = "copy"):
+        self.project = project
+        self.backup = backup
+        self.dirty = False
+        self._doc: Optional[Dict] = None
+        self._timeline: Optional[Timeline] = None
+        self._depth = 0
+        self._targets = []
+        self._lock: Optional[ProjectLock] = None
+        self._version = None
+
+    def __enter__(self):
+        if self._depth == 0:
+            self.begin()
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if exc_type is not None:
+            self.rollback()
+        elif self._depth == 0:
+            self.commit()
+        return False
+
+    @property
+    def active(self) -> bool:
+        return self._doc is not None or self._timeline is not None
+
+    @property
+    def data(self) -> Optional[Dict]:
+        """The in-memory draft as a CapCut dict (None outside of the session)."""
+        if self._timeline is not None:
+            self._doc = self._timeline.to_draft()
+            self._timeline = None
+        return self._doc
+
+    @property
+    def timeline(self) -> Timeline:
+        """The in-memory draft as a columnar Timeline."""
+        if self._timeline is None:
+            self._timeline = Timeline.from_draft(self._require_data())
+            self._doc = None
+        return self._timeline
+
+    def begin(self):
+        """
+        Load the draft into memory. draft_content.json is the source of truth; the .bak is
+        only read when the main file is missing. The parsed draft comes from the shared
+        draft cache when the file is unchanged since capgenie last read or wrote it. In
+        write-behind mode the session starts from a private copy of the latest committed
+        draft, which may not be on disk yet.
+        """
+        locking = self.project.locking
+        if locking == "lock":
+            self._lock = ProjectLock(self.project.path, self.project.lock_timeout)
+            self._lock.acquire()
+        try:
+            self._targets = [self.project.path / f for f in (DRAFT_FILE, BACKUP_FILE)
+                             if (self.project.path / f).exists()]
+            if not self._targets:
+                raise FileNotFoundError(f"No {DRAFT_FILE} found in project folder {self.project.path}.")
+            # Version taken before reading: a change during the load shows up at commit
+            self._version = file_version(str(self._targets[0])) if locking == "optimistic" else None
+        except BaseException:
+            self._release()
+            raise
+        writer = self.project._writer
+        latest = writer.latest() if writer is not None else None
+        if latest is not None:
+            self._timeline = latest.copy()
+        else:
+            self._timeline = draft_cache.take(str(self._targets[0]))
+        self._doc = None
+        self.dirty = False
+        self.project._session = self
+
+    def commit(self):
+        """
+        Serialize the draft once and write it to every draft file of the project, or hand
+        it to the project's write-behind writer when that mode is enabled.
+        """
+        if not self.active:
+            return
+        try:
+            if self.dirty:
+                data = self.timeline
+                targets = [str(t) for t in self._targets]
+                writer = self.project._writer
+                if writer is not None:
+                    writer.submit(data, targets, self.backup, codec.compact_drafts())
+                elif self.project.locking == "optimistic":
+                    with ProjectLock(self.project.path, self.project.lock_timeout):
+                        if file_version(targets[0]) != self._version:
+                            raise ConcurrentModificationError(
+                                f"{targets[0]} was modified by another writer since it was loaded.")
+                        write_draft(data, targets, self.backup, codec.compact_drafts())
+                else:
+                    write_draft(data, targets, self.backup, codec.compact_drafts())
+        finally:
+            self._end()
+
+    def rollback(self):
+        """
+        Discard every in-memory change made since the session started.
+        """
+        self._end()
+
+    def _end(self):
+        self._doc = None
+        self._timeline = None
+        self.dirty = False
+        self._version = None
+        if self.project._session is self:
+            self.project._session = None
+        self._release()
+
+    def _release(self):
+        lock, self._lock = self._lock, None
+        if lock is not None:
+            lock.release()
+
+    def mark_dirty(self):
+        """
+        Flag the draft as modified after editing `data` or `timeline` directly, so commit() writes it.
+        """
+        self._require_data()
+        if self._timeline is not None:
+            self._timeline.invalidate_index()
+        self.dirty = True
+
+    def _require_data(self):
+        if not self.active:
+            raise RuntimeError("Edit session is not active (it was committed or rolled back).")
+        return self._timeline if self._timeline is not None else self._doc
+
+    # --- Timeline operations ---
+
+    def add_video(self, video_path: str, start_time: float, end_time: float, source_in: float = 0.0, source_out: float = None, volume: float = 1.0, track_index: int = 0, fade_in_duration: float = 0.0, fade_out_duration: float = 0.0) -> str:
+        """
+        Add a video segment to the in-memory draft. See Project.add_video_sequence.
+        :return: id of the new segment
+        """
+        return self._add_sequence("video", video_path, start_time, end_time, source_in, source_out,
+                                  volume, track_index, fade_in_duration, fade_out_duration)
+
+    def add_audio(self, audio_path: str, start_time: float, end_time: float, source_in: float = 0.0, source_out: float = None, volume: float = 1.0, track_index: int = 1, fade_in_duration: float = 0.0, fade_out_duration: float = 0.0) -> str:
+        """
+        Add an audio segment to the in-memory draft. See Project.add_audio_sequence.
+        :return: id of the new segment
+        """
+        return self._add_sequence("audio", audio_path, start_time, end_time, source_in, source_out,
+                                  volume, track_index, fade_in_duration, fade_out_duration)
+
+    def remove(self, segment_id: str):
+        """
+        Remove a segment from the timeline, together with its material if no other
+        segment references it.
+        """
+        track, i = self._find_segment(segment_id)
+        self.timeline.remove_segment(track, i)
+        self.dirty = True
+
+    def modify(self, segment_id: str, start_time: float = None, end_time: float = None, source_in: float = None, source_out: float = None, volume: float = None, fade_in_duration: float = None, fade_out_duration: float = None):
+        """
+        Change the timing, cropping, volume or fades of an existing segment.
+        Only the arguments that are not None are applied. Every argument is checked before
+        the segment is touched, so an invalid one (ValueError) leaves it unchanged.
+        """
+        track, i = self._find_media_segment(segment_id)
+        target_start, target_duration = track.starts[i], track.durations[i]
+        if track.has_source(i):
+            source_start, source_duration = track.source_starts[i], track.source_durations[i]
+        else:
+            source_start, source_duration = 0, target_duration
+        start_us = _microseconds("start_time", start_time, target_start)
+        end_us = _microseconds("end_time", end_time, target_start + target_duration)
+        in_us = _microseconds("source_in", source_in, source_start)
+        out_us = _microseconds("source_out", source_out, source_start + source_duration)
+        fade_in_us = _microseconds("fade_in_duration", fade_in_duration, track.fade_ins[i])
+        fade_out_us = _microseconds("fade_out_duration", fade_out_duration, track.fade_outs[i])
+        if volume is not None:
+            _number("volume", volume)
+        retimed = start_time is not None or end_time is not None
+        if retimed and end_us <= start_us:
+            raise ValueError(f"end_time must be after start_time ({start_us / 1_000_000:g}).")
+        if (source_in is not None or source_out is not None) and out_us <= in_us:
+            raise ValueError(f"source_out must be after source_in ({in_us / 1_000_000:g}).")
+        refaded = fade_in_duration is not None or fade_out_duration is not None
+        if refaded:
+            _check_fades(fade_in_us, fade_out_us, end_us - start_us)
+
+        if not track.has_source(i):
+            track.set_source(i, 0, target_duration)
+        if retimed:
+            track.set_target(i, start_us, end_us - start_us)
+        if source_in is not None or source_out is not None:
+            track.set_source(i, in_us, out_us - in_us)
+        if volume is not None:
+            track.set_volume(i, volume)
+        if refaded:
+            self.timeline.set_segment_fades(
+                track, i,
+                fade_in_us if fade_in_duration is not None else None,
+                fade_out_us if fade_out_duration is not None else None)
+        self.dirty = True
+
+    def move(self, segment_id: str, start_time: float = None, track_index: int = None):
+        """
+        Move a segment to a new start time (its duration is kept) and/or to another track
+        of the same type, created if needed.
+        """
+        timeline = self.timeline
+        track, i = self._find_media_segment(segment_id)
+        media_type = track.type
+        tracks = timeline.tracks
+        start_us = _microseconds("start_time", start_time)
+        if track_index is not None and _track_index(track_index) < len(tracks) \
+                and tracks[track_index].type != media_type and len(tracks[track_index]):
+            raise ValueError(f"Track {track_index} is not a {media_type} track.")
+        if start_us is not None:
+            track.set_target(i, start_us, track.durations[i])
+        if track_index is not None:
+            new_track = timeline.track_for(media_type, track_index)
+            if new_track is not track:
+                timeline.move_segment(track, i, new_track)
+        self.dirty = True
+
+    # --- Time queries (see Timeline) ---
+
+    def segments_at(self, time: float, track_index: int = None) -> List[Dict]:
+        self._require_data()
+        return self.timeline.segments_at(time, track_index)
+
+    def segments_in(self, start_time: float, end_time: float, track_index: int = None) -> List[Dict]:
+        self._require_data()
+        return self.timeline.segments_in(start_time, end_time, track_index)
+
+    def find_overlaps(self, track_index: int = None) -> List[Dict]:
+        self._require_data()
+        return self.timeline.find_overlaps(track_index)
+
+    def find_gaps(self, track_index: int = None, start_time: float = 0.0, end_time: float = None, min_duration: float = 0.0) -> List[Dict]:
+        self._require_data()
+        return self.timeline.find_gaps(track_index, start_time, end_time, min_duration)
+
+    def timeline_end(self, track_index: int = None) -> float:
+        self._require_data()
+        return self.timeline.timeline_end(track_index)
+
+    def _find_segment(self, segment_id: str) -> Tuple[Track, int]:
+        self._require_data()
+        try:
+            return self.timeline.find_segment(segment_id)
+        except KeyError:
+            raise KeyError(f"Segment {segment_id} not found in project {self.project.path}.") from None
+
+    def _find_media_segment(self, segment_id: str) -> Tuple[Track, int]:
+        track, i = self._find_segment(segment_id)
+        if not track.is_media(i):
+            raise ValueError(f"Segment {segment_id} is not a media segment and cannot be edited.")
+        return track, i
+
+    def _add_sequence(self, media_type, media_path, start_time, end_time, source_in, source_out, volume, track_index, fade_in_duration, fade_out_duration) -> str:
+        self._require_data()
+        timeline = self.timeline
+        start_us = _microseconds("start_time", start_time)
+        end_us = _microseconds("end_time", end_time)
+        duration = end_us - start_us
+        if duration <= 0:
+            raise ValueError(f"end_time must be after start_time ({start_time:g}).")
+        if source_out is None:
+            # On suppose que la longueur du tronçon est end_time-start_time si non précisé
+            source_out = _number("source_in", source_in) + (end_time - start_time)
+        source_in_us = _microseconds("source_in", source_in)
+        source_out_us = _microseconds("source_out", source_out)
+        source_duration = source_out_us - source_in_us
+        if source_duration <= 0:
+            raise ValueError(f"source_out must be after source_in ({source_in:g}).")
+        _number("volume", volume)
+        _track_index(track_index)
+        fade_in_us = _microseconds("fade_in_duration", fade_in_duration)
+        fade_out_us = _microseconds("fade_out_duration", fade_out_duration)
+        _check_fades(fade_in_us, fade_out_us, duration)
+        info = probe_media(media_path)
+        if info is not None and info.duration and source_out_us > info.duration + MEDIA_DURATION_TOLERANCE:
+            raise ValueError(f"source_out ({source_out:g}) is past the end of {media_path} "
+                             f"({info.duration / 1_000_000:g}).")
+        mat_id = new_id()
+        segment_id = new_id()
+
+        material = Material(mat_id, path=media_path, duration=media_duration(info, source_duration),
+                            name=Path(media_path).name, volume=volume, type=media_type)
+        if media_type == "video":
+            material.width, material.height = media_dimensions(info)
+        timeline.add_material(media_type + "s", material)
+
+        track = timeline.track_for(media_type, track_index)
+        timeline.add_segment(track, segment_id, mat_id, start_us, duration, source_in_us, source_duration, volume,
+                             fade_in_us, fade_out_us)
+        if fade_in_us or fade_out_us:
+            timeline.set_segment_fades(track, len(track) - 1, fade_in_us, fade_out_us)
+        self.dirty = True
+        return segment_id
+
@@ -0,0 +1,287 @@
+"""
+Streaming reader for CapCut drafts.
+
+export_to_json only needs the segments of `tracks` and the video, audio and audio_fade
+materials. The scanner below walks draft_content.json incrementally, decodes those
+entries one at a time and skips every other subtree (keyframes, effects, unrelated
+`materials.*` categories...) without building Python objects for it, so peak memory is
+bounded by the number of materials rather than by the size of the document.
+"""
+import json
+import os
+import re
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from . import codec
+from .file_manager import FileManager
+from .indexes import MaterialIdIndex
+from .instrumentation import count
+from .model import TRACK_MATERIAL_CATEGORIES, Material, Track, segment_sequence
+
+CHUNK_SIZE = 1 << 20
+
+_WS = re.compile(r'[ \t\n\r]*')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CONTAINER_SPECIAL = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r'[,\]} \t\n\r]')
+_DECODER = json.JSONDecoder()
+
+_NEEDED_MATERIALS = ('videos', 'audios', 'audio_fades')
+
+
+class _Scanner:
+    """Incremental JSON tokenizer over a text stream, keeping only a sliding buffer."""
+
+    def __init__(self, stream: TextIO, chunk_size: Optional[int] = None):
+        self.stream = stream
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, min_size: int = 0) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(max(self.chunk_size, min_size))
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document.")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.buf[self.pos]!r}.")
+        self.pos += 1
+
+    def read_key(self) -> str:
+        self.peek()
+        while True:
+            m = _STRING.match(self.buf, self.pos)
+            if m:
+                self.pos = m.end()
+                return json.loads(m.group())
+            if not self._fill():
+                raise ValueError("Unterminated string in JSON document.")
+
+    def decode(self):
+        """Decode the next value into Python objects."""
+        self.peek()
+        want = 0
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                want = max(want * 2, self.chunk_size)
+                self._fill(want)
+                continue
+            if end >= len(self.buf) and not self.eof:
+                # A scalar cut by the buffer edge (e.g. 12|34) would decode too early
+                want = max(want * 2, self.chunk_size)
+                self._fill(want)
+                continue
+            self.pos = end
+            return value
+
+    def skip(self):
+        """Skip the next value without decoding it."""
+        char = self.peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string_body()
+        elif char in '[{':
+            self.pos += 1
+            depth = 1
+            while depth:
+                m = _CONTAINER_SPECIAL.search(self.buf, self.pos)
+                if m is None:
+                    self.pos = len(self.buf)
+                    if not self._fill():
+                        raise ValueError("Unterminated container in JSON document.")
+                    continue
+                self.pos = m.end()
+                token = m.group()
+                if token == '"':
+                    self._skip_string_body()
+                elif token in '[{':
+                    depth += 1
+                else:
+                    depth -= 1
+        else:
+            while True:
+                m = _SCALAR_END.search(self.buf, self.pos)
+                if m is not None:
+                    self.pos = m.start()
+                    return
+                self.pos = len(self.buf)
+                if not self._fill():
+                    return
+
+    def _skip_string_body(self):
+        while True:
+            m = _STRING_SPECIAL.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unterminated string in JSON document.")
+                continue
+            if m.group() == '"':
+                self.pos = m.end()
+                return
+            # Backslash: skip the escaped character, which may sit in the next chunk
+            self.pos = m.end()
+            if self.pos >= len(self.buf) and not self._fill():
+                raise ValueError("Unterminated string in JSON document.")
+            self.pos += 1
+
+    def object_keys(self) -> Iterator[str]:
+        """Iterate the keys of the next object; the caller must consume each value."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_key()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def array_items(self) -> Iterator[int]:
+        """Iterate the items of the next array; the caller must consume each item."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def _slim_material(category: str, entry: Dict) -> Dict:
+    """Keep only the fields export needs from a material."""
+    if category == 'audio_fades':
+        return {k: entry[k] for k in ('id', 'fade_in_duration', 'fade_out_duration') if k in entry}
+    slim = {k: entry[k] for k in ('id', 'path', 'volume') if k in entry}
+    if category == 'videos':
+        fade = entry.get('audio_fade')
+        slim['audio_fade'] = _slim_material('audio_fades', fade) if fade else None
+    return slim
+
+
+def _slim_segment(seg):
+    """Keep only the fields export needs from a segment (other values are kept as is, Track makes them raw)."""
+    if not isinstance(seg, dict):
+        return seg
+    return {k: seg[k] for k in ('id', 'material_id', 'target_timerange', 'source_timerange', 'volume') if k in seg}
+
+
+def iter_draft_sequences(draft_path: str, chunk_size: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Yield the simplified sequences of a draft file, track by track, reading it incrementally.
+    Same output as Timeline.sequences on the fully loaded draft: each track's segments are
+    parsed by Track (segments of another shape are skipped) and converted by segment_sequence.
+    """
+    materials: Dict[str, List[Dict]] = {c: [] for c in _NEEDED_MATERIALS}
+    index: Optional[MaterialIdIndex] = None
+    deferred: List[Tuple[int, str, List[Dict]]] = []
+    converted: Dict[str, Material] = {}
+
+    def resolve(track_idx, ttype, segments):
+        category = TRACK_MATERIAL_CATEGORIES.get(ttype)
+        if category is None:
+            return
+        track = Track({'type': ttype})
+        for seg in segments:
+            track.append_dict(seg)
+        for i in range(len(track)):
+            if not track.is_media(i):
+                continue
+            entry = index.get(track.material_ids[i], category)
+            if entry is None:
+                continue
+            mat = converted.get(entry['id'])
+            if mat is None:
+                mat = converted[entry['id']] = Material.from_dict(entry)
+            yield segment_sequence(track, i, mat, ttype, track_idx, index.fades)
+
+    with open(draft_path, 'r', encoding='utf-8') as f:
+        scanner = _Scanner(f, chunk_size)
+        for key in scanner.object_keys():
+            if key == 'materials':
+                for category in scanner.object_keys():
+                    if category in materials and scanner.peek() == '[':
+                        for _ in scanner.array_items():
+                            entry = scanner.decode()
+                            if isinstance(entry, dict) and 'id' in entry:
+                                materials[category].append(_slim_material(category, entry))
+                    else:
+                        scanner.skip()
+                index = MaterialIdIndex(materials)
+                # Tracks met before materials (non-canonical key order) are resolved now
+                for track_idx, ttype, segments in deferred:
+                    yield from resolve(track_idx, ttype, segments)
+                deferred = []
+            elif key == 'tracks':
+                for track_idx in scanner.array_items():
+                    ttype, segments = 'video', []
+                    for track_key in scanner.object_keys():
+                        if track_key == 'type':
+                            ttype = scanner.decode()
+                        elif track_key == 'segments' and scanner.peek() == '[':
+                            for _ in scanner.array_items():
+                                segments.append(_slim_segment(scanner.decode()))
+                        else:
+                            scanner.skip()
+                    if index is None:
+                        deferred.append((track_idx, ttype, segments))
+                    else:
+                        yield from resolve(track_idx, ttype, segments)
+            else:
+                scanner.skip()
+
+
+def stream_export(draft_path: str, export_path: str, chunk_size: Optional[int] = None):
+    """
+    Write the simplified JSON of a draft to export_path while streaming the draft, emitting
+    each sequence as soon as it is resolved. The output replaces export_path atomically.
+    """
+    tmp = FileManager._temp_name(str(export_path))
+    try:
+        with open(tmp, 'wb') as out:
+            out.write(b'{\n  "sequences": [')
+            first = True
+            written = 0
+            for sequence in iter_draft_sequences(draft_path, chunk_size):
+                body = codec.dumps(sequence).replace(b'\n', b'\n    ')
+                out.write((b'\n    ' if first else b',\n    ') + body)
+                first = False
+                written += 1
+            out.write(b']\n}' if first else b'\n  ]\n}')
+            count("segments_processed", written)
+            count("bytes_written", out.tell())
+        os.replace(tmp, export_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
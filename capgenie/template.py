@@ -0,0 +1,522 @@
+"""
+Precompiled CapCut project template.
+
+The bundled template_capcut_project folder is scanned once per process: static files
+are recorded for linking/copying and the JSON files that change per project are kept
+as parsed skeletons. Instantiating a project then only creates the folders, links or
+copies the static files and writes the skeletons with the per-project fields
+(draft id, name, paths, timestamps) substituted.
+"""
+import os
+import shutil
+import sys
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import codec
+from .file_manager import FileManager
+
+TEMPLATE_PATH = Path(__file__).parent.parent / "template_capcut_project"
+
+META_FILE = "draft_meta_info.json"
+# Fichiers JSON dont certains champs (name, id, path) sont adaptés à chaque projet
+DRAFT_FILES = ["draft_content.json", "draft_content.json.bak", "template.tmp", "template-2.tmp"]
+
+LINK_MODES = ("auto", "copy", "link", "reflink")
+
+# Contenus par défaut quand un fichier manque dans le dossier template
+DEFAULT_META = {
+    "cloud_package_completed_time": "",
+    "draft_cloud_capcut_purchase_info": "",
+    "draft_cloud_last_action_download": False,
+    "draft_cloud_package_type": "",
+    "draft_cloud_purchase_info": "",
+    "draft_cloud_template_id": "",
+    "draft_cloud_tutorial_info": "",
+    "draft_cloud_videocut_purchase_info": "",
+    "draft_cover": "draft_cover.jpg",
+    "draft_deeplink_url": "",
+    "draft_enterprise_info": {
+        "draft_enterprise_extra": "",
+        "draft_enterprise_id": "",
+        "draft_enterprise_name": "",
+        "enterprise_material": []
+    },
+    "draft_fold_path": "C:/Users/Yanis/AppData/Local/CapCut/User Data/Projects/com.lveditor.draft/0527",
+    "draft_id": "E9B7A696-C9D1-4d8f-B444-972AE202972B",
+    "draft_is_ae_produce": False,
+    "draft_is_ai_packaging_used": False,
+    "draft_is_ai_shorts": False,
+    "draft_is_ai_translate": False,
+    "draft_is_article_video_draft": False,
+    "draft_is_from_deeplink": "false",
+    "draft_is_invisible": False,
+    "draft_materials": [
+        {"type": 0, "value": []},
+        {"type": 1, "value": []},
+        {"type": 2, "value": []},
+        {"type": 3, "value": []},
+        {"type": 6, "value": []},
+        {"type": 7, "value": []},
+        {"type": 8, "value": []}
+    ],
+    "draft_materials_copied_info": [],
+    "draft_name": "0527",
+    "draft_need_rename_folder": False,
+    "draft_new_version": "",
+    "draft_removable_storage_device": "",
+    "draft_root_path": "C:\\Users\\Yanis\\AppData\\Local\\CapCut\\User Data\\Projects\\com.lveditor.draft",
+    "draft_segment_extra_info": [],
+    "draft_timeline_materials_size_": 8080,
+    "draft_type": "",
+    "tm_draft_cloud_completed": "",
+    "tm_draft_cloud_modified": 0,
+    "tm_draft_cloud_space_id": -1,
+    "tm_draft_create": 1748373258615818,
+    "tm_draft_modified": 1748373274514938,
+    "tm_draft_removed": 0,
+    "tm_duration": 0
+}
+
+DEFAULT_SETTINGS = """[General]
+cloud_last_modify_platform=windows
+draft_create_time=1748373258
+layoutType=0
+draft_last_edit_time=1748373274
+real_edit_seconds=12
+real_edit_keys=1
+"""
+
+DEFAULT_PERFORMANCE_OPT_INFO = {"manual_cancle_precombine_segs": None}
+
+DEFAULT_TEMPLATE_TMP = {
+    "canvas_config": {"background": None, "height": 0, "ratio": "original", "width": 0},
+    "color_space": -1,
+    "config": {
+        "adjust_max_index": 1,
+        "attachment_info": [],
+        "combination_max_index": 1,
+        "export_range": None,
+        "extract_audio_last_index": 1,
+        "lyrics_recognition_id": "",
+        "lyrics_sync": True,
+        "lyrics_taskinfo": [],
+        "maintrack_adsorb": True,
+        "material_save_mode": 0,
+        "multi_language_current": "none",
+        "multi_language_list": [],
+        "multi_language_main": "none",
+        "multi_language_mode": "none",
+        "original_sound_last_index": 1,
+        "record_audio_last_index": 1,
+        "sticker_max_index": 1,
+        "subtitle_keywords_config": None,
+        "subtitle_recognition_id": "",
+        "subtitle_sync": True,
+        "subtitle_taskinfo": [],
+        "system_font_list": [],
+        "use_float_render": False,
+        "video_mute": False,
+        "zoom_info_params": None
+    },
+    "cover": None,
+    "create_time": 0,
+    "duration": 0,
+    "extra_info": None,
+    "fps": 30.0,
+    "free_render_index_mode_on": False,
+    "group_container": None,
+    "id": "E92C6FA4-39AA-4476-A2C6-B6F0E22F5954",
+    "is_drop_frame_timecode": False,
+    "keyframe_graph_list": [],
+    "keyframes": {
+        "adjusts": [],
+        "audios": [],
+        "effects": [],
+        "filters": [],
+        "handwrites": [],
+        "stickers": [],
+        "texts": [],
+        "videos": []
+    },
+    "last_modified_platform": {
+        "app_id": 0,
+        "app_source": "",
+        "app_version": "",
+        "device_id": "",
+        "hard_disk_id": "",
+        "mac_address": "",
+        "os": "",
+        "os_version": ""
+    },
+    "lyrics_effects": [],
+    "materials": {
+        "ai_translates": [],
+        "audio_balances": [],
+        "audio_effects": [],
+        "audio_fades": [],
+        "audio_track_indexes": [],
+        "audios": [],
+        "beats": [],
+        "canvases": [],
+        "chromas": [],
+        "color_curves": [],
+        "common_mask": [],
+        "digital_humans": [],
+        "drafts": [],
+        "effects": [],
+        "flowers": [],
+        "green_screens": [],
+        "handwrites": [],
+        "hsl": [],
+        "images": [],
+        "log_color_wheels": [],
+        "loudnesses": [],
+        "manual_beautys": [],
+        "manual_deformations": [],
+        "material_animations": [],
+        "material_colors": [],
+        "multi_language_refs": [],
+        "placeholder_infos": [],
+        "placeholders": [],
+        "plugin_effects": [],
+        "primary_color_wheels": [],
+        "realtime_denoises": [],
+        "shapes": [],
+        "smart_crops": [],
+        "smart_relights": [],
+        "sound_channel_mappings": [],
+        "speeds": [],
+        "stickers": [],
+        "tail_leaders": [],
+        "text_templates": [],
+        "texts": [],
+        "time_marks": [],
+        "transitions": [],
+        "video_effects": [],
+        "video_trackings": [],
+        "videos": [],
+        "vocal_beautifys": [],
+        "vocal_separations": []
+    },
+    "mutable_config": None,
+    "name": "",
+    "new_version": "75.0.0",
+    "path": "",
+    "platform": {
+        "app_id": 0,
+        "app_source": "",
+        "app_version": "",
+        "device_id": "",
+        "hard_disk_id": "",
+        "mac_address": "",
+        "os": "",
+        "os_version": ""
+    },
+    "relationships": [],
+    "render_index_track_mode_on": False,
+    "retouch_cover": None,
+    "source": "default",
+    "static_cover_image_path": "",
+    "time_marks": None,
+    "tracks": [],
+    "uneven_animation_template_info": {
+        "composition": "",
+        "content": "",
+        "order": "",
+        "sub_template_info_list": []
+    },
+    "update_time": 0,
+    "version": 360000
+}
+
+DEFAULT_TEMPLATE_2_TMP = {
+    "canvas_config": {"background": None, "height": 1080, "ratio": "original", "width": 1920},
+    "color_space": -1,
+    "config": {
+        "adjust_max_index": 1,
+        "attachment_info": [],
+        "combination_max_index": 1,
+        "export_range": None,
+        "extract_audio_last_index": 1,
+        "lyrics_recognition_id": "",
+        "lyrics_sync": True,
+        "lyrics_taskinfo": [],
+        "maintrack_adsorb": True,
+        "material_save_mode": 0,
+        "multi_language_current": "none",
+        "multi_language_list": [],
+        "multi_language_main": "none",
+        "multi_language_mode": "none",
+        "original_sound_last_index": 1,
+        "record_audio_last_index": 1,
+        "sticker_max_index": 1,
+        "subtitle_keywords_config": None,
+        "subtitle_recognition_id": "",
+        "subtitle_sync": True,
+        "subtitle_taskinfo": [],
+        "system_font_list": [],
+        "use_float_render": False,
+        "video_mute": False,
+        "zoom_info_params": None
+    },
+    "cover": None,
+    "create_time": 0,
+    "duration": 0,
+    "extra_info": None,
+    "fps": 30.0,
+    "free_render_index_mode_on": False,
+    "group_container": None,
+    "id": "8902C01E-5B61-4a19-A1C0-28EACF11C513",
+    "is_drop_frame_timecode": False,
+    "keyframe_graph_list": [],
+    "keyframes": {
+        "adjusts": [],
+        "audios": [],
+        "effects": [],
+        "filters": [],
+        "handwrites": [],
+        "stickers": [],
+        "texts": [],
+        "videos": []
+    },
+    "last_modified_platform": {
+        "app_id": 359289,
+        "app_source": "cc",
+        "app_version": "6.2.8",
+        "device_id": "fa71b85f68d3d9a0261399379c11fe36",
+        "hard_disk_id": "",
+        "mac_address": "0001a0e5b616d6fec770edbeb78d9bd9",
+        "os": "windows",
+        "os_version": "10.0.26100"
+    },
+    "lyrics_effects": [],
+    "materials": {
+        "ai_translates": [],
+        "audio_balances": [],
+        "audio_effects": [],
+        "audio_fades": [],
+        "audio_track_indexes": [],
+        "audios": [],
+        "beats": [],
+        "canvases": [],
+        "chromas": [],
+        "color_curves": [],
+        "common_mask": [],
+        "digital_humans": [],
+        "drafts": [],
+        "effects": [],
+        "flowers": [],
+        "green_screens": [],
+        "handwrites": [],
+        "hsl": [],
+        "images": [],
+        "log_color_wheels": [],
+        "loudnesses": [],
+        "manual_beautys": [],
+        "manual_deformations": [],
+        "material_animations": [],
+        "material_colors": [],
+        "multi_language_refs": [],
+        "placeholder_infos": [],
+        "placeholders": [],
+        "plugin_effects": [],
+        "primary_color_wheels": [],
+        "realtime_denoises": [],
+        "shapes": [],
+        "smart_crops": [],
+        "smart_relights": [],
+        "sound_channel_mappings": [],
+        "speeds": [],
+        "stickers": [],
+        "tail_leaders": [],
+        "text_templates": [],
+        "texts": [],
+        "time_marks": [],
+        "transitions": [],
+        "video_effects": [],
+        "video_trackings": [],
+        "videos": [],
+        "vocal_beautifys": [],
+        "vocal_separations": []
+    },
+    "mutable_config": None,
+    "name": "",
+    "new_version": "135.0.0",
+    "path": "",
+    "platform": {
+        "app_id": 359289,
+        "app_source": "cc",
+        "app_version": "6.2.8",
+        "device_id": "fa71b85f68d3d9a0261399379c11fe36",
+        "hard_disk_id": "",
+        "mac_address": "0001a0e5b616d6fec770edbeb78d9bd9",
+        "os": "windows",
+        "os_version": "10.0.26100"
+    },
+    "relationships": [],
+    "render_index_track_mode_on": True,
+    "retouch_cover": None,
+    "source": "default",
+    "static_cover_image_path": "",
+    "time_marks": None,
+    "tracks": [],
+    "uneven_animation_template_info": {
+        "composition": "",
+        "content": "",
+        "order": "",
+        "sub_template_info_list": []
+    },
+    "update_time": 0,
+    "version": 360000
+}
+
+FALLBACK_CONTENT = {
+    META_FILE: DEFAULT_META,
+    "draft_settings": DEFAULT_SETTINGS,
+    "performance_opt_info.json": DEFAULT_PERFORMANCE_OPT_INFO,
+    "template.tmp": DEFAULT_TEMPLATE_TMP,
+    "template-2.tmp": DEFAULT_TEMPLATE_2_TMP,
+    # Un draft vide valide
+    "draft_content.json": DEFAULT_TEMPLATE_2_TMP,
+    "draft_content.json.bak": DEFAULT_TEMPLATE_2_TMP,
+}
+
+
+class CompiledTemplate:
+    """
+    A template folder scanned once: its sub-folders, its static files and the parsed
+    skeletons of the JSON files adapted per project.
+    """
+
+    def __init__(self, root: Path = TEMPLATE_PATH):
+        self.root = Path(root)
+        self.directories: List[str] = []
+        self.static_files: List[str] = []
+        self.skeletons: Dict[str, object] = {}
+        if self.root.is_dir():
+            for dirpath, _, filenames in os.walk(self.root):
+                rel_dir = os.path.relpath(dirpath, self.root)
+                if rel_dir != '.':
+                    self.directories.append(rel_dir)
+                for name in filenames:
+                    rel = name if rel_dir == '.' else os.path.join(rel_dir, name)
+                    if rel == META_FILE or rel in DRAFT_FILES:
+                        try:
+                            self.skeletons[rel] = FileManager.load_json(str(self.root / rel))
+                            continue
+                        except Exception:
+                            # Pour les .tmp, certains ne sont pas du json : copiés tels quels
+                            pass
+                    self.static_files.append(rel)
+        for name, content in FALLBACK_CONTENT.items():
+            if name not in self.skeletons and name not in self.static_files:
+                self.skeletons[name] = content
+
+    def instantiate(self, dest: Path, link_mode: str = "auto") -> str:
+        """
+        Create a project in `dest` from the template.
+        :param link_mode: how static files are placed: "auto" (reflink where the filesystem
+            supports it, copy otherwise), "reflink", "link" (hardlink, shares the inode with
+            the template: a program rewriting such a file in place, rather than replacing it,
+            also changes the template) or "copy". Files already in `dest` are replaced, never
+            written through.
+        :return: the generated draft id
+        """
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode {link_mode!r} (expected one of {LINK_MODES}).")
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        for rel_dir in self.directories:
+            (dest / rel_dir).mkdir(parents=True, exist_ok=True)
+        for rel in self.static_files:
+            _place_file(str(self.root / rel), str(dest / rel), link_mode)
+
+        # Générer des valeurs uniques
+        draft_id = str(uuid.uuid4()).upper()
+        now = int(datetime.now().timestamp() * 1e6)
+        for rel, skeleton in self.skeletons.items():
+            target = str(dest / rel)
+            if isinstance(skeleton, str):
+                with open(target, 'w', encoding='utf-8') as f:
+                    f.write(skeleton)
+                continue
+            data = skeleton
+            if rel == META_FILE:
+                data = dict(skeleton)
+                data["draft_id"] = draft_id
+                data["draft_name"] = dest.name
+                data["draft_fold_path"] = str(dest)
+                data["draft_root_path"] = str(dest.parent)
+                data["tm_draft_create"] = now
+                data["tm_draft_modified"] = now
+            elif rel in DRAFT_FILES and isinstance(skeleton, dict):
+                # Adapter les champs si existants (copie superficielle : le squelette reste intact)
+                data = dict(skeleton)
+                if "name" in data:
+                    data["name"] = dest.name
+                if "id" in data:
+                    data["id"] = draft_id
+                if "path" in data:
+                    data["path"] = str(dest)
+            FileManager.save_json(target, data, compact=rel.startswith("draft_content") and codec.compact_drafts())
+        return draft_id
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """
+    Copy-on-write clone of src into dst (Linux FICLONE); False when unsupported. The clone
+    is made in a temporary file renamed over dst, so an existing dst is replaced, not truncated.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    FICLONE = 0x40049409
+    tmp = FileManager._temp_name(dst)
+    try:
+        with open(src, 'rb') as s, open(tmp, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        os.replace(tmp, dst)
+        return True
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+
+def _place_file(src: str, dst: str, link_mode: str):
+    if link_mode in ("auto", "reflink") and _reflink(src, dst):
+        return
+    if link_mode == "link":
+        tmp = FileManager._temp_name(dst)
+        try:
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    # dst may be a hardlink to src left by a previous instantiation: writing through it
+    # would truncate the template's file
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    shutil.copyfile(src, dst)
+
+
+_compiled: Dict[str, CompiledTemplate] = {}
+_compiled_lock = threading.Lock()
+
+
+def get_template(root: Optional[Path] = None) -> CompiledTemplate:
+    """The compiled template for `root` (default: the bundled one), compiled on first use."""
+    key = str(Path(root or TEMPLATE_PATH).resolve())
+    with _compiled_lock:
+        template = _compiled.get(key)
+        if template is None:
+            template = _compiled[key] = CompiledTemplate(Path(key))
+        return template
@@ -0,0 +1,236 @@
+"""
+Watch mode: re-export the simplified JSON when CapCut saves a draft.
+
+DraftWatcher follows the draft_content.json of one or many project folders. Change
+notifications come from Linux inotify (through ctypes, no dependency) on the project
+folders, or from polling the files' stat on other platforms. A burst of writes (CapCut
+saves several files, sometimes several times in a row) is debounced into a single check,
+and the draft is only re-exported when its content hash differs from the last one exported,
+so touching or rewriting identical bytes costs one read and no parse. Exports are
+incremental (see Project.export_to_json): only the tracks edited in CapCut are rebuilt.
+
+Each outcome is reported as an event dict to the `on_event` callback;
+`capgenie watch` prints them as JSON Lines:
+
+    {"event": "exported", "project_path": ..., "export_path": ..., "changed": true, "stats": {...}}
+    {"event": "error", "project_path": ..., "error": "ValueError: ..."}
+"""
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .locking import file_version
+from .project_editor import Project
+
+DRAFT_FILE = "draft_content.json"
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal ctypes binding of inotify: directory watches, events read with a timeout."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, directory: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed on {directory}: {os.strerror(errno)}")
+        return wd
+
+    def read(self, timeout: float) -> List[tuple]:
+        """(watch descriptor, file name) of the events received within `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+        try:
+            raw = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(raw):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(raw, pos)
+            pos += _EVENT_HEADER.size
+            name = raw[pos:pos + length].rstrip(b'\0')
+            pos += length
+            events.append((wd, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        _Inotify().close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+class DraftWatcher:
+    """
+    Re-export the simplified JSON of projects whose draft_content.json changed.
+
+    :param projects: project folders to watch
+    :param on_event: called with each event dict (from the watcher thread)
+    :param export_name: simplified JSON written in each project folder
+    :param debounce: quiet time (s) after the last write of a burst before the draft is checked
+    :param backend: "inotify", "poll" or "auto" (inotify when available)
+    :param poll_interval: stat interval (s) of the polling backend
+    :param initial_export: export every project once at start instead of only recording its state
+    :param retry_delay: delay (s) before a failed export is retried, doubled after each failure
+    :param max_retries: failed exports retried in a row before waiting for the next change of the draft
+    """
+
+    def __init__(self, projects: Iterable[str], on_event: Optional[Callable[[Dict], None]] = None,
+                 export_name: str = "simplified.json", debounce: float = 0.5, backend: str = "auto",
+                 poll_interval: float = 1.0, initial_export: bool = False, retry_delay: float = 1.0,
+                 max_retries: int = 5):
+        self.projects = [os.path.abspath(p) for p in projects]
+        self.on_event = on_event
+        self.export_name = export_name
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.initial_export = initial_export
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        if backend == "auto":
+            backend = "inotify" if inotify_available() else "poll"
+        if backend not in ("inotify", "poll"):
+            raise ValueError(f"Unknown watch backend {backend!r} (expected 'inotify', 'poll' or 'auto').")
+        self.backend = backend
+        self._hashes: Dict[str, Optional[str]] = {}
+        self._versions: Dict[str, Optional[tuple]] = {}
+        self._pending: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._open: Dict[str, Project] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Watch from a background thread; stop() ends it."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="capgenie-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self):
+        """Watch until stop() is called (blocking)."""
+        for path in self.projects:
+            if self.initial_export:
+                self.check(path)
+            else:
+                self._hashes[path] = _content_hash(os.path.join(path, DRAFT_FILE))
+                self._versions[path] = file_version(os.path.join(path, DRAFT_FILE))
+        if self.backend == "inotify":
+            self._run_inotify()
+        else:
+            self._run_poll()
+
+    def _run_inotify(self):
+        inotify = _Inotify()
+        try:
+            folders = {inotify.add(path): path for path in self.projects}
+            while not self._stop.is_set():
+                for wd, name in inotify.read(self._wait_time()):
+                    if name == DRAFT_FILE and wd in folders:
+                        self._pending[folders[wd]] = time.monotonic() + self.debounce
+                self._flush_pending()
+        finally:
+            inotify.close()
+
+    def _run_poll(self):
+        while not self._stop.is_set():
+            for path in self.projects:
+                version = file_version(os.path.join(path, DRAFT_FILE))
+                if version != self._versions.get(path):
+                    self._versions[path] = version
+                    self._pending[path] = time.monotonic() + self.debounce
+            self._flush_pending()
+            self._stop.wait(min(self.poll_interval, self._wait_time()))
+
+    def _wait_time(self) -> float:
+        if not self._pending:
+            return self.poll_interval
+        return max(0.0, min(self._pending.values()) - time.monotonic())
+
+    def _flush_pending(self):
+        now = time.monotonic()
+        for path, deadline in list(self._pending.items()):
+            if deadline <= now:
+                del self._pending[path]
+                self.check(path)
+
+    # --- Export ---
+
+    def check(self, project_path: str) -> Optional[Dict]:
+        """
+        Re-export a project if its draft content changed since the last successful export.
+        A failed export is scheduled again after retry_delay, with an exponential backoff,
+        up to max_retries times; its error event then carries "retry_in" (s).
+        :return: the event emitted, or None when the content is unchanged
+        """
+        draft = os.path.join(project_path, DRAFT_FILE)
+        digest = _content_hash(draft)
+        if digest is None or digest == self._hashes.get(project_path):
+            return None
+        export_path = os.path.join(project_path, self.export_name)
+        try:
+            project = self._open.get(project_path)
+            if project is None:
+                project = self._open[project_path] = Project(project_path, export_path)
+            changed = project.export_to_json(export_path, incremental=True)
+            event = {"event": "exported", "project_path": project_path, "export_path": export_path,
+                     "changed": changed, "stats": project.last_stats.as_dict()}
+            # Recorded once exported only: a failed export is retried on the next check
+            self._hashes[project_path] = digest
+            self._failures.pop(project_path, None)
+        except Exception as e:
+            event = {"event": "error", "project_path": project_path, "error": f"{type(e).__name__}: {e}"}
+            failures = self._failures[project_path] = self._failures.get(project_path, 0) + 1
+            if failures <= self.max_retries:
+                delay = self.retry_delay * 2 ** (failures - 1)
+                self._pending[project_path] = time.monotonic() + delay
+                event["retry_in"] = delay
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+
+def _content_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except OSError:
+        return None
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from capgenie.project_editor import Project
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A fresh project created from the bundled template in a temporary folder."""
+    return Project(str(tmp_path / "draft"), str(tmp_path / "simple.json"), create=True)
+
+
+@pytest.fixture(autouse=True)
+def _probe_cache(tmp_path):
+    """Keep the media probe cache of each test in its temporary folder."""
+    from capgenie import probe
+    previous = probe.media_cache
+    probe.media_cache = probe.ProbeCache(str(tmp_path / "media_probe.json"))
+    yield probe.media_cache
+    probe.media_cache = previous
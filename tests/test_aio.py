@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+from capgenie.aio import AsyncProject
+from capgenie.file_manager import FileManager
+from capgenie.instrumentation import operation
+
+
+def test_async_operations(tmp_path):
+    async def main():
+        project = await AsyncProject.open(str(tmp_path / "draft"), str(tmp_path / "simple.json"), create=True)
+        ids = await asyncio.gather(*(project.add_video_sequence(f"/media/{i}.mp4", float(i), i + 1.0)
+                                     for i in range(20)))
+        await project.add_audio_sequence("/media/music.mp3", 0.0, 20.0)
+        timeline = await project.load()
+        assert timeline.tracks[0].ids == ids  # calls are applied in the order they were awaited
+        with operation("export") as stats:
+            await project.export_to_json(str(tmp_path / "out.json"))
+        assert stats.counters["segments_processed"] == 21
+        await project.sync_from_json(str(tmp_path / "out.json"), incremental=True)
+        await project.flush()
+        await project.close()
+
+    asyncio.run(main())
+    data = FileManager.load_json(str(tmp_path / "draft" / "draft_content.json"))
+    assert len(data["tracks"][0]["segments"]) == 20
+
+
+def test_event_loop_stays_responsive(tmp_path):
+    async def main():
+        projects = [await AsyncProject.open(str(tmp_path / f"p{i}"), str(tmp_path / f"p{i}.json"), create=True)
+                    for i in range(4)]
+        sequences = [{"path": f"/media/{i}.mp4", "start_time": float(i), "end_time": i + 1.0, "type": "video"}
+                     for i in range(2000)]
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        tick = asyncio.create_task(ticker())
+        await asyncio.gather(*(p.sync_from_data({"sequences": sequences}, backup="none") for p in projects))
+        tick.cancel()
+        return ticks
+
+    ticks = asyncio.run(main())
+    assert len(ticks) > 3
@@ -0,0 +1,26 @@
+import copy
+
+from benchmarks.generator import generate_project, generate_sequences
+from benchmarks.runner import compare, run_suite
+
+
+def test_generator_is_deterministic_and_syncs(tmp_path):
+    sequences = generate_sequences(50, video_tracks=2, audio_tracks=1, seed=3)
+    assert sequences == generate_sequences(50, video_tracks=2, audio_tracks=1, seed=3)
+    assert {s["type"] for s in sequences} == {"video", "audio"}
+    assert any("fade_in_duration" in s for s in sequences)
+
+    project = generate_project(str(tmp_path / "draft"), 50, video_tracks=2, audio_tracks=1, seed=3)
+    draft = project.load_json("draft_content.json")
+    assert sum(len(t["segments"]) for t in draft["tracks"]) == 50
+
+
+def test_suite_and_compare_flag_regressions():
+    results = run_suite([10], ["sync_from_json", "sync_many_media", "add_video_sequence"], repeat=1)
+    assert [r["scenario"] for r in results["results"]] == ["sync_from_json", "sync_many_media", "add_video_sequence"]
+    assert all(r["peak_bytes"] > 0 for r in results["results"])
+
+    slower = copy.deepcopy(results)
+    slower["results"][0]["best_s"] += 1.0
+    rows = compare(results, slower)
+    assert [row["regression"] for row in rows] == [True, False, False]
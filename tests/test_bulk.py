@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from capgenie.bulk import load_journal, run_bulk
+from capgenie.cli import main
+from capgenie.file_manager import FileManager
+
+
+def _jobs(tmp_path, count):
+    jobs = []
+    for i in range(count):
+        json_path = tmp_path / f"job_{i}.json"
+        json_path.write_text(json.dumps({"sequences": [
+            {"path": f"/media/{i}.mp4", "start_time": 0.0, "end_time": 1.0 + i, "type": "video", "track_index": 0}]}))
+        jobs.append((str(tmp_path / f"draft_{i}"), str(json_path)))
+    return jobs
+
+
+def test_bulk_runs_in_pool_and_resumes(tmp_path):
+    jobs = _jobs(tmp_path, 3)
+    jobs.append((str(tmp_path / "draft_missing"), str(tmp_path / "missing.json")))
+    journal = str(tmp_path / "journal.jsonl")
+    results = run_bulk(jobs, journal_path=journal, max_workers=2)
+    statuses = {r["project_path"]: r["status"] for r in results}
+    assert sorted(statuses.values()) == ["error", "ok", "ok", "ok"]
+    assert all("sync_s" in r for r in results if r["status"] == "ok")
+    # Measured in the worker: the time spent waiting in the pool's queue is not included
+    assert all(r["elapsed_s"] == pytest.approx(r["create_s"] + r["sync_s"]) for r in results if r["status"] == "ok")
+    assert all(isinstance(r["elapsed_s"], float) for r in results)
+    draft = FileManager.load_json(str(tmp_path / "draft_2" / "draft_content.json"))
+    assert draft["duration"] == 3_000_000
+
+    rerun = run_bulk(jobs, journal_path=journal, max_workers=1)
+    assert sorted(r["status"] for r in rerun) == ["error", "skipped", "skipped", "skipped"]
+    assert len(load_journal(journal)) == 4
+
+
+def test_bulk_cli(tmp_path, capsys):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([{"project_path": p, "json_path": j} for p, j in _jobs(tmp_path, 2)]))
+    assert main(["bulk", str(manifest), "--workers", "1", "--backup", "none"]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["status"] for line in lines] == ["ok", "ok"]
@@ -0,0 +1,64 @@
+import os
+import time
+
+from capgenie.cache import DraftCache, draft_cache
+from capgenie.file_manager import FileManager
+
+
+def test_cache_hits_and_detects_external_edits(tmp_path):
+    cache = DraftCache()
+    path = str(tmp_path / "draft_content.json")
+    FileManager.save_json(path, {"tracks": []})
+    first = cache.load(path)
+    assert cache.load(path) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    FileManager.save_json(path, {"tracks": [{"segments": []}]})
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert cache.load(path) == {"tracks": [{"segments": []}]}
+    assert cache.invalidations == 1
+
+
+def test_cache_lru_byte_budget(tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"d{i}.json")
+        FileManager.save_json(path, {"pad": "x" * 100})
+        paths.append(path)
+    size = os.path.getsize(paths[0])
+    cache = DraftCache(max_bytes=2 * size)
+    for path in paths:
+        cache.load(path)
+    assert cache.stats()["entries"] == 2
+    assert cache.evictions == 1
+    cache.load(paths[0])
+    assert cache.misses == 4
+
+
+def test_take_never_mutates_loaded_drafts(project):
+    draft_cache.clear()
+    path = str(project.path / "draft_content.json")
+    project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    snapshot = project._read_draft()
+    project.add_video_sequence("/media/b.mp4", 1.0, 2.0)
+    assert len(snapshot.tracks[0]) == 1
+    assert len(draft_cache.load(path).tracks[0]) == 2
+
+
+def test_take_removes_entry_and_commit_refreshes_it(project):
+    draft_cache.clear()
+    path = str(project.path / "draft_content.json")
+    draft_cache.load(path)
+    project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    hits = draft_cache.hits
+    cached = draft_cache.load(path)
+    assert draft_cache.hits == hits + 1
+    assert len(cached.tracks[0]) == 1
+
+    try:
+        with project.edit() as tl:
+            tl.add_video("/media/b.mp4", 1.0, 2.0)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert len(draft_cache.load(path).tracks[0]) == 1
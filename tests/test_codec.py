@@ -0,0 +1,37 @@
+import pytest
+
+from capgenie import codec
+from capgenie.file_manager import FileManager
+
+
+@pytest.fixture(autouse=True)
+def restore_codec_settings():
+    saved = dict(codec._settings)
+    yield
+    codec._settings.update(saved)
+
+
+@pytest.mark.parametrize("backend", codec.available_backends())
+def test_backends_round_trip(backend, tmp_path):
+    codec.configure(backend=backend)
+    data = {"name": "é/clip", "tracks": [{"segments": [{"start": 1_500_000, "volume": 0.5}]}], "cover": None}
+    path = str(tmp_path / "data.json")
+    FileManager.save_json(path, data)
+    assert b"\n  " in open(path, "rb").read()
+    assert FileManager.load_json(path) == data
+    FileManager.save_json(path, data, compact=True)
+    assert b"\n" not in open(path, "rb").read()
+    assert FileManager.load_json(path) == data
+
+
+def test_compact_drafts_setting(project):
+    codec.configure(compact_drafts=True)
+    project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    raw = (project.path / "draft_content.json").read_bytes()
+    assert b"\n" not in raw
+    assert FileManager.load_json(str(project.path / "draft_content.json"))["tracks"][0]["segments"]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        codec.configure(backend="simdjson")
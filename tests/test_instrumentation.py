@@ -0,0 +1,46 @@
+import json
+import logging
+
+from capgenie import instrumentation
+from capgenie.cache import draft_cache
+
+
+def _write_simple(path, count):
+    path.write_text(json.dumps({"sequences": [
+        {"path": f"/media/{i % 2}.mp4", "start_time": float(i), "end_time": i + 1.0, "type": "video", "track_index": 0}
+        for i in range(count)]}))
+
+
+def test_last_stats_phases_and_counters(project, tmp_path):
+    assert project.last_stats.name == "create"
+    _write_simple(tmp_path / "simple.json", 4)
+    draft_cache.clear()
+    project.sync_from_json()
+    stats = project.last_stats
+    assert stats.name == "sync_from_json" and stats.error is None
+    assert {"read", "parse", "build", "serialize", "write", "mirror"} <= set(stats.phases)
+    assert stats.counters["segments_processed"] == 4
+    assert stats.counters["index_hits"] == 6  # 2 media x 3 helper categories reused twice
+    assert stats.counters["bytes_written"] > 0 and stats.counters["cache_misses"] == 1
+    assert sum(stats.phases.values()) <= stats.elapsed_s
+
+    project.export_to_json(str(tmp_path / "out.json"))
+    assert project.last_stats.name == "export_to_json"
+    assert project.last_stats.counters["cache_hits"] == 1
+
+
+def test_hooks_spans_and_logging(project, tmp_path, caplog):
+    _write_simple(tmp_path / "simple.json", 2)
+    seen = []
+    instrumentation.add_hook(seen.append)
+    try:
+        with caplog.at_level(logging.DEBUG, logger="capgenie.stats"):
+            with instrumentation.operation("batch") as batch:
+                project.sync_from_json(backup="none")
+                project.add_audio_sequence("/media/a.mp3", 0, 1)
+    finally:
+        instrumentation.remove_hook(seen.append)
+    assert [s.name for s in seen] == ["sync_from_data", "sync_from_json", "add_audio_sequence", "batch"]
+    assert batch.counters["segments_processed"] == 2
+    assert "write" in batch.phases and "batch" in caplog.text
+    assert instrumentation.current() is None
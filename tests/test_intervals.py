@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from capgenie.indexes import IntervalIndex
+
+
+def test_queries_match_a_linear_scan():
+    rng = random.Random(3)
+    starts = [rng.randrange(0, 1000) for _ in range(300)]
+    durations = [rng.randrange(0, 60) for _ in range(300)]
+    index = IntervalIndex(starts, durations)
+    ends = [s + d for s, d in zip(starts, durations)]
+    for t in range(-5, 1070, 7):
+        assert sorted(index.at(t)) == [i for i in range(300) if starts[i] <= t < ends[i]]
+        assert sorted(index.overlapping(t, t + 25)) == [i for i in range(300) if starts[i] < t + 25 and ends[i] > t]
+    pairs = {(min(a, b), max(a, b)) for a, b, _, _ in index.overlaps()}
+    assert pairs == {(a, b) for a in range(300) for b in range(a + 1, 300)
+                     if starts[a] < ends[b] and starts[b] < ends[a]}
+    assert index.end() == max(ends)
+
+
+def test_gaps_and_incremental_append():
+    index = IntervalIndex([0, 5, 3], [2, 5, 1])
+    assert index.gaps() == [(2, 3), (4, 5)]
+    assert index.gaps(0, 14, min_gap=2) == [(10, 14)]
+    assert index.add(3, 12, 3)
+    assert index.at(13) == [3] and index.end() == 15
+    assert not index.add(4, 1, 1)  # out of order: the caller rebuilds the index
+
+
+def test_project_time_queries(project):
+    a = project.add_video_sequence("/media/a.mp4", 0.0, 4.0)
+    b = project.add_video_sequence("/media/b.mp4", 3.0, 6.0)
+    c = project.add_video_sequence("/media/c.mp4", 8.0, 10.0)
+    music = project.add_audio_sequence("/media/m.mp3", 0.0, 12.0)
+
+    assert [s["segment_id"] for s in project.segments_at(3.5)] == [a, b, music]
+    assert [s["segment_id"] for s in project.segments_at(3.5, track_index=0)] == [a, b]
+    assert [s["segment_id"] for s in project.segments_in(5.0, 9.0, track_index=0)] == [b, c]
+    assert project.find_overlaps() == [{"track_index": 0, "segment_ids": [a, b], "start_time": 3.0, "end_time": 4.0}]
+    assert project.find_gaps(track_index=0) == [{"track_index": 0, "start_time": 6.0, "end_time": 8.0}]
+    assert project.timeline_end() == 12.0 and project.timeline_end(track_index=0) == 10.0
+    with pytest.raises(IndexError):
+        project.segments_at(0.0, track_index=7)
+
+
+def test_index_follows_session_edits(project):
+    a = project.add_video_sequence("/media/a.mp4", 0.0, 2.0)
+    with project.edit() as tl:
+        assert [s["segment_id"] for s in tl.segments_at(1.0)] == [a]
+        b = tl.add_video("/media/b.mp4", 2.0, 4.0)
+        assert [s["segment_id"] for s in tl.segments_at(3.0)] == [b]
+        tl.move(a, start_time=5.0)
+        assert tl.segments_at(1.0) == []
+        assert [s["segment_id"] for s in tl.segments_at(5.5)] == [a]
+        tl.remove(b)
+        assert tl.find_gaps() == [{"track_index": 0, "start_time": 0.0, "end_time": 5.0}]
+    assert project.timeline_end() == 7.0
+
+
+def test_in_place_updates_match_a_rebuild():
+    rng = random.Random(8)
+    starts = [rng.randrange(0, 500) for _ in range(200)]
+    durations = [rng.randrange(0, 40) for _ in range(200)]
+    index = IntervalIndex(starts, durations)
+    for step in range(150):
+        if step % 3:
+            i = rng.randrange(len(starts))
+            assert index.discard(i, starts[i])
+            starts[i], durations[i] = rng.randrange(0, 500), rng.randrange(0, 40)
+            index.insert(i, starts[i], durations[i])
+        else:
+            removed = sorted(rng.sample(range(len(starts)), 3))
+            for i in reversed(removed):
+                assert index.discard(i, starts[i])
+                del starts[i], durations[i]
+            index.renumber(removed)
+        rebuilt = IntervalIndex(starts, durations)
+        assert (index.positions, index.starts, index.ends, index.max_end) == \
+            (rebuilt.positions, rebuilt.starts, rebuilt.ends, rebuilt.max_end)
+    assert not index.discard(0, 10_000)
@@ -0,0 +1,68 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from capgenie.file_manager import FileManager
+from capgenie.locking import ConcurrentModificationError, LockTimeout, ProjectLock
+from capgenie.project_editor import Project
+from capgenie.session import EditSession
+
+
+def _segments(project):
+    return FileManager.load_json(str(project.path / "draft_content.json"))["tracks"][0]["segments"]
+
+
+def _add_clips(project_path, worker, count):
+    project = Project(project_path, project_path + ".json", locking="lock")
+    for i in range(count):
+        project.add_video_sequence(f"/media/w{worker}_{i}.mp4", float(i), i + 1.0)
+
+
+def test_lock_serializes_processes(project):
+    workers = [multiprocessing.get_context("fork").Process(target=_add_clips, args=(str(project.path), w, 10))
+               for w in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert len(_segments(project)) == 40
+
+
+def test_lock_timeout(project):
+    other = Project(str(project.path), str(project.json_path), locking="lock", lock_timeout=0.05)
+    with ProjectLock(project.path):
+        with pytest.raises(LockTimeout):
+            other.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    other.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    assert len(_segments(project)) == 1
+
+
+def test_optimistic_conflict_fails_fast_or_reapplies(project, monkeypatch):
+    slow = Project(str(project.path), str(project.json_path), locking="optimistic")
+    with pytest.raises(ConcurrentModificationError):
+        with slow.edit() as tl:
+            tl.add_video("/media/mine.mp4", 0.0, 1.0)
+            project.add_video_sequence("/media/theirs.mp4", 1.0, 2.0)
+    assert [s["target_timerange"]["start"] for s in _segments(project)] == [1_000_000]
+
+    retrying = Project(str(project.path), str(project.json_path), locking="optimistic", retries=2)
+    raced = threading.Event()
+    real_add = EditSession.add_video
+
+    def add_then_race(session, *args, **kwargs):
+        result = real_add(session, *args, **kwargs)
+        if not raced.is_set():
+            raced.set()
+            project.add_video_sequence("/media/theirs.mp4", 3.0, 4.0)
+        return result
+
+    monkeypatch.setattr(EditSession, "add_video", add_then_race)
+    retrying.add_video_sequence("/media/mine.mp4", 5.0, 6.0)
+    assert [s["target_timerange"]["start"] for s in _segments(project)] == [1_000_000, 3_000_000, 5_000_000]
+    assert retrying.last_stats.counters["conflict_retries"] == 1
+
+
+def test_locking_is_not_combined_with_write_behind(tmp_path):
+    with pytest.raises(ValueError):
+        Project(str(tmp_path / "p"), str(tmp_path / "p.json"), create=True, write_behind=True, locking="lock")
@@ -0,0 +1,58 @@
+from array import array
+
+from capgenie.model import ABSENT, Timeline
+
+
+def _draft():
+    return {
+        "duration": 0,
+        "materials": {
+            "videos": [{"id": "M1", "path": "/a.mp4", "duration": 2_000_000, "type": "video",
+                        "audio_fade": None, "crop": {"lower_left_x": 0.0}}],
+            "texts": [{"id": "T1", "content": "hello"}],
+        },
+        "tracks": [
+            {"id": "V", "type": "video", "attribute": 0, "segments": [
+                {"id": "S1", "material_id": "M1", "target_timerange": {"start": 0, "duration": 2_000_000},
+                 "source_timerange": {"start": 0, "duration": 2_000_000}, "volume": 1.0,
+                 "clip": {"alpha": 1.0}, "extra_material_refs": ["X"]},
+            ]},
+            {"id": "T", "type": "text", "segments": [
+                {"id": "S2", "material_id": "T1", "target_timerange": {"start": 0, "duration": 5},
+                 "source_timerange": None},
+            ]},
+        ],
+        "version": 360000,
+    }
+
+
+def test_roundtrip_keeps_unmodeled_fields():
+    draft = _draft()
+    timeline = Timeline.from_draft(draft)
+    assert draft == _draft()  # the parsed document is left untouched
+    assert isinstance(timeline.tracks[0].starts, array) and timeline.tracks[0].starts.typecode == 'q'
+    assert timeline.materials["videos"][0].width is ABSENT
+    assert timeline.to_draft() == _draft()
+
+
+def test_copy_is_independent_and_edits_are_written_back():
+    timeline = Timeline.from_draft(_draft())
+    edited = timeline.copy()
+    track, i = edited.find_segment("S2")
+    track.set_source(i, 1, 4)
+    edited.materials["videos"][0].volume = 0.5
+    edited.finalize()
+
+    out = edited.to_draft()
+    assert out["tracks"][1]["segments"][0]["source_timerange"] == {"start": 1, "duration": 4}
+    assert out["materials"]["videos"][0]["volume"] == 0.5
+    assert out["duration"] == 2_000_000
+    assert timeline.to_draft() == _draft()
+    assert [s["target_timerange"]["start"] for s in edited.to_draft()["tracks"][0]["segments"]] == [0]
+
+
+def test_sequences_match_export_format():
+    sequences = Timeline.from_draft(_draft()).sequences()
+    assert sequences == [{"path": "/a.mp4", "start_time": 0.0, "end_time": 2.0, "source_in": 0.0, "source_out": 2.0,
+                          "fade_in_duration": 0.0, "fade_out_duration": 0.0, "volume": 1.0, "type": "video",
+                          "track_index": 0}]
@@ -0,0 +1,70 @@
+import io
+import json
+
+from capgenie.cli import main
+from capgenie.file_manager import FileManager
+from capgenie.ops import apply_operations
+
+
+def _lines(*ops):
+    return [json.dumps(op) + "\n" for op in ops]
+
+
+def test_apply_operations_in_one_session(project):
+    results = list(apply_operations(project, _lines(
+        {"op": "add_video", "video_path": "/media/a.mp4", "start_time": 0, "end_time": 2, "ref": "a"},
+        {"op": "add_audio", "audio_path": "/media/a.mp3", "start_time": 0, "end_time": 2},
+        {"op": "set_volume", "segment_id": "missing", "volume": 0.5},
+        {"op": "teleport"},
+    ), backup="none"))
+    assert [r["ok"] for r in results] == [True, True, False, False]
+    assert results[0]["ref"] == "a" and "KeyError" in results[2]["error"]
+
+    seg_id = results[0]["result"]["segment_id"]
+    list(apply_operations(project, _lines(
+        {"op": "move", "segment_id": seg_id, "start_time": 5, "track_index": 2},
+        {"op": "set_fade", "segment_id": seg_id, "fade_in_duration": 0.5},
+    )))
+    draft = project.load_json("draft_content.json")
+    moved = draft["tracks"][2]["segments"][0]
+    assert moved["id"] == seg_id and moved["target_timerange"] == {"start": 5_000_000, "duration": 2_000_000}
+    assert moved["fade_in"] == {"duration": 500_000}
+    assert draft["tracks"][0]["segments"] == []
+
+
+def test_apply_cli_atomic_commits_nothing(project, monkeypatch, capsys):
+    before = project.load_json("draft_content.json")
+    ops = "".join(_lines(
+        {"op": "add_video", "video_path": "/media/a.mp4", "start_time": 0, "end_time": 2},
+        {"op": "remove", "segment_id": "missing"},
+    ))
+    monkeypatch.setattr("sys.stdin", io.StringIO(ops))
+    assert main(["apply", str(project.path), "--atomic"]) == 1
+    assert [json.loads(line)["ok"] for line in capsys.readouterr().out.splitlines()] == [True, False]
+    assert FileManager.load_json(str(project.path / "draft_content.json")) == before
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(ops))
+    assert main(["apply", str(project.path)]) == 1
+    assert len(project.load_json("draft_content.json")["tracks"][0]["segments"]) == 1
+
+
+def test_failed_modify_leaves_the_segment_unchanged(project):
+    results = list(apply_operations(project, _lines(
+        {"op": "add_video", "video_path": "/media/a.mp4", "start_time": 0, "end_time": 2},
+    ), backup="none"))
+    seg_id = results[0]["result"]["segment_id"]
+    before = project.load_json("draft_content.json")["tracks"][0]["segments"][0]
+
+    results = list(apply_operations(project, _lines(
+        {"op": "modify", "segment_id": seg_id, "start_time": 30, "end_time": 31, "volume": "loud"},
+        {"op": "modify", "segment_id": seg_id, "start_time": 20, "end_time": 15},
+        {"op": "modify", "segment_id": seg_id, "source_in": 3, "source_out": 1},
+        {"op": "move", "segment_id": seg_id, "start_time": "x" * 1_000_000},
+        {"op": "set_fade", "segment_id": seg_id, "fade_in_duration": 1.5, "fade_out_duration": 1.0},
+        {"op": "add_audio", "audio_path": "/media/a.mp3", "start_time": 0, "end_time": 2},
+    ), backup="none"))
+    assert [r["ok"] for r in results] == [False, False, False, False, False, True]
+    assert all("ValueError" in r["error"] and len(r["error"]) < 200 for r in results[:5])
+    draft = project.load_json("draft_content.json")
+    assert draft["tracks"][0]["segments"][0] == before
+    assert len(draft["tracks"][1]["segments"]) == 1
@@ -0,0 +1,72 @@
+import os
+
+from capgenie.file_manager import FileManager
+from capgenie.project_editor import Project
+
+
+def test_write_behind_coalesces_and_flushes(tmp_path, monkeypatch):
+    project = Project(str(tmp_path / "draft"), str(tmp_path / "simple.json"), create=True,
+                      write_behind=True, flush_interval=60)
+    main = project.path / "draft_content.json"
+    before = main.read_bytes()
+    writes = []
+    real_save = FileManager.save_json
+    monkeypatch.setattr(FileManager, "save_json", staticmethod(lambda p, d, **kw: (writes.append(p), real_save(p, d, **kw))))
+    for i in range(20):
+        project.add_video_sequence(f"/media/{i}.mp4", i, i + 1)
+    assert main.read_bytes() == before
+    out = tmp_path / "export.json"
+    project.export_to_json(str(out))
+    assert len(FileManager.load_json(str(out))["sequences"]) == 20
+    project.flush()
+    assert len(writes) == 2  # export + one coalesced draft write
+    assert len(FileManager.load_json(str(main))["tracks"][0]["segments"]) == 20
+    assert main.read_bytes() == (project.path / "draft_content.json.bak").read_bytes()
+    project.close()
+
+
+def test_write_behind_rollback_keeps_committed_state(tmp_path):
+    project = Project(str(tmp_path / "draft"), str(tmp_path / "simple.json"), create=True, write_behind=True)
+    project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    try:
+        with project.edit() as tl:
+            tl.add_video("/media/b.mp4", 1.0, 2.0)
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    project.flush()
+    segments = FileManager.load_json(str(project.path / "draft_content.json"))["tracks"][0]["segments"]
+    assert len(segments) == 1
+    project.close()
+
+
+def test_write_behind_reloads_draft_changed_on_disk(tmp_path):
+    project = Project(str(tmp_path / "draft"), str(tmp_path / "simple.json"), create=True, write_behind=True)
+    project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    project.flush()
+    other = Project(str(project.path), str(project.json_path))
+    other.add_video_sequence("/media/b.mp4", 1.0, 2.0)
+    out = tmp_path / "export.json"
+    project.export_to_json(str(out))
+    assert [s["path"] for s in FileManager.load_json(str(out))["sequences"]] == ["/media/a.mp4", "/media/b.mp4"]
+    project.add_video_sequence("/media/c.mp4", 2.0, 3.0)
+    project.flush()
+    segments = FileManager.load_json(str(project.path / "draft_content.json"))["tracks"][0]["segments"]
+    assert len(segments) == 3
+    project.close()
+
+
+def test_atomic_write_leaves_no_temp_files(project):
+    project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+    assert not [f for f in os.listdir(project.path) if f.endswith(".tmp") and f not in ("template.tmp", "template-2.tmp")]
+
+
+def test_write_bytes_syncs_file_before_rename(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (synced.append(os.path.exists(tmp_path / "out.json")), real_fsync(fd)))
+    FileManager.write_bytes(str(tmp_path / "out.json"), b"{}")
+    assert (tmp_path / "out.json").read_bytes() == b"{}"
+    # The file is synced before it replaces the target, then the folder after the rename
+    assert synced == ([False, True] if os.name == "posix" else [False])
+    assert os.listdir(tmp_path) == ["out.json"]
@@ -0,0 +1,76 @@
+import os
+import struct
+import wave
+
+import pytest
+
+from capgenie import probe
+from capgenie.file_manager import FileManager
+from capgenie.instrumentation import operation
+
+
+def _box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def _mp4(path, width=1920, height=1080, seconds=5):
+    mvhd = _box(b'mvhd', bytes(12) + struct.pack('>II', 1000, seconds * 1000) + bytes(80))
+    matrix = struct.pack('>9i', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    tkhd = _box(b'tkhd', bytes(40) + matrix + struct.pack('>II', width << 16, height << 16))
+    mdhd = _box(b'mdhd', bytes(12) + struct.pack('>II', 600, seconds * 600) + bytes(4))
+    hdlr = _box(b'hdlr', bytes(8) + b'vide' + bytes(12))
+    moov = _box(b'moov', mvhd + _box(b'trak', tkhd + _box(b'mdia', mdhd + hdlr)))
+    with open(path, 'wb') as f:
+        f.write(_box(b'ftyp', b'isom' + bytes(4)) + _box(b'mdat', bytes(1000)) + moov)
+    return str(path)
+
+
+def _wav(path, seconds=1.5):
+    with wave.open(str(path), 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes(int(8000 * seconds) * 2))
+    return str(path)
+
+
+def test_probe_containers(tmp_path):
+    assert probe.probe(_mp4(tmp_path / "a.mp4")) == probe.MediaInfo("video", 5_000_000, 1920, 1080)
+    assert probe.probe(_wav(tmp_path / "a.wav")) == probe.MediaInfo("audio", 1_500_000)
+    # 100 MPEG-1 layer III frames at 128 kbps / 44.1 kHz, behind an ID3v2 tag
+    frame = b'\xff\xfb\x90\x00' + bytes(413)
+    (tmp_path / "a.mp3").write_bytes(b'ID3\x03\x00\x00\x00\x00\x00\x0a' + bytes(10) + frame * 100)
+    assert probe.probe(str(tmp_path / "a.mp3")) == probe.MediaInfo("audio", 2_606_250)
+    (tmp_path / "empty.mp4").write_bytes(b'')
+    assert probe.probe(str(tmp_path / "empty.mp4")) is None
+    assert probe.probe(str(tmp_path / "missing.mp4")) is None
+
+
+def test_cache_skips_unchanged_files(tmp_path, _probe_cache):
+    path = _mp4(tmp_path / "a.mp4")
+    with operation("probe") as stats:
+        probe.probe_many([path, path])
+        probe.probe_many([path])
+    assert (stats.counters["media_probed"], stats.counters["probe_cache_hits"]) == (1, 1)
+    assert os.path.abspath(path) in FileManager.load_json(_probe_cache.path)
+
+    _mp4(path, width=640, height=480)
+    os.utime(path, ns=(0, 1))
+    assert probe.probe_many([path])[path].width == 640
+
+
+def test_sync_and_add_use_probed_media(project, tmp_path):
+    video = _mp4(tmp_path / "clip.mp4", 3840, 2160, seconds=10)
+    project.sync_from_data({"sequences": [
+        {"path": video, "start_time": 0.0, "end_time": 2.0, "source_in": 1.0, "type": "video"}]})
+    mat = FileManager.load_json(str(project.path / "draft_content.json"))["materials"]["videos"][0]
+    assert (mat["width"], mat["height"], mat["duration"]) == (3840, 2160, 10_000_000)
+
+    with pytest.raises(ValueError, match="past the end"):
+        project.sync_from_data({"sequences": [
+            {"path": video, "start_time": 0.0, "end_time": 2.0, "source_in": 9.0, "type": "video"}]})
+    with pytest.raises(ValueError, match="past the end"):
+        project.add_video_sequence(video, 0.0, 5.0, source_in=8.0)
+    project.add_video_sequence("/media/unknown.mp4", 0.0, 1.0)
+    mat = FileManager.load_json(str(project.path / "draft_content.json"))["materials"]["videos"][-1]
+    assert (mat["width"], mat["height"], mat["duration"]) == (1280, 720, 1_000_000)
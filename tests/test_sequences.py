@@ -0,0 +1,67 @@
+import pytest
+
+from benchmarks.generator import generate_sequences
+from capgenie.sequences import prepare_sequences, validate_sequences
+
+
+def _expected(seq):
+    source_in = seq.get("source_in", 0.0)
+    source_out = seq.get("source_out")
+    if source_out is None:
+        source_out = source_in + (seq["end_time"] - seq["start_time"])
+    return (int(seq["start_time"] * 1_000_000), int((seq["end_time"] - seq["start_time"]) * 1_000_000),
+            int(source_in * 1_000_000), int(source_out * 1_000_000) - int(source_in * 1_000_000),
+            int(seq.get("fade_in_duration", 0.0) * 1_000_000), int(seq.get("fade_out_duration", 0.0) * 1_000_000))
+
+
+def test_conversion_matches_per_field_int():
+    sequences = generate_sequences(500, seed=4)
+    for seq in sequences[::3]:
+        del seq["source_out"]
+    batch = prepare_sequences(sequences, backend="python")
+    assert batch.issues == []
+    assert [batch.timing(i) for i in range(len(batch))] == [_expected(s) for s in sequences]
+
+
+def test_numpy_backend_matches_python():
+    pytest.importorskip("numpy")
+    sequences = generate_sequences(1000, seed=5)
+    python, vectorized = prepare_sequences(sequences, backend="python"), prepare_sequences(sequences, backend="numpy")
+    assert vectorized.backend == "numpy"
+    assert [vectorized.timing(i) for i in range(1000)] == [python.timing(i) for i in range(1000)]
+
+
+def test_validation_reports_bad_ranges():
+    issues = validate_sequences([
+        {"path": "/a.mp4", "start_time": 2.0, "end_time": 1.0},
+        {"path": "/a.mp4", "start_time": -1.0, "end_time": 1.0, "source_in": 3.0, "source_out": 2.0},
+        {"path": "/a.mp4", "start_time": 0.0, "end_time": 1.0, "fade_in_duration": 0.8, "fade_out_duration": 0.5},
+        {"path": "/a.mp4", "start_time": "0", "end_time": 1.0, "type": "text"},
+    ])
+    assert issues == ["sequence 3: type must be 'video' or 'audio', not 'text'",
+                      "sequence 3: start_time must be a number, not '0'"]
+    issues = validate_sequences([
+        {"path": "/a.mp4", "start_time": 2.0, "end_time": 1.0},
+        {"path": "/a.mp4", "start_time": -1.0, "end_time": 1.0, "source_in": 3.0, "source_out": 2.0},
+        {"path": "/a.mp4", "start_time": 0.0, "end_time": 1.0, "fade_in_duration": 0.8, "fade_out_duration": 0.5},
+    ])
+    assert [issue.split(":")[0] for issue in issues] == ["sequence 0", "sequence 1", "sequence 1", "sequence 2"]
+    assert "before start_time" in issues[0] and "longer than the sequence" in issues[3]
+
+
+def test_sync_rejects_invalid_sequences_before_loading(project):
+    before = (project.path / "draft_content.json").read_bytes()
+    with pytest.raises(ValueError, match="end_time"):
+        project.sync_from_data({"sequences": [{"path": "/a.mp4", "start_time": 3.0, "end_time": 1.0, "type": "video"}]})
+    assert (project.path / "draft_content.json").read_bytes() == before
+
+
+@pytest.mark.parametrize("field, value", [("track_index", "1"), ("track_index", None), ("track_index", -1),
+                                          ("track_index", True), ("volume", "loud"), ("volume", None),
+                                          ("volume", float("nan"))])
+def test_sync_rejects_bad_track_index_and_volume(project, field, value):
+    before = (project.path / "draft_content.json").read_bytes()
+    sequence = {"path": "/a.mp4", "start_time": 0.0, "end_time": 1.0, "type": "video", field: value}
+    with pytest.raises(ValueError, match=field):
+        project.sync_from_data({"sequences": [sequence]})
+    assert (project.path / "draft_content.json").read_bytes() == before
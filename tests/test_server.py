@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from capgenie.file_manager import FileManager
+from capgenie.project_editor import Project
+from capgenie.server import Client, make_server
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def client(request, tmp_path):
+    if request.param == "tcp":
+        server = make_server(port=0, flush_interval=0.05)
+        make_client = lambda: Client(port=server.server_address[1], timeout=10)
+    else:
+        socket_path = str(tmp_path / "capgenie.sock")
+        server = make_server(socket_path=socket_path, flush_interval=0.05)
+        make_client = lambda: Client(socket_path=socket_path, timeout=10)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = make_client()
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+    server.registry.close_all()
+
+
+def test_daemon_edits_stay_in_memory_until_flush(client, tmp_path):
+    project_path = str(tmp_path / "draft")
+    assert client.call("ping") == "pong"
+    client.call("open", project_path=project_path, create=True)
+    seg_id = client.call("add_video", project_path=project_path, video_path="/media/a.mp4", start_time=0, end_time=2)
+    client.call("add_audio", project_path=project_path, audio_path="/media/a.mp3", start_time=0, end_time=1)
+
+    sequences = client.call("export", project_path=project_path)["sequences"]
+    assert [s["path"] for s in sequences] == ["/media/a.mp4", "/media/a.mp3"]
+
+    client.call("flush", project_path=project_path)
+    draft = FileManager.load_json(str(tmp_path / "draft" / "draft_content.json"))
+    assert draft["tracks"][0]["segments"][0]["id"] == seg_id
+
+
+def test_daemon_sees_external_edits_between_calls(client, tmp_path):
+    project_path = str(tmp_path / "draft")
+    client.call("open", project_path=project_path, create=True)
+    client.call("add_video", project_path=project_path, video_path="/media/a.mp4", start_time=0, end_time=1)
+    client.call("flush", project_path=project_path)
+
+    # The user edits the draft (as CapCut would) while the daemon holds it in memory
+    Project(project_path, str(tmp_path / "user.json")).add_video_sequence("/media/user.mp4", 1.0, 2.0)
+
+    sequences = client.call("export", project_path=project_path)["sequences"]
+    assert [s["path"] for s in sequences] == ["/media/a.mp4", "/media/user.mp4"]
+    client.call("add_video", project_path=project_path, video_path="/media/b.mp4", start_time=2, end_time=3)
+    client.call("flush", project_path=project_path)
+    draft = FileManager.load_json(str(tmp_path / "draft" / "draft_content.json"))
+    assert [seg["target_timerange"]["start"] for seg in draft["tracks"][0]["segments"]] == [0, 1_000_000, 2_000_000]
+
+
+def test_daemon_inline_sync_and_errors(client, tmp_path):
+    project_path = str(tmp_path / "draft")
+    client.call("open", project_path=project_path, create=True)
+    summary = client.call("sync", project_path=project_path, incremental=True, sequences=[
+        {"path": "/media/a.mp4", "start_time": 0.0, "end_time": 1.5, "type": "video", "track_index": 0}])
+    assert summary["inserted"] == 1
+    assert client.call("stats")["projects"] == 1
+
+    with pytest.raises(RuntimeError, match="LookupError"):
+        client.call("no_such_method")
+    with pytest.raises(RuntimeError, match="FileNotFoundError"):
+        client.call("open", project_path=str(tmp_path / "missing"))
+    assert client.call("close", project_path=project_path) is True
+    assert client.call("list") == []
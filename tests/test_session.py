@@ -0,0 +1,104 @@
+import pytest
+
+from capgenie.file_manager import FileManager
+
+
+def _draft(project, name="draft_content.json"):
+    return FileManager.load_json(str(project.path / name))
+
+
+def test_edit_session_writes_once(project, monkeypatch):
+    writes = []
+    real_save = FileManager.save_json
+    monkeypatch.setattr(FileManager, "save_json", staticmethod(lambda p, d, **kw: (writes.append(p), real_save(p, d, **kw))))
+    with project.edit() as tl:
+        for i in range(50):
+            tl.add_video(f"/media/clip_{i}.mp4", i, i + 1)
+        project.add_audio_sequence("/media/music.mp3", 0.0, 50.0)
+    assert len(writes) == 1
+    data = _draft(project)
+    assert len(data["tracks"][0]["segments"]) == 50
+    assert len(data["tracks"][1]["segments"]) == 1
+    assert data == _draft(project, "draft_content.json.bak")
+
+
+def test_edit_session_rollback_on_exception(project):
+    before = (project.path / "draft_content.json").read_bytes()
+    with pytest.raises(ValueError):
+        with project.edit() as tl:
+            tl.add_video("/media/a.mp4", 0.0, 2.0)
+            raise ValueError("boom")
+    assert (project.path / "draft_content.json").read_bytes() == before
+    assert project._session is None
+
+
+def test_edit_session_remove_and_modify(project):
+    keep = project.add_video_sequence("/media/a.mp4", 0.0, 2.0)
+    drop = project.add_video_sequence("/media/b.mp4", 2.0, 4.0)
+    with project.edit() as tl:
+        tl.remove(drop)
+        tl.modify(keep, start_time=1.0, end_time=3.0, volume=0.5)
+    data = _draft(project)
+    segments = data["tracks"][0]["segments"]
+    assert [s["id"] for s in segments] == [keep]
+    assert segments[0]["target_timerange"] == {"start": 1_000_000, "duration": 2_000_000}
+    assert segments[0]["volume"] == 0.5
+    assert [m["path"] for m in data["materials"]["videos"]] == ["/media/a.mp4"]
+
+
+def test_edit_session_removals_keep_lookups_in_step(project):
+    ids = [project.add_video_sequence(f"/media/{i % 3}.mp4", float(i), i + 1.0) for i in range(40)]
+    moved = ids[5]
+    dropped = set(ids[::3] + ids[1:4]) - {moved}
+    kept = [seg_id for seg_id in ids if seg_id not in dropped]
+    with project.edit() as tl:
+        tl.move(moved, track_index=2)
+        for seg_id in dropped:
+            tl.remove(seg_id)
+        for seg_id in kept:
+            tl.modify(seg_id, volume=0.25)
+        track = tl.timeline.tracks[0]
+        assert [track.position(seg_id) for seg_id in track.ids] == list(range(len(track)))
+    data = _draft(project)
+    assert [s["id"] for s in data["tracks"][0]["segments"]] == [s for s in kept if s != moved]
+    assert [s["id"] for s in data["tracks"][2]["segments"]] == [moved]
+    used = {s["material_id"] for t in data["tracks"] for s in t["segments"]}
+    assert used == {m["id"] for m in data["materials"]["videos"]}
+
+
+def test_modify_fades_round_trip_through_export(project, tmp_path):
+    video = project.add_video_sequence("/media/a.mp4", 0.0, 2.0)
+    audio = project.add_audio_sequence("/media/a.mp3", 0.0, 2.0, fade_out_duration=0.5)
+    cuts = [{"path": "/media/long.mp4", "start_time": 2.0 + i, "end_time": 3.0 + i, "source_in": float(i),
+             "type": "video", "track_index": 0} for i in range(2)]
+    with project.edit() as tl:
+        tl.modify(video, fade_in_duration=1.0)
+        tl.modify(audio, fade_in_duration=0.25, fade_out_duration=0.0)
+
+    def exported():
+        out = tmp_path / "out.json"
+        project.export_to_json(str(out))
+        return {(s["path"], s["start_time"]): (s["fade_in_duration"], s["fade_out_duration"])
+                for s in FileManager.load_json(str(out))["sequences"]}
+
+    assert exported() == {("/media/a.mp4", 0.0): (1.0, 0.0), ("/media/a.mp3", 0.0): (0.25, 0.0)}
+    data = _draft(project)
+    video_seg = data["tracks"][0]["segments"][0]
+    fade_id = data["materials"]["videos"][0]["audio_fade"]["id"]
+    assert fade_id in video_seg["extra_material_refs"]
+    assert {f["id"] for f in data["materials"]["audio_fades"]} == {fade_id, data["materials"]["audios"][0]["id"]}
+
+    with project.edit() as tl:
+        tl.modify(video, fade_in_duration=0.0)
+    data = _draft(project)
+    assert data["materials"]["videos"][0]["audio_fade"] is None
+    assert fade_id not in data["tracks"][0]["segments"][0]["extra_material_refs"]
+    assert len(data["materials"]["audio_fades"]) == 1
+
+    # A material shared by several cuts is copied for the segment whose fade changes
+    project.sync_from_data({"sequences": cuts}, dedup_materials=True, backup="none")
+    first = _draft(project)["tracks"][0]["segments"][0]["id"]
+    with project.edit() as tl:
+        tl.modify(first, fade_out_duration=0.5)
+    assert exported() == {("/media/long.mp4", 2.0): (0.0, 0.5), ("/media/long.mp4", 3.0): (0.0, 0.0)}
+    assert len(_draft(project)["materials"]["videos"]) == 2
@@ -0,0 +1,70 @@
+import io
+import json
+
+import pytest
+
+from capgenie.file_manager import FileManager
+from capgenie.streaming import _Scanner
+
+
+SEQUENCES = [
+    {"path": "/media/a.mp4", "start_time": 0.0, "end_time": 2.0, "type": "video", "track_index": 0,
+     "fade_in_duration": 0.5, "volume": 0.8},
+    {"path": "/media/b \"quoted\" \\ é.mp4", "start_time": 2.0, "end_time": 3.5, "type": "video", "track_index": 0},
+    {"path": "/media/music.mp3", "start_time": 0.0, "end_time": 4.0, "type": "audio", "track_index": 1,
+     "fade_out_duration": 1.0, "source_in": 3.0},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_streaming_export_matches_regular_export(project, tmp_path, chunk_size, monkeypatch):
+    with open(project.json_path, 'w', encoding='utf-8') as f:
+        json.dump({"sequences": SEQUENCES}, f)
+    project.sync_from_json()
+    monkeypatch.setattr("capgenie.streaming.CHUNK_SIZE", chunk_size)
+    regular, streamed = tmp_path / "regular.json", tmp_path / "streamed.json"
+    project.export_to_json(str(regular))
+    project.export_to_json(str(streamed), streaming=True)
+    assert FileManager.load_json(str(streamed)) == FileManager.load_json(str(regular))
+    assert len(FileManager.load_json(str(streamed))["sequences"]) == 3
+
+
+def test_scanner_skips_nested_values():
+    doc = '{"a": {"x": [1, "]}", {"y": "\\\\\\""}]}, "b": 12345, "c": [true, null]}'
+    scanner = _Scanner(io.StringIO(doc), chunk_size=3)
+    seen = {}
+    for key in scanner.object_keys():
+        if key == "a":
+            scanner.skip()
+        else:
+            seen[key] = scanner.decode()
+    assert seen == {"b": 12345, "c": [True, None]}
+
+
+def test_streaming_export_matches_regular_export_on_odd_segments(project, tmp_path):
+    with open(project.json_path, 'w', encoding='utf-8') as f:
+        json.dump({"sequences": SEQUENCES}, f)
+    project.sync_from_json()
+    draft_path = str(project.path / "draft_content.json")
+    draft = FileManager.load_json(draft_path)
+    video, audio = draft["tracks"][0]["segments"][0], draft["tracks"][1]["segments"][0]
+    draft["tracks"][0]["segments"] += [
+        {k: v for k, v in video.items() if k != "target_timerange"},
+        {k: v for k, v in video.items() if k != "id"},
+        dict(video, id="null-source", source_timerange=None),
+        dict(video, id="bad-source", source_timerange={"start": 1}),
+        dict(video, id="int-volume", volume=1),
+        dict(video, id="float-target", target_timerange={"start": 1.5, "duration": 2}),
+        dict(video, id="audio-material", material_id=audio["material_id"]),
+        dict(video, id="no-material", material_id=None),
+        "not a segment",
+    ]
+    draft["materials"]["videos"][0]["volume"] = None
+    FileManager.save_json(draft_path, draft)
+
+    regular, streamed = tmp_path / "regular.json", tmp_path / "streamed.json"
+    project.export_to_json(str(regular))
+    project.export_to_json(str(streamed), streaming=True)
+    assert FileManager.load_json(str(streamed)) == FileManager.load_json(str(regular))
+    # null-source, bad-source and int-volume are exported, the other odd segments are skipped
+    assert len(FileManager.load_json(str(streamed))["sequences"]) == len(SEQUENCES) + 3
@@ -0,0 +1,176 @@
+import json
+import os
+
+from capgenie.file_manager import FileManager
+from capgenie.project_editor import Project
+
+
+def _write_simple(path, sequences):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"sequences": sequences}, f)
+
+
+SEQUENCES = [
+    {"path": "/media/a.mp4", "start_time": 0.0, "end_time": 2.0, "type": "video", "track_index": 0,
+     "fade_in_duration": 0.5},
+    {"path": "/media/music.mp3", "start_time": 0.0, "end_time": 4.0, "type": "audio", "track_index": 1,
+     "fade_out_duration": 1.0},
+]
+
+
+def test_sync_writes_identical_backup(project):
+    _write_simple(project.json_path, SEQUENCES)
+    project.sync_from_json()
+    main = project.path / "draft_content.json"
+    bak = project.path / "draft_content.json.bak"
+    assert main.read_bytes() == bak.read_bytes()
+    data = FileManager.load_json(str(main))
+    assert [t["type"] for t in data["tracks"]] == ["video", "audio"]
+    assert data["duration"] == 4_000_000
+    audio_seg = data["tracks"][1]["segments"][0]
+    assert audio_seg["material_id"] in audio_seg["extra_material_refs"]
+
+
+def test_sync_backup_modes(project):
+    _write_simple(project.json_path, SEQUENCES)
+    bak = project.path / "draft_content.json.bak"
+    before = bak.read_bytes()
+    project.sync_from_json(backup="none")
+    assert bak.read_bytes() == before
+    project.sync_from_json(backup="link")
+    assert bak.read_bytes() == (project.path / "draft_content.json").read_bytes()
+    assert os.stat(bak).st_ino == os.stat(project.path / "draft_content.json").st_ino
+
+
+def test_sync_reuses_helper_materials_per_path(project):
+    sequences = [dict(SEQUENCES[0], start_time=float(i), end_time=float(i + 1)) for i in range(3)]
+    _write_simple(project.json_path, sequences)
+    project.sync_from_json()
+    project.sync_from_json()
+    materials = FileManager.load_json(str(project.path / "draft_content.json"))["materials"]
+    for category in ("canvases", "speeds", "placeholder_infos"):
+        assert [m["material_name"] for m in materials[category]] == ["/media/a.mp4"]
+    refs = {tuple(s["extra_material_refs"][:3])
+            for s in FileManager.load_json(str(project.path / "draft_content.json"))["tracks"][0]["segments"]}
+    assert len(refs) == 1
+
+
+def test_export_round_trip(project, tmp_path):
+    _write_simple(project.json_path, SEQUENCES)
+    project.sync_from_json()
+    out = tmp_path / "exported.json"
+    project.export_to_json(str(out))
+    sequences = FileManager.load_json(str(out))["sequences"]
+    assert [(s["path"], s["track_index"], s["end_time"]) for s in sequences] == [
+        ("/media/a.mp4", 0, 2.0), ("/media/music.mp3", 1, 4.0)]
+    assert sequences[0]["fade_in_duration"] == 0.5
+    assert sequences[1]["fade_out_duration"] == 1.0
+    assert sequences[1]["source_out"] == 4.0
+
+
+def test_incremental_export_rebuilds_changed_tracks(project, tmp_path):
+    _write_simple(project.json_path, SEQUENCES)
+    project.sync_from_json()
+    out, full = str(tmp_path / "exported.json"), str(tmp_path / "full.json")
+    assert project.export_to_json(out, incremental=True) is True
+    assert project.export_to_json(out, incremental=True) is False
+    assert project.last_stats.counters["tracks_reused"] == 2
+
+    # Same content rewritten: the fingerprints match, the export is left alone
+    before = os.stat(out).st_mtime_ns
+    project.sync_from_json(backup="none")
+    assert project.export_to_json(out, incremental=True) is False
+    assert os.stat(out).st_mtime_ns == before
+
+    _write_simple(project.json_path, [SEQUENCES[0], dict(SEQUENCES[1], volume=0.5),
+                                      dict(SEQUENCES[1], start_time=4.0, end_time=6.0)])
+    project.sync_from_json(backup="none")
+    assert project.export_to_json(out, incremental=True) is True
+    assert project.last_stats.counters["tracks_rebuilt"] == 1
+    assert project.last_stats.counters["segments_processed"] == 2
+    project.export_to_json(full)
+    assert FileManager.load_json(out) == FileManager.load_json(full)
+    # A fresh Project finds the draft unchanged from the sidecar alone
+    fresh = Project(str(project.path), str(project.json_path))
+    assert fresh.export_to_json(out, incremental=True) is False
+
+    # ... and reuses the unchanged tracks from the export file when one track changed
+    _write_simple(project.json_path, [dict(SEQUENCES[0], volume=0.8), dict(SEQUENCES[1], volume=0.5),
+                                      dict(SEQUENCES[1], start_time=4.0, end_time=6.0)])
+    project.sync_from_json(backup="none")
+    fresh = Project(str(project.path), str(project.json_path))
+    assert fresh.export_to_json(out, incremental=True) is True
+    assert fresh.last_stats.counters["tracks_rebuilt"] == 1
+    assert fresh.last_stats.counters["tracks_reused"] == 1
+    project.export_to_json(full)
+    assert FileManager.load_json(out) == FileManager.load_json(full)
+
+    # A regular export replaced the file: the next incremental export starts over
+    project.export_to_json(out)
+    assert project.export_to_json(out, incremental=True) is True
+    assert project.last_stats.counters["tracks_rebuilt"] == 2
+
+
+def test_incremental_sync_keeps_ids(project):
+    _write_simple(project.json_path, SEQUENCES)
+    project.sync_from_json()
+    main = project.path / "draft_content.json"
+    before = FileManager.load_json(str(main))
+    video_seg = before["tracks"][0]["segments"][0]
+
+    summary = project.sync_from_json(incremental=True)
+    assert summary == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+
+    changed = [dict(SEQUENCES[0], volume=0.5),
+               {"path": "/media/b.mp4", "start_time": 2.0, "end_time": 3.0, "type": "video", "track_index": 0}]
+    _write_simple(project.json_path, changed)
+    summary = project.sync_from_json(incremental=True)
+    assert summary == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 0}
+    after = FileManager.load_json(str(main))
+    segments = after["tracks"][0]["segments"]
+    assert segments[0]["id"] == video_seg["id"]
+    assert segments[0]["volume"] == 0.5
+    assert after["tracks"][1]["segments"] == []
+    assert {m["path"] for m in after["materials"]["videos"]} == {"/media/a.mp4", "/media/b.mp4"}
+    assert after["materials"]["audios"] == []
+    assert after["duration"] == 3_000_000
+
+
+def test_dedup_materials_shares_one_material_per_media(project, tmp_path):
+    cuts = [{"path": "/media/long.mp4", "start_time": float(i), "end_time": i + 1.0, "source_in": 10.0 * i,
+             "source_out": 10.0 * i + 1, "volume": 0.5 + i / 10, "type": "video", "track_index": 0} for i in range(5)]
+    cuts.append(dict(cuts[0], start_time=6.0, end_time=7.0, fade_in_duration=0.2))
+    project.sync_from_data({"sequences": cuts}, dedup_materials=True)
+    data = FileManager.load_json(str(project.path / "draft_content.json"))
+    videos = data["materials"]["videos"]
+    assert len(videos) == 2  # the faded cut needs its own material
+    assert videos[0]["duration"] == 41_000_000
+    project.export_to_json(str(tmp_path / "out.json"))
+    exported = FileManager.load_json(str(tmp_path / "out.json"))["sequences"]
+    assert [(s["source_in"], s["volume"], s["fade_in_duration"]) for s in exported] == \
+        [(c["source_in"], c["volume"], c.get("fade_in_duration", 0.0)) for c in cuts]
+
+    # Dropping one cut keeps the material its siblings still use
+    summary = project.sync_from_data({"sequences": cuts[1:]}, incremental=True, dedup_materials=True)
+    assert summary["deleted"] == 1
+    data = FileManager.load_json(str(project.path / "draft_content.json"))
+    used = {seg["material_id"] for seg in data["tracks"][0]["segments"]}
+    assert used == {m["id"] for m in data["materials"]["videos"]}
+
+
+def test_compact_sweeps_unreferenced_materials(project):
+    project.sync_from_data({"sequences": SEQUENCES + [
+        {"path": "/media/b.mp4", "start_time": 2.0, "end_time": 3.0, "type": "video", "track_index": 0}]})
+    project.sync_from_data({"sequences": SEQUENCES})  # b.mp4's canvas, speed and placeholder are left behind
+    draft = project.path / "draft_content.json"
+    data = FileManager.load_json(str(draft))
+    data["materials"]["texts"] = [{"id": "orphan", "content": "x"}, {"content": "no id"}]
+    FileManager.save_json(str(draft), data)
+
+    report = project.compact()
+    assert report["removed"] == {"canvases": 1, "speeds": 1, "placeholder_infos": 1, "texts": 1}
+    assert report["bytes_saved"] == report["bytes_before"] - report["bytes_after"] > 0
+    data = FileManager.load_json(str(draft))
+    assert data["materials"]["texts"] == [{"content": "no id"}]
+    assert len(data["materials"]["audio_fades"]) == 2  # one inline in a.mp4's material, one keyed by music.mp3's
+    assert project.compact()["removed"] == {}
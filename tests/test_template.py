@@ -0,0 +1,42 @@
+import os
+import shutil
+
+from capgenie.file_manager import FileManager
+from capgenie.project_editor import Project
+from capgenie.template import TEMPLATE_PATH, get_template
+
+
+def test_instantiate_substitutes_per_project_fields(tmp_path):
+    project = Project(str(tmp_path / "My Draft"), str(tmp_path / "simple.json"), create=True)
+    meta = FileManager.load_json(str(project.path / "draft_meta_info.json"))
+    content = FileManager.load_json(str(project.path / "draft_content.json"))
+    assert meta["draft_name"] == "My Draft"
+    assert meta["draft_fold_path"] == str(project.path)
+    assert content["id"] == meta["draft_id"]
+    assert content["path"] == str(project.path)
+    assert (project.path / "draft_cover.jpg").read_bytes() == (TEMPLATE_PATH / "draft_cover.jpg").read_bytes()
+    assert (project.path / "common_attachment").is_dir()
+    # The cached skeletons are not modified by instantiation
+    assert get_template().skeletons["draft_content.json"]["path"] != str(project.path)
+
+
+def test_link_mode_shares_static_files(tmp_path):
+    get_template().instantiate(tmp_path / "linked", link_mode="link")
+    cover = tmp_path / "linked" / "draft_cover.jpg"
+    assert os.stat(cover).st_ino == os.stat(TEMPLATE_PATH / "draft_cover.jpg").st_ino
+
+
+def test_reinstantiating_a_linked_project_keeps_the_template(tmp_path):
+    root = tmp_path / "template"
+    shutil.copytree(TEMPLATE_PATH, root)
+    template = get_template(root)
+    before = {rel: (root / rel).read_bytes() for rel in template.static_files}
+    dest = tmp_path / "linked"
+    template.instantiate(dest, link_mode="link")
+    for mode in ("copy", "auto", "reflink", "link"):
+        template.instantiate(dest, link_mode=mode)
+        assert {rel: (root / rel).read_bytes() for rel in template.static_files} == before
+    template.instantiate(dest, link_mode="copy")
+    cover = "draft_cover.jpg"
+    assert os.stat(dest / cover).st_ino != os.stat(root / cover).st_ino
+    assert (dest / cover).read_bytes() == before[cover]
@@ -0,0 +1,104 @@
+import os
+import queue
+import time
+
+import pytest
+
+from capgenie.file_manager import FileManager
+from capgenie.project_editor import Project
+from capgenie.watch import DraftWatcher, inotify_available
+
+BACKENDS = ["poll", pytest.param("inotify", marks=pytest.mark.skipif(not inotify_available(), reason="no inotify"))]
+
+
+def _touch_draft(project):
+    path = project.path / "draft_content.json"
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_check_exports_only_changed_content(project):
+    events = []
+    watcher = DraftWatcher([project.path], on_event=events.append, backend="poll")
+    assert watcher.check(str(project.path))["event"] == "exported"
+    _touch_draft(project)
+    assert watcher.check(str(project.path)) is None
+    project.add_video_sequence("/media/a.mp4", 0.0, 2.0)
+    event = watcher.check(str(project.path))
+    assert event["event"] == "exported" and event["stats"]["counters"]["segments_processed"] == 1
+    assert len(FileManager.load_json(event["export_path"])["sequences"]) == 1
+    assert len(events) == 2
+
+
+def test_failed_export_is_retried_with_backoff(project, monkeypatch):
+    real_export = Project.export_to_json
+    calls = []
+
+    def flaky(self, *args, **kwargs):
+        calls.append(time.monotonic())
+        if len(calls) <= 2:
+            raise OSError("disk full")
+        return real_export(self, *args, **kwargs)
+
+    monkeypatch.setattr(Project, "export_to_json", flaky)
+    events = queue.Queue()
+    watcher = DraftWatcher([project.path], on_event=events.put, debounce=0.05, backend="poll",
+                           poll_interval=0.02, retry_delay=0.1)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+        # No further write to the draft: the retries are scheduled by the watcher itself
+        first, second, third = (events.get(timeout=5) for _ in range(3))
+        assert [e["event"] for e in (first, second, third)] == ["error", "error", "exported"]
+        assert (first["retry_in"], second["retry_in"]) == (0.1, 0.2)
+        assert calls[2] - calls[1] >= 0.2 > calls[1] - calls[0] >= 0.1
+        assert len(FileManager.load_json(third["export_path"])["sequences"]) == 1
+    finally:
+        watcher.stop(timeout=5)
+
+
+def test_retries_are_capped(project, monkeypatch):
+    def failing(self, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Project, "export_to_json", failing)
+    events = queue.Queue()
+    watcher = DraftWatcher([project.path], on_event=events.put, debounce=0.05, backend="poll",
+                           poll_interval=0.02, retry_delay=0.05, max_retries=2)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        project.add_video_sequence("/media/a.mp4", 0.0, 1.0)
+        failures = [events.get(timeout=5) for _ in range(3)]
+        assert [e.get("retry_in") for e in failures] == [0.05, 0.1, None]
+        with pytest.raises(queue.Empty):
+            events.get(timeout=0.5)
+    finally:
+        watcher.stop(timeout=5)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_watcher_debounces_bursts(project, tmp_path, backend):
+    other = Project(str(tmp_path / "other"), str(tmp_path / "other.json"), create=True)
+    events = queue.Queue()
+    watcher = DraftWatcher([project.path, other.path], on_event=events.put, debounce=0.2, backend=backend,
+                           poll_interval=0.02)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        for i in range(3):
+            project.add_video_sequence(f"/media/{i}.mp4", float(i), i + 1.0)
+        event = events.get(timeout=5)
+        assert event["event"] == "exported" and event["project_path"] == str(project.path)
+        assert event["stats"]["counters"]["segments_processed"] == 3
+        _touch_draft(project)
+        with pytest.raises(queue.Empty):
+            events.get(timeout=0.5)
+    finally:
+        watcher.stop(timeout=5)
+
+
+def test_unknown_backend(project):
+    with pytest.raises(ValueError):
+        DraftWatcher([project.path], backend="kqueue")